@@ -0,0 +1,174 @@
+# async_binance_service.py
+import asyncio
+
+import aiohttp
+from binance.async_client import AsyncClient
+from binance.client import Client
+
+from logger_module import logger
+from binance_service import SymbolUniverse, REQUEST_LATENCY, REQUEST_ERRORS, \
+                            ENDPOINT_EXCHANGE_INFO, ENDPOINT_KLINES, ENDPOINT_TICKER
+from rate_limiter import RequestScheduler, PRIORITY_HIGH, PRIORITY_LOW, klines_weight
+import config
+
+
+class AsyncBinanceService:
+    """Async counterpart of BinanceService, built on python-binance AsyncClient.
+
+    All requests share one aiohttp session (one connection pool), so hundreds of them can be
+    in flight on a single event loop; `max_in_flight` bounds the pool size.
+    """
+
+    def __init__(self, api_key=None, api_secret=None, tld='com', scheduler=None, max_in_flight=50, recorder=None):
+        """Stores the settings; call `await connect()` from the event loop before use.
+
+        `recorder` is the sync service's MarketDataRecorder (MARKET_DATA.RECORD), shared so both
+        clients write one session.
+        """
+        self.client = None
+        self.api_key = api_key if api_key else config.BINANCE_API_KEY
+        self.api_secret = api_secret if api_secret else config.BINANCE_API_SECRET
+        self.tld = tld
+        self.max_in_flight = max_in_flight
+        # Share the sync service's scheduler when both run in one process: the budget is per IP
+        self.scheduler = scheduler or RequestScheduler(
+            weight_limit=config.RATE_LIMIT_WEIGHT_PER_MINUTE,
+            low_priority_share=config.RATE_LIMIT_SCANNER_SHARE,
+        )
+        self.symbol_universe = SymbolUniverse(self, ttl=config.SYMBOL_UNIVERSE_TTL)
+        self.recorder = recorder
+        self._in_flight = None
+
+    async def connect(self):
+        """Creates the AsyncClient on the running loop. Returns True on success."""
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_request_end.append(self._on_request_end)
+        try:
+            self.client = await AsyncClient.create(
+                self.api_key, self.api_secret, tld=self.tld,
+                session_params={
+                    'trace_configs': [trace_config],
+                    'connector': aiohttp.TCPConnector(limit=self.max_in_flight),
+                },
+            )
+            self._in_flight = asyncio.Semaphore(self.max_in_flight)
+            logger.log_message("Async Binance client initialized and connected.", "GREEN")
+            return True
+        except Exception as e:
+            logger.log_message(f"CRITICAL Error initializing async Binance client: {e}", "RED")
+            self.client = None
+            return False
+
+    async def close(self):
+        """Closes the shared HTTP session."""
+        if self.client is not None:
+            await self.client.close_connection()
+            self.client = None
+
+    def is_connected(self):
+        """Check if the client was initialized successfully."""
+        return self.client is not None
+
+    async def _on_request_start(self, session, trace_config_ctx, params):
+        """aiohttp trace hook: remembers when the request was sent."""
+        trace_config_ctx.start = asyncio.get_running_loop().time()
+
+    async def _on_request_end(self, session, trace_config_ctx, params):
+        """aiohttp trace hook: reconciles the request-weight budget with the response headers and records latency."""
+        self.scheduler.record_response(params.response.status, params.response.headers)
+        REQUEST_LATENCY.observe(asyncio.get_running_loop().time() - trace_config_ctx.start, endpoint=params.url.path)
+
+    async def _acquire(self, weight, priority):
+        """Waits for request-weight budget without blocking the event loop."""
+        while True:
+            wait = self.scheduler.try_acquire(weight, priority)
+            if wait <= 0:
+                return
+            await asyncio.sleep(min(wait, 1.0))
+
+    async def get_futures_exchange_info(self):
+        """Gets the futures exchange information (symbols, filters, status)."""
+        if not self.is_connected():
+            logger.log_message("Async Binance client not available (get_futures_exchange_info).", "RED")
+            return None
+        try:
+            await self._acquire(1, PRIORITY_LOW)
+            return await self.client.futures_exchange_info()
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_EXCHANGE_INFO, error=type(e).__name__)
+            logger.log_message(f"Error getting exchange info from Binance: {e}", "RED")
+            return None
+
+    async def get_usdt_futures_symbols(self):
+        """Gets the USDT perpetual symbols in TRADING status from the cached universe."""
+        if not self.is_connected():
+            logger.log_message("Async Binance client not available (get_usdt_futures_symbols).", "RED")
+            return []
+        await self.symbol_universe.ensure_fresh_async()
+        return self.symbol_universe.cached_symbols()
+
+    async def get_futures_klines(self, symbol, interval=Client.KLINE_INTERVAL_1MINUTE, limit=30, priority=PRIORITY_LOW, start_time=None):
+        """Gets candlestick data for a specific futures symbol (the newest ones, or from start_time in ms)."""
+        if not self.is_connected():
+            logger.log_message(f"Async Binance client not available (get_futures_klines for {symbol}).", "RED")
+            return None
+        try:
+            await self._acquire(klines_weight(limit), priority)
+            async with self._in_flight:
+                params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+                if start_time is not None:
+                    params['startTime'] = int(start_time)
+                klines = await self.client.futures_klines(**params)
+            if self.recorder:
+                self.recorder.record_klines(symbol, klines)
+            return klines
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_KLINES, error=type(e).__name__)
+            logger.log_message(f"Error getting klines for {symbol}: {e}", "RED")
+            return None
+
+    async def iter_futures_klines(self, symbols, interval=Client.KLINE_INTERVAL_1MINUTE, limit=30, limits=None, start_times=None):
+        """Fetches klines for many symbols concurrently, yielding (symbol, klines) as they complete."""
+        limits = limits or {}
+        start_times = start_times or {}
+
+        async def fetch(symbol):
+            return symbol, await self.get_futures_klines(symbol, interval, limits.get(symbol, limit), start_time=start_times.get(symbol))
+
+        for next_done in asyncio.as_completed([fetch(symbol) for symbol in symbols]):
+            yield await next_done
+
+    async def get_futures_ticker_info(self, symbol, priority=PRIORITY_HIGH):
+        """Gets general ticker information for a futures symbol."""
+        if not self.is_connected():
+            logger.log_message(f"Async Binance client not available (get_futures_ticker_info for {symbol}).", "RED")
+            return None
+        try:
+            await self._acquire(1, priority)
+            async with self._in_flight:
+                ticker = await self.client.futures_ticker(symbol=symbol)
+            if self.recorder:
+                self.recorder.record_tickers([ticker])
+            return ticker
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_TICKER, error=type(e).__name__)
+            logger.log_message(f"Error getting ticker info for {symbol}: {e}", "RED")
+            return None
+
+    async def get_all_futures_tickers(self, priority=PRIORITY_LOW):
+        """Gets the 24h ticker information for every futures symbol in one request."""
+        if not self.is_connected():
+            logger.log_message("Async Binance client not available (get_all_futures_tickers).", "RED")
+            return None
+        try:
+            await self._acquire(40, priority)
+            async with self._in_flight:
+                tickers = await self.client.futures_ticker()
+            if self.recorder:
+                self.recorder.record_tickers(tickers)
+            return tickers
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_TICKER, error=type(e).__name__)
+            logger.log_message(f"Error getting all ticker info: {e}", "RED")
+            return None
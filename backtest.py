@@ -0,0 +1,358 @@
+# backtest.py
+# Usage: python backtest.py <data_path> [dev] [prefix] [overrides...]
+# <data_path> is a directory of Binance 1m kline dumps (SYMBOL-1m-*.csv or .zip, one or
+# more per symbol) or a session recorded by market_recorder. TRADING overrides work like runner.py.
+import heapq
+import io
+import os
+import sys
+import time
+import zipfile
+
+import numpy as np
+
+from signal_engine import KIND_LONG, KIND_SHORT, KIND_FAST_SHORT
+
+# Result/type names, overridable with the ones from config (see main)
+DEFAULT_NAMES = {
+    'win': 'WIN',
+    'lose': 'LOSE',
+    'in_progress': 'IN_PROGRESS',
+    'long': 'LONG',
+    'short': 'SHORT',
+    'fast_short': 'FAST_SHORT',
+}
+VOLUME_GATE = 100_000_000  # Same 24h quote volume gate as process_entry_condition
+MINUTES_PER_DAY = 1440
+MINUTE_MS = 60_000
+MARKET_COLUMNS = ('open_time', 'high', 'low', 'close', 'quote_volume')
+CACHE_DIR = '_cache'
+
+
+# --- Data Loading ---
+
+def _read_kline_csv(raw):
+    """Parses a Binance kline CSV (with or without header) into the market columns."""
+    text = raw.decode() if isinstance(raw, bytes) else raw
+    skip = 1 if text[:1].isalpha() else 0
+    data = np.loadtxt(io.StringIO(text), delimiter=',', skiprows=skip, usecols=(0, 2, 3, 4, 7), ndmin=2)
+    return {
+        'open_time': data[:, 0].astype(np.int64),
+        'high': data[:, 1],
+        'low': data[:, 2],
+        'close': data[:, 3],
+        'quote_volume': data[:, 4],
+    }
+
+
+def _read_kline_file(path):
+    """Reads a .csv or a .zip holding one .csv."""
+    if path.endswith('.zip'):
+        with zipfile.ZipFile(path) as archive:
+            return [_read_kline_csv(archive.read(name)) for name in archive.namelist() if name.endswith('.csv')]
+    with open(path) as file:
+        return [_read_kline_csv(file.read())]
+
+
+def _merge_parts(parts):
+    """Concatenates file parts, sorted by open time without duplicates."""
+    merged = {column: np.concatenate([part[column] for part in parts]) for column in MARKET_COLUMNS}
+    _, unique_index = np.unique(merged['open_time'], return_index=True)
+    return {column: np.ascontiguousarray(values[unique_index]) for column, values in merged.items()}
+
+
+def _load_recorded_session(path):
+    """Uses the final version of every recorded candle of a market_recorder session."""
+    from market_recorder import MarketDataReplay
+    replay = MarketDataReplay(path)
+    market = {}
+    for symbol in replay.symbols:
+        rows = replay.candles(symbol)
+        if rows.size:
+            market[symbol] = {column: np.asarray(replay.klines[column][rows]) for column in MARKET_COLUMNS}
+    return market
+
+
+def load_market(path, use_cache=True, mmap=False):
+    """Loads 1m klines per symbol as {symbol: {column: ndarray}}.
+
+    Parsed CSVs are cached as .npy files under <path>/_cache; with mmap=True the cache is
+    memory-mapped read-only, so several processes share the same pages.
+    """
+    if os.path.exists(os.path.join(path, 'symbols.txt')):
+        return _load_recorded_session(path)
+
+    files = {}
+    for name in sorted(os.listdir(path)):
+        if name.endswith(('.csv', '.zip')):
+            files.setdefault(name.split('-')[0], []).append(os.path.join(path, name))
+
+    cache_dir = os.path.join(path, CACHE_DIR)
+    market = {}
+    for symbol, paths in files.items():
+        cache_paths = {column: os.path.join(cache_dir, f'{symbol}.{column}.npy') for column in MARKET_COLUMNS}
+        newest_source = max(os.path.getmtime(p) for p in paths)
+        if use_cache and all(os.path.exists(p) and os.path.getmtime(p) >= newest_source for p in cache_paths.values()):
+            market[symbol] = {column: np.load(p, mmap_mode='r' if mmap else None) for column, p in cache_paths.items()}
+            continue
+        try:
+            columns = _merge_parts([part for p in paths for part in _read_kline_file(p)])
+        except (OSError, ValueError, zipfile.BadZipFile) as e:
+            print(f"Warning: Skipping {symbol}, could not read klines: {e}", file=sys.stderr)
+            continue
+        if use_cache:
+            os.makedirs(cache_dir, exist_ok=True)
+            for column, p in cache_paths.items():
+                np.save(p, columns[column])
+            if mmap:
+                columns = {column: np.load(p, mmap_mode='r') for column, p in cache_paths.items()}
+        market[symbol] = columns
+    return market
+
+
+# --- Rules (mirroring trading_bot) ---
+
+def calculate_tp_sl(is_long, price, trading_params):
+    """Same TP/SL levels as trading_bot.calculate_tp_sl."""
+    tp_perc = trading_params.get('TAKE_PROFIT_PERCENTAGE', 0.5)
+    sl_perc = trading_params.get('STOP_LOSS_PERCENTAGE', 0.3)
+    if is_long:
+        tp = round(price + (price * tp_perc / 100), 8)
+        sl = round(price - (price * sl_perc / 100), 8)
+    else:
+        tp = round(price - (price * tp_perc / 100), 8)
+        sl = round(price + (price * sl_perc / 100), 8)
+    return tp, max(0.00000001, sl)
+
+
+def calculate_difference(is_long, entry_price, price):
+    """Same signed percentage as trading_bot.calculate_difference."""
+    difference = round(((price - entry_price) / entry_price) * 100, 2)
+    return difference if is_long else -difference
+
+
+def _rounded_over(raw, threshold, candidates):
+    """Applies round(x, 2) >= threshold to the prefiltered positions (exactly like the scalar path)."""
+    keep = [i for i in candidates if round(float(raw[i]), 2) >= threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def _round2(values):
+    """Python round(x, 2) of every value (np.round can differ on ties)."""
+    return np.array([round(float(value), 2) for value in values], dtype=np.float64)
+
+
+def symbol_entry_signals(columns, trading_params, window=30, volume_gate=VOLUME_GATE):
+    """Entry signals of one symbol for every minute with a full window.
+
+    Returns (minute_index, kind, variation) arrays. Like the scanner, LONG/SHORT (window
+    variation plus volume gate) take precedence over FAST_SHORT for the same minute, since
+    the second trigger would find the symbol already active. Windows are selected by open_time:
+    one spanning missing minutes is skipped, and the 24h volume sums the rows of the last 24h.
+    """
+    close = np.asarray(columns['close'], dtype=np.float64)
+    if close.size < window:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty.astype(np.int8), empty.astype(np.float64)
+
+    var_perc = trading_params.get('VARIATION_PERCENTAGE', 0.5)
+    var_100k_perc = trading_params.get('VARIATION_100K_PERCENTAGE', 1.0)
+    var_fast_perc = trading_params.get('VARIATION_FAST_PERCENTAGE', 1.0)
+
+    open_time = np.asarray(columns['open_time'], dtype=np.int64)
+    t = np.arange(window - 1, close.size)
+    t = t[open_time[t] - open_time[t - (window - 1)] == (window - 1) * MINUTE_MS]  # Gapless windows only
+    initial, final, prev_prev = close[t - (window - 1)], close[t], close[t - 2]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        long_raw = ((initial - final) / initial) * 100
+        short_raw = ((final - initial) / final) * 100
+        fast_raw = ((final - prev_prev) / final) * 100
+
+    # 24h rolling quote volume, what futures_ticker() reports as quoteVolume
+    volume_sum = np.cumsum(np.asarray(columns['quote_volume'], dtype=np.float64))
+    day_start = np.searchsorted(open_time, open_time[t] - (MINUTES_PER_DAY - 1) * MINUTE_MS, side='left')
+    volume_24h = volume_sum[t] - np.where(day_start > 0, volume_sum[np.maximum(day_start - 1, 0)], 0.0)
+    high_volume = volume_24h > volume_gate
+
+    margin = 0.01  # round(x, 2) moves a value by at most 0.005
+    long_idx = _rounded_over(long_raw, var_perc, np.flatnonzero((initial > final) & (initial > 0) & (long_raw >= var_perc - margin)))
+    short_idx = _rounded_over(short_raw, var_perc, np.flatnonzero((final > initial) & (initial > 0) & (short_raw >= var_perc - margin)))
+    fast_idx = _rounded_over(fast_raw, var_fast_perc, np.flatnonzero((initial > 0) & (prev_prev > 0) & (final > prev_prev) & (fast_raw >= var_fast_perc - margin)))
+
+    # Volume gate: high volume or a variation above VARIATION_100K_PERCENTAGE
+    long_idx = long_idx[high_volume[long_idx] | (_round2(long_raw[long_idx]) >= var_100k_perc)] if long_idx.size else long_idx
+    short_idx = short_idx[high_volume[short_idx] | (_round2(short_raw[short_idx]) >= var_100k_perc)] if short_idx.size else short_idx
+    fast_idx = np.setdiff1d(fast_idx, np.concatenate((long_idx, short_idx)), assume_unique=True)
+
+    index = np.concatenate((long_idx, short_idx, fast_idx))
+    kind = np.concatenate((np.full(long_idx.size, KIND_LONG), np.full(short_idx.size, KIND_SHORT),
+                           np.full(fast_idx.size, KIND_FAST_SHORT))).astype(np.int8)
+    variation = np.concatenate((long_raw[long_idx], short_raw[short_idx], fast_raw[fast_idx]))
+    order = np.argsort(index, kind='stable')
+    return t[index[order]], kind[order], _round2(variation[order])
+
+
+def first_exit(high, low, start, tp, sl, is_long, chunk=MINUTES_PER_DAY):
+    """First candle index >= start whose high/low reaches TP or SL.
+
+    Returns (index, hit_tp) or (None, None) if neither level is reached. Tie-break: when
+    one candle reaches both levels the order inside it is unknown, so the stop loss is
+    assumed to be hit first (conservative).
+    """
+    position = start
+    size = len(high)
+    while position < size:
+        end = min(size, position + chunk)
+        if is_long:
+            tp_hit = high[position:end] >= tp
+            sl_hit = low[position:end] <= sl
+        else:
+            tp_hit = low[position:end] <= tp
+            sl_hit = high[position:end] >= sl
+        any_hit = tp_hit | sl_hit
+        if any_hit.any():
+            offset = int(any_hit.argmax())
+            return position + offset, bool(tp_hit[offset] and not sl_hit[offset])
+        position = end
+        chunk *= 2  # Long-running operations: scan in growing chunks
+    return None, None
+
+
+# --- Simulation ---
+
+def run_backtest(market, trading_params, max_concurrent_operations, names=None, window=30, volume_gate=VOLUME_GATE):
+    """Replays the entry and TP/SL rules over historical klines.
+
+    Returns (results, stats, trades): results has the config.INITIAL_RESULTS layout,
+    stats the save_aggregated_results fields plus PnL, trades one dict per operation.
+    """
+    names = {**DEFAULT_NAMES, **(names or {})}
+    type_names = {KIND_LONG: names['long'], KIND_SHORT: names['short'], KIND_FAST_SHORT: names['fast_short']}
+    symbols = list(market)
+
+    # Vectorized signal generation per symbol, then one time-ordered event list
+    event_times, event_symbols, event_minutes, event_kinds = [], [], [], []
+    for symbol_index, symbol in enumerate(symbols):
+        minutes, kinds, _ = symbol_entry_signals(market[symbol], trading_params, window, volume_gate)
+        if minutes.size:
+            event_times.append(np.asarray(market[symbol]['open_time'])[minutes])
+            event_symbols.append(np.full(minutes.size, symbol_index, dtype=np.int32))
+            event_minutes.append(minutes)
+            event_kinds.append(kinds)
+
+    results = {status: {name: 0 for name in type_names.values()}
+               for status in (names['win'], names['lose'], names['in_progress'])}
+    trades = []
+    skipped_max_concurrent = 0
+
+    if event_times:
+        times = np.concatenate(event_times)
+        symbol_ids = np.concatenate(event_symbols)
+        minutes = np.concatenate(event_minutes)
+        kinds = np.concatenate(event_kinds)
+        order = np.lexsort((kinds, symbol_ids, times))
+
+        active_until = {}  # symbol index -> open time of the exit candle (None = never exits)
+        exits = []  # heap of (exit_time, symbol_index)
+        for i in order:
+            now = times[i]
+            while exits and exits[0][0] <= now:
+                _, finished_symbol = heapq.heappop(exits)
+                active_until.pop(finished_symbol, None)
+
+            symbol_index = int(symbol_ids[i])
+            if symbol_index in active_until:
+                continue
+            if len(active_until) >= max_concurrent_operations:
+                skipped_max_concurrent += 1
+                continue
+
+            columns = market[symbols[symbol_index]]
+            minute, kind = int(minutes[i]), int(kinds[i])
+            is_long = kind == KIND_LONG
+            entry_price = float(columns['close'][minute])
+            tp, sl = calculate_tp_sl(is_long, entry_price, trading_params)
+            exit_index, hit_tp = first_exit(columns['high'], columns['low'], minute + 1, tp, sl, is_long)
+
+            trade = {
+                'tick': symbols[symbol_index],
+                'type': type_names[kind],
+                'entry_time': int(now),
+                'entry_price': entry_price,
+                'tp': tp,
+                'sl': sl,
+            }
+            if exit_index is None:
+                final_price = float(columns['close'][-1])
+                trade.update(status=names['in_progress'], end_time=None, final_price=final_price)
+                active_until[symbol_index] = None
+            else:
+                final_price = tp if hit_tp else sl
+                exit_time = int(columns['open_time'][exit_index])
+                trade.update(status=names['win'] if hit_tp else names['lose'], end_time=exit_time, final_price=final_price)
+                active_until[symbol_index] = exit_time
+                heapq.heappush(exits, (exit_time, symbol_index))
+            trade['final_difference'] = calculate_difference(is_long, entry_price, final_price)
+            results[trade['status']][trade['type']] += 1
+            trades.append(trade)
+
+    in_progress_count = sum(results[names['in_progress']].values())
+    winning_count = sum(results[names['win']].values())
+    losing_count = sum(results[names['lose']].values())
+    total_finished = winning_count + losing_count
+    stats = {
+        "in_progress_operations_count": in_progress_count,
+        "winning_operations_count": winning_count,
+        "losing_operations_count": losing_count,
+        "total_finished_operations": total_finished,
+        "total_operations_recorded": total_finished + in_progress_count,
+        "finished_operations_efficiency_percentage": round(winning_count * 100 / total_finished, 2) if total_finished > 0 else 0.0,
+        "finished_pnl_percentage": round(sum(t['final_difference'] for t in trades if t['status'] != names['in_progress']), 2),
+        "skipped_max_concurrent": skipped_max_concurrent,
+    }
+    return results, stats, trades
+
+
+def write_trades_csv(filepath, trades):
+    """Writes one line per simulated operation, in the operation log's ; separated style."""
+    with open(filepath, 'w') as file:
+        file.write('Tick;Type;Status;EntryTime;EndTime;EntryPrice;TakeProfit;StopLoss;FinalPrice;FinalDifference%\n')
+        for t in trades:
+            entry = time.strftime('%Y-%m-%d %H:%M', time.gmtime(t['entry_time'] / 1000))
+            end = time.strftime('%Y-%m-%d %H:%M', time.gmtime(t['end_time'] / 1000)) if t['end_time'] else ''
+            file.write(f"{t['tick']};{t['type']};{t['status']};{entry};{end};{t['entry_price']};{t['tp']};{t['sl']};{t['final_price']};{t['final_difference']}%\n")
+
+
+def main():
+    """CLI entry point: loads data, runs the configured TRADING parameters and saves results."""
+    if len(sys.argv) < 2:
+        print("Usage: python backtest.py <data_path> [dev] [prefix] [overrides...]", file=sys.stderr)
+        sys.exit(1)
+    # The data path must leave argv before config parses the remaining arguments
+    data_path = sys.argv.pop(1)
+    import config
+    from logger_module import setup_file_logging, log_results_to_json
+
+    names = {
+        'win': config.WIN_NAME, 'lose': config.LOSE_NAME, 'in_progress': config.IN_PROGRESS_NAME,
+        'long': config.LONG_NAME, 'short': config.SHORT_NAME, 'fast_short': config.FAST_SHORT_NAME,
+    }
+
+    start = time.perf_counter()
+    market = load_market(data_path)
+    loaded = time.perf_counter()
+    print(f"Loaded {len(market)} symbols in {loaded - start:.2f}s")
+
+    results, stats, trades = run_backtest(market, config.TRADING_PARAMS, config.MAX_CONCURRENT_OPERATIONS, names)
+    print(f"Simulated {len(trades)} operations in {time.perf_counter() - loaded:.2f}s")
+    for key, value in stats.items():
+        print(f"  {key}: {value}")
+
+    if setup_file_logging(config.LOG_PATH):
+        log_results_to_json(config.LOG_PATH, config.PIN, results, stats)
+        write_trades_csv(os.path.join(config.LOG_PATH, 'backtest_trades.csv'), trades)
+        print(f"Results saved to {config.LOG_PATH}")
+
+
+if __name__ == '__main__':
+    main()
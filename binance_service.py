@@ -1,23 +1,197 @@
 # binance_service.py
 from binance.client import Client
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlsplit
+import asyncio
 import sys
+import threading
+import time
 from logger_module import logger
+from kline_stream import KlineStreamFeed
+from rate_limiter import RequestScheduler, PRIORITY_HIGH, PRIORITY_LOW, klines_weight
+from market_recorder import MarketDataRecorder, ReplayBinanceService
+from metrics import metrics
+from profiling import profiler
+import os
 import config
 
+# --- Metrics ---
+REQUEST_LATENCY = metrics.histogram(
+    'tradingbot_binance_request_duration_seconds', 'Binance REST request latency (until response headers) by endpoint.', ('endpoint',))
+REQUEST_ERRORS = metrics.counter(
+    'tradingbot_binance_request_errors_total', 'Failed Binance REST requests by endpoint and error type.', ('endpoint', 'error'))
+USED_WEIGHT = metrics.gauge('tradingbot_binance_used_weight', 'Request weight used in the current minute.')
+WEIGHT_LIMIT = metrics.gauge('tradingbot_binance_weight_limit', 'Request weight budget per minute.')
+
+ENDPOINT_EXCHANGE_INFO = '/fapi/v1/exchangeInfo'
+ENDPOINT_KLINES = '/fapi/v1/klines'
+ENDPOINT_TICKER = '/fapi/v1/ticker/24hr'
+
+class SymbolUniverse:
+    """Caches the tradable futures symbols and their metadata from futures_exchange_info.
+
+    With an async service (AsyncBinanceService) the universe is refreshed on the event loop
+    through ensure_fresh_async(); the sync lookups then only read the cached data.
+    """
+
+    MIN_EVENT_REFRESH_INTERVAL = 60  # seconds; bounds refreshes triggered by listing events
+
+    def __init__(self, service, ttl=3600, quote_asset='USDT', contract_types=('PERPETUAL',)):
+        """Initializes an empty universe; it is fetched on first use."""
+        self.service = service
+        self.ttl = ttl
+        self.quote_asset = quote_asset
+        self.contract_types = tuple(contract_types)
+        self.updated_at = 0.0
+        self._metadata = {}  # symbol -> metadata dict, in exchangeInfo order
+        self._known = set()  # every symbol listed in exchangeInfo, tradable or not
+        self._stale = True
+        self._lock = threading.Lock()
+        self._async_lock = None  # asyncio.Lock, created on the service's loop
+        self.is_async = asyncio.iscoroutinefunction(service.get_futures_exchange_info)
+
+    @staticmethod
+    def _build_metadata(info):
+        """Extracts the fields the bot needs from an exchangeInfo symbol entry."""
+        filters = {f.get('filterType'): f for f in info.get('filters', [])}
+        return {
+            'symbol': info['symbol'],
+            'base_asset': info.get('baseAsset'),
+            'quote_asset': info.get('quoteAsset'),
+            'contract_type': info.get('contractType'),
+            'status': info.get('status'),
+            'tick_size': float(filters.get('PRICE_FILTER', {}).get('tickSize', 0)),
+            'step_size': float(filters.get('LOT_SIZE', {}).get('stepSize', 0)),
+            'min_notional': float(filters.get('MIN_NOTIONAL', {}).get('notional', 0)),
+            'price_precision': info.get('pricePrecision'),
+            'quantity_precision': info.get('quantityPrecision'),
+            'onboard_date': info.get('onboardDate'),  # ms timestamp
+        }
+
+    def _is_tradable(self, info):
+        """Checks quote asset, contract type and TRADING status."""
+        return (info.get('quoteAsset') == self.quote_asset
+                and info.get('contractType') in self.contract_types
+                and info.get('status') == 'TRADING')
+
+    def refresh(self):
+        """Rebuilds the universe from exchangeInfo; keeps the previous one on failure."""
+        if self.is_async:
+            raise TypeError("SymbolUniverse of an async service: use 'await refresh_async()'")
+        return self.load(self.service.get_futures_exchange_info())
+
+    async def refresh_async(self):
+        """refresh() for async services, awaiting exchangeInfo on the running loop."""
+        return self.load(await self.service.get_futures_exchange_info())
+
+    def needs_refresh(self):
+        """Checks if the TTL expired or the universe was invalidated."""
+        return self._stale or time.time() - self.updated_at > self.ttl
+
+    def load(self, exchange_info):
+        """Rebuilds the universe from an exchangeInfo payload fetched by any client."""
+        if not exchange_info or 'symbols' not in exchange_info:
+            return False
+        try:
+            metadata = {
+                info['symbol']: self._build_metadata(info)
+                for info in exchange_info['symbols'] if self._is_tradable(info)
+            }
+        except (KeyError, ValueError, TypeError) as e:
+            logger.log_message(f"SymbolUniverse: Invalid exchangeInfo payload: {e}", "RED")
+            return False
+
+        listed = metadata.keys() - self._metadata.keys()
+        removed = self._metadata.keys() - metadata.keys()
+        if self._metadata and (listed or removed):
+            logger.log_message(f"SymbolUniverse: {len(listed)} listed {sorted(listed)}, {len(removed)} removed {sorted(removed)}.", "YELLOW")
+
+        self._metadata = metadata
+        self._known = {info['symbol'] for info in exchange_info['symbols']}
+        self.updated_at = time.time()
+        self._stale = False
+        return True
+
+    def invalidate(self):
+        """Forces a refresh on the next lookup."""
+        self._stale = True
+
+    def ensure_fresh(self):
+        """Refreshes the universe when the TTL expired or it was invalidated (cached data only for async services)."""
+        if self.is_async or not self.needs_refresh():
+            return
+        with self._lock:
+            if self.needs_refresh():
+                if not self.refresh() and self._metadata:
+                    logger.log_message("SymbolUniverse: Refresh failed, keeping cached symbols.", "YELLOW")
+
+    async def ensure_fresh_async(self):
+        """ensure_fresh() for async services; concurrent tasks share one exchangeInfo request."""
+        if not self.needs_refresh():
+            return
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        async with self._async_lock:
+            if self.needs_refresh():
+                if not await self.refresh_async() and self._metadata:
+                    logger.log_message("SymbolUniverse: Refresh failed, keeping cached symbols.", "YELLOW")
+
+    def observe_symbols(self, symbols):
+        """Invalidates the universe when a listing or delisting shows up in another payload."""
+        if not self._metadata or time.time() - self.updated_at < self.MIN_EVENT_REFRESH_INTERVAL:
+            return
+        seen = set(symbols)
+        unknown = {s for s in seen if s.endswith(self.quote_asset) and s not in self._known}
+        missing = self._metadata.keys() - seen
+        if unknown or missing:
+            self.invalidate()
+
+    def symbols(self):
+        """Returns the tradable symbol names."""
+        self.ensure_fresh()
+        return list(self._metadata)
+
+    def cached_symbols(self):
+        """Returns the tradable symbol names without triggering a refresh."""
+        return list(self._metadata)
+
+    def get_metadata(self, symbol):
+        """Returns the metadata dict for a symbol, or None if it is not tradable."""
+        self.ensure_fresh()
+        return self._metadata.get(symbol)
+
+
 class BinanceService:
     """Handles interactions with the Binance API."""
 
     def __init__(self, api_key=None, api_secret=None, tld='com'):
         """Initializes the Binance client."""
         self.client = None
+        self.kline_stream = None
+        self.recorder = None
+        self.symbol_universe = SymbolUniverse(self, ttl=config.SYMBOL_UNIVERSE_TTL)
+        self.scheduler = RequestScheduler(
+            weight_limit=config.RATE_LIMIT_WEIGHT_PER_MINUTE,
+            low_priority_share=config.RATE_LIMIT_SCANNER_SHARE,
+        )
+        USED_WEIGHT.set_function(lambda: self.scheduler.usage()['used_weight'])
+        WEIGHT_LIMIT.set_function(lambda: self.scheduler.weight_limit)
         # Use keys from config, but allow overriding
         key = api_key if api_key else config.BINANCE_API_KEY
         secret = api_secret if api_secret else config.BINANCE_API_SECRET
         try:
             self.client = Client(key, secret, tld=tld)
+            # Size the HTTP connection pool for the concurrent kline fetches
+            pool_size = max(10, config.SCANNER_MAX_WORKERS)
+            self.client.session.mount('https://', HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+            # Every response reports the used weight; feed it to the scheduler
+            self.client.session.hooks['response'].append(self._on_response)
             # Test connection
             self.client.futures_ping()
             logger.log_message("Binance client initialized and connected.", "GREEN")
+            if config.MARKET_DATA_RECORD:
+                self.recorder = MarketDataRecorder(os.path.join(config.LOG_PATH, 'market_data'))
         except Exception as e:
             logger.log_message(f"CRITICAL Error initializing Binance client: {e}", "RED")
             # Depending on severity, you might want to exit or handle this
@@ -28,40 +202,209 @@ class BinanceService:
         """Check if the client was initialized successfully."""
         return self.client is not None
 
-    def get_usdt_futures_symbols(self):
-        """Gets all symbols ending with USDT from Binance Futures."""
+    def _on_response(self, response, *args, **kwargs):
+        """requests hook: reconciles the request-weight budget with the response headers and records latency."""
+        self.scheduler.record_response(response.status_code, response.headers)
+        REQUEST_LATENCY.observe(response.elapsed.total_seconds(), endpoint=urlsplit(response.url).path)
+
+    def get_rate_limit_usage(self):
+        """Current request-weight budget usage."""
+        return self.scheduler.usage()
+
+    def get_futures_exchange_info(self):
+        """Gets the futures exchange information (symbols, filters, status)."""
         if not self.is_connected():
-            logger.log_message("Binance client not available (get_usdt_futures_symbols).", "RED")
-            return []
+            logger.log_message("Binance client not available (get_futures_exchange_info).", "RED")
+            return None
         try:
-            tickers = self.client.futures_symbol_ticker()
-            return [tick['symbol'] for tick in tickers if tick['symbol'].endswith('USDT')]
+            self.scheduler.acquire(1, PRIORITY_LOW)
+            return self.client.futures_exchange_info()
         except Exception as e:
-            logger.log_message(f"Error getting symbols from Binance: {e}", "RED")
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_EXCHANGE_INFO, error=type(e).__name__)
+            logger.log_message(f"Error getting exchange info from Binance: {e}", "RED")
+            return None
+
+    def get_usdt_futures_symbols(self):
+        """Gets the USDT perpetual symbols in TRADING status from the cached universe."""
+        if not self.is_connected():
+            logger.log_message("Binance client not available (get_usdt_futures_symbols).", "RED")
             return []
+        return self.symbol_universe.symbols()
+
+    def get_symbol_metadata(self, symbol):
+        """Gets tick size, step size, onboard date and other metadata for a symbol."""
+        return self.symbol_universe.get_metadata(symbol)
+
+    def get_futures_klines(self, symbol, interval=Client.KLINE_INTERVAL_1MINUTE, limit=30, priority=PRIORITY_LOW, start_time=None, profile_cycle=None):
+        """Gets candlestick data for a specific futures symbol (the newest ones, or from start_time in ms).
 
-    def get_futures_klines(self, symbol, interval=Client.KLINE_INTERVAL_1MINUTE, limit=30):
-        """Gets candlestick data for a specific futures symbol."""
+        `profile_cycle` is the profiler cycle charged with the request time when called from a worker thread.
+        """
         if not self.is_connected():
             logger.log_message(f"Binance client not available (get_futures_klines for {symbol}).", "RED")
             return None
         try:
-            return self.client.futures_klines(symbol=symbol, interval=interval, limit=limit)
+            self.scheduler.acquire(klines_weight(limit), priority)
+            request_start = time.perf_counter()
+            params = {'symbol': symbol, 'interval': interval, 'limit': limit}
+            if start_time is not None:
+                params['startTime'] = int(start_time)
+            klines = self.client.futures_klines(**params)
+            if profiler.active:
+                profiler.record_symbol(symbol, time.perf_counter() - request_start, 'fetch', cycle=profile_cycle)
+            if self.recorder:
+                self.recorder.record_klines(symbol, klines)
+            return klines
         except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_KLINES, error=type(e).__name__)
             logger.log_message(f"Error getting klines for {symbol}: {e}", "RED")
             return None
 
-    def get_futures_ticker_info(self, symbol):
+    def iter_futures_klines(self, symbols, interval=Client.KLINE_INTERVAL_1MINUTE, limit=30, max_workers=8, limits=None, profile_cycle=None,
+                            start_times=None):
+        """Fetches klines for many symbols with a bounded worker pool, yielding (symbol, klines) as they complete.
+
+        `limits` and `start_times` optionally map a symbol to its own limit or startTime (e.g. the
+        top-up from a warm candle buffer's newest candle).
+        Per-symbol fetch times are charged to `profile_cycle` (profiler.current_cycle() of the caller).
+        """
+        limits = limits or {}
+        start_times = start_times or {}
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='klines')
+        try:
+            futures = {
+                executor.submit(self.get_futures_klines, symbol, interval, limits.get(symbol, limit),
+                                start_time=start_times.get(symbol), profile_cycle=profile_cycle): symbol
+                for symbol in symbols
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            # Drop pending requests if the consumer stops early
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def get_futures_ticker_info(self, symbol, priority=PRIORITY_HIGH):
         """Gets general ticker information for a futures symbol."""
         if not self.is_connected():
             logger.log_message(f"Binance client not available (get_futures_ticker_info for {symbol}).", "RED")
             return None
         try:
-            return self.client.futures_ticker(symbol=symbol)
+            self.scheduler.acquire(1, priority)
+            ticker = self.client.futures_ticker(symbol=symbol)
+            if self.recorder:
+                self.recorder.record_tickers([ticker])
+            return ticker
         except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_TICKER, error=type(e).__name__)
             logger.log_message(f"Error getting ticker info for {symbol}: {e}", "RED")
             return None
 
+    def get_all_futures_tickers(self, priority=PRIORITY_LOW):
+        """Gets the 24h ticker information for every futures symbol in one request."""
+        if not self.is_connected():
+            logger.log_message("Binance client not available (get_all_futures_tickers).", "RED")
+            return None
+        try:
+            self.scheduler.acquire(40, priority)
+            tickers = self.client.futures_ticker()
+            if self.recorder:
+                self.recorder.record_tickers(tickers)
+            return tickers
+        except Exception as e:
+            REQUEST_ERRORS.inc(endpoint=ENDPOINT_TICKER, error=type(e).__name__)
+            logger.log_message(f"Error getting all ticker info: {e}", "RED")
+            return None
+
+    def start_kline_stream(self, symbols, history=30):
+        """Starts (or re-subscribes) the 1m kline stream and seeds missing history via REST."""
+        if self.kline_stream is None:
+            self.kline_stream = KlineStreamFeed(
+                config.KLINE_STREAM_URL,
+                interval=Client.KLINE_INTERVAL_1MINUTE,
+                symbols_per_connection=config.KLINE_STREAM_SYMBOLS_PER_CONNECTION,
+                history=history,
+            )
+        # Start streaming first so no candle is lost while the history is being seeded
+        self.kline_stream.start(symbols)
+        missing = [symbol for symbol in symbols if not self.kline_stream.has_history(symbol)]
+        for symbol, klines in self.iter_futures_klines(missing, limit=history, max_workers=config.SCANNER_MAX_WORKERS):
+            self.kline_stream.seed(symbol, klines)
+        return self.kline_stream
+
+class MarketSnapshot:
+    """Shares one all-market 24h ticker table, indexed by symbol, between the bot threads."""
+
+    def __init__(self, service, max_age=5):
+        """Initializes an empty snapshot; it is fetched on the first lookup."""
+        self.service = service
+        self.max_age = max_age
+        self.updated_at = 0.0  # time.time() of the last successful refresh
+        self._tickers = {}
+        self._refresh_lock = threading.Lock()
+        self.listeners = []  # callback(tickers_by_symbol) after every successful load
+        # Universe checked for listings on every load; the async cycles point it at their own service's
+        self.symbol_universe = getattr(service, 'symbol_universe', None)
+
+    def age(self):
+        """Seconds since the last successful refresh."""
+        return time.time() - self.updated_at
+
+    def refresh(self, priority=PRIORITY_LOW):
+        """Fetches the full ticker table and swaps the index in one assignment."""
+        return self.load(self.service.get_all_futures_tickers(priority))
+
+    def load(self, tickers):
+        """Replaces the table with a full futures_ticker() payload fetched by any client."""
+        if not tickers:
+            return False
+        self._tickers = {ticker['symbol']: ticker for ticker in tickers}
+        self.updated_at = time.time()
+        # The full ticker table doubles as a cheap listing/delisting detector
+        if self.symbol_universe is not None:
+            self.symbol_universe.observe_symbols(self._tickers)
+        for callback in self.listeners:
+            try:
+                callback(self._tickers)
+            except Exception as e:
+                logger.log_message(f"MarketSnapshot: Listener failed: {e}", "RED")
+        return True
+
+    def add_listener(self, callback):
+        """Registers callback(tickers_by_symbol), called by the refreshing thread after every load."""
+        if callback not in self.listeners:
+            self.listeners.append(callback)
+
+    def ensure_fresh(self, max_age=None, priority=PRIORITY_LOW):
+        """Refreshes the table if it is older than max_age; concurrent callers share one fetch."""
+        max_age = self.max_age if max_age is None else max_age
+        if self.age() <= max_age:
+            return True
+        with self._refresh_lock:
+            if self.age() <= max_age:  # Another thread refreshed while we waited
+                return True
+            return self.refresh(priority)
+
+    def get_ticker(self, symbol, max_age=None):
+        """Returns the ticker dict for a symbol (same shape as futures_ticker(symbol=...))."""
+        if not self.ensure_fresh(max_age) and self._tickers:
+            logger.log_message(f"MarketSnapshot: Refresh failed, using data {self.age():.1f}s old.", "YELLOW")
+        return self._tickers.get(symbol)
+
+    def get_last_price(self, symbol, max_age=None):
+        """Returns the last price of a symbol as float, or None if unknown."""
+        ticker = self.get_ticker(symbol, max_age)
+        return float(ticker['lastPrice']) if ticker and 'lastPrice' in ticker else None
+
+    def get_quote_volume(self, symbol, max_age=None):
+        """Returns the 24h quote volume of a symbol as float, or None if unknown."""
+        ticker = self.get_ticker(symbol, max_age)
+        return float(ticker['quoteVolume']) if ticker and 'quoteVolume' in ticker else None
+
+
 # --- Create a global instance for easy import ---
 # This instance will be created when the module is imported
-binance_service = BinanceService()
+if config.MARKET_DATA_REPLAY_PATH:
+    binance_service = ReplayBinanceService(config.MARKET_DATA_REPLAY_PATH)
+else:
+    binance_service = BinanceService()
+market_snapshot = MarketSnapshot(binance_service, max_age=config.SNAPSHOT_MAX_AGE)
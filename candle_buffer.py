@@ -0,0 +1,157 @@
+# candle_buffer.py
+import threading
+from array import array
+
+
+class CandleRing:
+    """Fixed-size, array-backed ring of candles for one symbol (oldest overwritten first)."""
+
+    __slots__ = ('capacity', 'open_time', 'high', 'low', 'close', 'count', '_head')
+
+    def __init__(self, capacity):
+        """Preallocates one typed array per field."""
+        self.capacity = capacity
+        self.open_time = array('q', [0]) * capacity  # ms timestamps
+        self.high = array('d', [0.0]) * capacity
+        self.low = array('d', [0.0]) * capacity
+        self.close = array('d', [0.0]) * capacity
+        self.count = 0
+        self._head = 0  # Slot of the next append
+
+    def _slot(self, i):
+        """Maps a chronological index (negative allowed) to a storage slot."""
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError('candle index out of range')
+        return (self._head - self.count + i) % self.capacity
+
+    def first_open_time(self):
+        """Open time of the oldest candle, or None if empty."""
+        return self.open_time[self._slot(0)] if self.count else None
+
+    def last_open_time(self):
+        """Open time of the newest candle, or None if empty."""
+        return self.open_time[self._slot(-1)] if self.count else None
+
+    def upsert(self, open_time, high, low, close):
+        """Overwrites the newest candle if it has the same open time, appends newer ones, ignores older ones."""
+        if self.count and open_time == self.open_time[self._slot(-1)]:
+            slot = self._slot(-1)
+        elif not self.count or open_time > self.open_time[self._slot(-1)]:
+            slot = self._head
+            self._head = (self._head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+        else:
+            return
+        self.open_time[slot] = open_time
+        self.high[slot] = high
+        self.low[slot] = low
+        self.close[slot] = close
+
+    def closes(self):
+        """Close prices in chronological order."""
+        return [self.close[self._slot(i)] for i in range(self.count)]
+
+    def candles_since(self, open_time):
+        """(open_time, high, low, close) tuples for candles opened at or after open_time."""
+        candles = []
+        for i in range(self.count):
+            slot = self._slot(i)
+            if self.open_time[slot] >= open_time:
+                candles.append((self.open_time[slot], self.high[slot], self.low[slot], self.close[slot]))
+        return candles
+
+
+class CandleBufferStore:
+    """Per-symbol candle rings that are warmed once and then topped up with new candles only."""
+
+    def __init__(self, capacity=30, interval_ms=60_000):
+        """Initializes an empty store."""
+        self.capacity = capacity
+        self.interval_ms = interval_ms
+        self._rings = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """Returns the ring for a symbol, or None if it was never warmed."""
+        return self._rings.get(symbol)
+
+    def symbols(self):
+        """Symbols currently holding candles."""
+        return list(self._rings)
+
+    def topup_start_time(self, symbol, now_ms):
+        """startTime of the klines request that catches the ring up, or None for the latest full window.
+
+        A warm ring asks for the candles from its newest one (still open when last fetched) onward, so a
+        request delayed past a minute boundary by the rate limiter still gets every missing candle.
+        """
+        ring = self._rings.get(symbol)
+        if ring is None or ring.count < self.capacity:
+            return None
+        current_open = now_ms - now_ms % self.interval_ms
+        if (current_open - ring.last_open_time()) // self.interval_ms >= self.capacity - 1:
+            return None  # Too far behind: one window from its newest candle would not reach now
+        return ring.last_open_time()
+
+    def _continues(self, ring, klines):
+        """Checks that the first row newer than the ring opens exactly one interval after its newest candle."""
+        if not ring.count:
+            return True
+        last_open = ring.last_open_time()
+        for row in klines:
+            open_time = int(row[0])
+            if open_time > last_open:
+                return open_time == last_open + self.interval_ms
+        return True
+
+    def new_rows(self, symbol, klines):
+        """Rows of a full window the ring still needs: from its newest candle on, or all of them when cold or gapped."""
+        ring = self._rings.get(symbol)
+        if ring is None or not ring.count or not self._continues(ring, klines):
+            return klines
+        last_open = ring.last_open_time()
+        return [row for row in klines if int(row[0]) >= last_open]
+
+    def update(self, symbol, klines):
+        """Upserts REST-layout kline rows; only open time, high, low and close are parsed.
+
+        Rows that do not continue the ring (a missed minute) rebuild it, so a window never spans a gap.
+        """
+        ring = self._rings.get(symbol)
+        if ring is not None and not self._continues(ring, klines):
+            with self._lock:
+                ring = self._rings[symbol] = CandleRing(self.capacity)
+        if ring is None:
+            with self._lock:
+                ring = self._rings.setdefault(symbol, CandleRing(self.capacity))
+        for row in klines:
+            ring.upsert(int(row[0]), float(row[2]), float(row[3]), float(row[4]))
+        return ring
+
+    def export(self):
+        """{symbol: [(open_time, high, low, close), ...]} of every ring, for state snapshots."""
+        return {symbol: ring.candles_since(0) for symbol, ring in list(self._rings.items())}
+
+    def load_candles(self, symbol, candles):
+        """Restores (open_time, high, low, close) tuples produced by export()."""
+        with self._lock:
+            ring = self._rings.setdefault(symbol, CandleRing(self.capacity))
+        for candle in candles:
+            ring.upsert(*candle)
+        return ring
+
+    def closes(self, symbol):
+        """Close prices of a symbol in chronological order."""
+        ring = self._rings.get(symbol)
+        return ring.closes() if ring else []
+
+    def discard(self, symbol):
+        """Drops the ring of a symbol that left the universe."""
+        self._rings.pop(symbol, None)
+
+
+# --- Create a global instance for easy import ---
+# 30 one-minute candles: the window evaluate_variation_from_closes works on
+candle_buffers = CandleBufferStore(capacity=30)
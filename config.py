@@ -41,6 +41,33 @@ def load_constants_module(module_suffix='base'):
             sys.exit(1)
 
 
+def pop_resume_argument():
+    """Removes `--resume <PIN>` from sys.argv (before the positional parsing) and returns the PIN."""
+    if '--resume' not in sys.argv:
+        return None
+    index = sys.argv.index('--resume')
+    if index + 1 >= len(sys.argv):
+        print("CRITICAL Error: --resume requires the PIN of the run to resume.", file=sys.stderr)
+        sys.exit(1)
+    pin = sys.argv[index + 1]
+    del sys.argv[index:index + 2]
+    return pin
+
+
+def find_resume_log_path(log_prefix, pin):
+    """Log directory of a previous run: under the current prefix first, then under any prefix."""
+    pin_path = pin.replace('/', os.sep)
+    candidate = os.path.join('log', log_prefix, pin_path)
+    if os.path.isdir(candidate):
+        return candidate
+    if os.path.isdir('log'):
+        for prefix in sorted(os.listdir('log')):
+            candidate = os.path.join('log', prefix, pin_path)
+            if os.path.isdir(candidate):
+                return candidate
+    return None
+
+
 def parse_arguments():
     """
     Parses command line arguments to determine mode, log prefix, and trading overrides.
@@ -144,7 +171,9 @@ def parse_arguments():
 
 
 # --- Main Configuration Loading ---
-PIN = generate_pin()
+# `--resume <PIN>` continues a previous run: same PIN, same log directory, reloaded state
+RESUME_PIN = pop_resume_argument()
+PIN = RESUME_PIN or generate_pin()
 CURRENT_TIME_STR = time.strftime('%H:%M:%S')
 
 # Parse arguments first to know which constants to load and if overrides exist
@@ -173,6 +202,9 @@ elif TRADING_OVERRIDES:
 # Define Log Path using the final LOG_PREFIX
 LOG_PATH = os.path.join('log', LOG_PREFIX, PIN.replace(
     '/', os.sep))  # Ensure OS-agnostic path
+if RESUME_PIN:
+    LOG_PATH = find_resume_log_path(LOG_PREFIX, RESUME_PIN) or LOG_PATH
+    print(f"Resuming PIN {RESUME_PIN} from {LOG_PATH}")
 
 # --- Other Settings ---
 SERVER_URL = 'http://127.0.0.1:5000'
@@ -189,6 +221,41 @@ NOTIFICATIONS_ACTIVE = getattr(
 NOTIFICATION_TIMEOUT = getattr(
     CONSTANTS, 'CLOSE_NOTIFICATION_TIMEOUT', 10)  # Default 10s
 
+# Operation Journal Settings (SQLite, shared by every run unless PATH changes; off with ACTIVE_LOG)
+JOURNAL_ACTIVE = getattr(CONSTANTS, 'JOURNAL', {}).get('ACTIVE', True) and getattr(CONSTANTS, 'ACTIVE_LOG', True)
+JOURNAL_PATH = getattr(CONSTANTS, 'JOURNAL', {}).get(
+    'PATH', os.path.join('log', 'journal.db'))
+
+# Server Emit Settings (batched Socket.IO frames from the bot to server.py)
+SERVER_EMIT_INTERVAL = getattr(CONSTANTS, 'SERVER_EMIT', {}).get('INTERVAL', 0.5)
+SERVER_EMIT_MAX_QUEUE_SIZE = getattr(
+    CONSTANTS, 'SERVER_EMIT', {}).get('MAX_QUEUE_SIZE', 5000)
+
+# Profiling Settings (opt-in stage timers, slowest symbols and cProfile dumps in LOG_PATH)
+PROFILING_ACTIVE = getattr(CONSTANTS, 'PROFILING', {}).get('ACTIVE', False)
+PROFILING_TOP_SYMBOLS = getattr(CONSTANTS, 'PROFILING', {}).get('TOP_SYMBOLS', 10)
+PROFILING_REPORT_EVERY = getattr(CONSTANTS, 'PROFILING', {}).get('REPORT_EVERY', 10)
+PROFILING_CPROFILE_EVERY = getattr(
+    CONSTANTS, 'PROFILING', {}).get('CPROFILE_EVERY', 0)
+
+# Rate Limit Settings
+RATE_LIMIT_WEIGHT_PER_MINUTE = getattr(
+    CONSTANTS, 'RATE_LIMIT', {}).get('WEIGHT_PER_MINUTE', 2400)
+RATE_LIMIT_SCANNER_SHARE = getattr(
+    CONSTANTS, 'RATE_LIMIT', {}).get('SCANNER_SHARE', 0.7)
+
+# Market Data Recording / Replay Settings
+MARKET_DATA_RECORD = getattr(CONSTANTS, 'MARKET_DATA', {}).get('RECORD', False)
+MARKET_DATA_REPLAY_PATH = getattr(
+    CONSTANTS, 'MARKET_DATA', {}).get('REPLAY_PATH', None)
+
+# Kline Stream Settings
+KLINE_STREAM_ACTIVE = getattr(CONSTANTS, 'KLINE_STREAM', {}).get('ACTIVE', False)
+KLINE_STREAM_URL = getattr(CONSTANTS, 'KLINE_STREAM', {}).get(
+    'URL', 'wss://fstream.binance.com')
+KLINE_STREAM_SYMBOLS_PER_CONNECTION = getattr(
+    CONSTANTS, 'KLINE_STREAM', {}).get('SYMBOLS_PER_CONNECTION', 100)
+
 # Trading Parameters
 DEFAULT_TRADING_PARAMS = {
     "STOP_LOSS_PERCENTAGE": 0.3,
@@ -215,9 +282,50 @@ for key, default in DEFAULT_TRADING_PARAMS.items():
 # Operational Settings (Safely access attributes)
 MAX_CONCURRENT_OPERATIONS = getattr(CONSTANTS, 'MAX_CONCURRENT_OPERATIONS', 5)
 SCAN_TICKER_CYCLE_TIME = getattr(CONSTANTS, 'SCAN_TICKER_CYCLE_TIME', 60)
+SCANNER_MAX_WORKERS = getattr(CONSTANTS, 'SCANNER_MAX_WORKERS', 8)
+ASYNC_MODE = getattr(CONSTANTS, 'ASYNC_MODE', False)
+ASYNC_MAX_IN_FLIGHT = getattr(CONSTANTS, 'ASYNC_MAX_IN_FLIGHT', 50)
+VECTORIZED_EVALUATION = getattr(CONSTANTS, 'VECTORIZED_EVALUATION', True)
+SNAPSHOT_MAX_AGE = getattr(CONSTANTS, 'SNAPSHOT_MAX_AGE', 5)
+SYMBOL_UNIVERSE_TTL = getattr(CONSTANTS, 'SYMBOL_UNIVERSE_TTL', 3600)
+OPERATION_RETENTION = getattr(CONSTANTS, 'OPERATION_RETENTION', 200)
+EVENT_DRIVEN_EXITS = getattr(CONSTANTS, 'EVENT_DRIVEN_EXITS', True)
+INTRABAR_EXITS = getattr(CONSTANTS, 'INTRABAR_EXITS', True)
 EVALUATION_CYCLE_TIME = getattr(CONSTANTS, 'EVALUATION_CYCLE_TIME', 30)
 # Default to True if not specified
 ACTIVE_LOG = getattr(CONSTANTS, 'ACTIVE_LOG', True)
+RESULTS_DEBOUNCE = getattr(CONSTANTS, 'RESULTS_DEBOUNCE', 2)  # seconds results.json updates are coalesced
+STATE_SNAPSHOT_INTERVAL = getattr(CONSTANTS, 'STATE_SNAPSHOT_INTERVAL', 30)  # seconds, 0 disables
+METRICS_INTERVAL = getattr(CONSTANTS, 'METRICS_INTERVAL', 15)  # seconds between metrics pushes, 0 disables
+# Per-operation .txt files (the journal holds the same data)
+OPERATION_TEXT_LOGS = getattr(CONSTANTS, 'OPERATION_TEXT_LOGS', True)
+
+# Strategy Profiles: the active TRADING parameters plus any extra sets fed by the same scanner.
+# Extra profiles start from TRADING_PARAMS and override only the keys they define.
+STRATEGY_PROFILES = [{
+    'name': 'main',
+    'pin': PIN,
+    'trading_params': TRADING_PARAMS,
+    'log_path': LOG_PATH,
+    'max_concurrent_operations': MAX_CONCURRENT_OPERATIONS,
+}]
+for profile in getattr(CONSTANTS, 'STRATEGY_PROFILES', []):
+    profile_name = profile.get('NAME')
+    if not profile_name or any(p['name'] == profile_name for p in STRATEGY_PROFILES):
+        print(
+            f"Warning: Strategy profile without a unique NAME in '{MODULE_NAME}'. Ignored: {profile}", file=sys.stderr)
+        continue
+    unknown_keys = set(profile.get('TRADING', {})) - set(TRADING_PARAMS)
+    if unknown_keys:
+        print(
+            f"Warning: Strategy profile '{profile_name}' has unknown TRADING keys {sorted(unknown_keys)}.", file=sys.stderr)
+    STRATEGY_PROFILES.append({
+        'name': profile_name,
+        'pin': f'{PIN}-{profile_name}',
+        'trading_params': {**TRADING_PARAMS, **profile.get('TRADING', {})},
+        'log_path': f'{LOG_PATH}-{profile_name}',
+        'max_concurrent_operations': profile.get('MAX_CONCURRENT_OPERATIONS', MAX_CONCURRENT_OPERATIONS),
+    })
 
 # Constant Names (Safely access attributes, provide defaults)
 WIN_NAME = getattr(CONSTANTS, 'WIN', {}).get('name', 'WIN')
@@ -259,12 +367,24 @@ def print_config_summary():
     print(f'Log Prefix: {LOG_PREFIX}')
     print(f'Log Path: {LOG_PATH}')
     print(f'Development Mode: {IS_DEV}')
+    print(f'Resumed Run: {RESUME_PIN is not None}')
     print(f'Constants Module Used: {MODULE_NAME}')
     print(f'File Logging Active: {ACTIVE_LOG}')
     print(f'Notifications Active: {NOTIFICATIONS_ACTIVE}')
     print(f'Sound Active: {SOUND_ACTIVE}')
+    print(f'Kline Stream Active: {KLINE_STREAM_ACTIVE}')
+    print(f'Async Mode: {ASYNC_MODE}')
+    print(f'Market Data Recording: {MARKET_DATA_RECORD}')
+    print(f'Operation Journal: {JOURNAL_PATH if JOURNAL_ACTIVE else False}')
+    print(f'Profiling: {PROFILING_ACTIVE}')
+    if MARKET_DATA_REPLAY_PATH:
+        print(f'Market Data Replay: {MARKET_DATA_REPLAY_PATH}')
     print('Trading Parameters (Active):')
     # Print from TRADING_PARAMS which includes defaults/overrides
     for key, value in TRADING_PARAMS.items():
         print(f'  {key}: {value}%')
+    for profile in STRATEGY_PROFILES[1:]:
+        print(f"Strategy Profile '{profile['name']}' (PIN: {profile['pin']}):")
+        for key, value in profile['trading_params'].items():
+            print(f'  {key}: {value}%')
     print('---------------------------')
@@ -11,10 +11,23 @@ TRADING = {
 
 # Program config
 ACTIVE_LOG = True
+OPERATION_TEXT_LOGS = True  # per-operation .txt files in LOG_PATH (the journal keeps the same data)
+RESULTS_DEBOUNCE = 2  # seconds results.json updates are coalesced before one atomic write
+STATE_SNAPSHOT_INTERVAL = 30  # seconds between state snapshots used by --resume (0 disables)
+METRICS_INTERVAL = 15  # seconds between metrics pushes to server.py /metrics (0 disables)
 CLOSE_NOTIFICATION_TIMEOUT = 2  # seconds
 EVALUATION_CYCLE_TIME = 15  # seconds
 SCAN_TICKER_CYCLE_TIME = 27  # seconds
 MAX_CONCURRENT_OPERATIONS = 15  # maximum number of concurrent operations
+SCANNER_MAX_WORKERS = 8  # concurrent kline requests during a REST scan pass
+ASYNC_MODE = False  # run scanner and evaluator as asyncio tasks on AsyncClient (REST scanner only)
+ASYNC_MAX_IN_FLIGHT = 50  # concurrent HTTP requests in ASYNC_MODE
+VECTORIZED_EVALUATION = True  # evaluate the whole REST scan pass in one NumPy batch
+SNAPSHOT_MAX_AGE = 5  # seconds an all-market ticker snapshot is reused before refetching
+SYMBOL_UNIVERSE_TTL = 3600  # seconds before the exchangeInfo symbol list is refreshed
+OPERATION_RETENTION = 200  # finished operations kept in memory; older ones go to LOG_PATH/operations.jsonl
+EVENT_DRIVEN_EXITS = True  # close operations as soon as a stream/snapshot price crosses TP or SL
+INTRABAR_EXITS = True  # resolve TP/SL from the 1m candle high/low since the last evaluation
 SOUND = {
     'ACTIVE': False,
     'PATH': 'media/piano.wav',
@@ -22,6 +35,37 @@ SOUND = {
 NOTIFICATIONS = {
     'ACTIVE': False,
 }
+RATE_LIMIT = {
+    'WEIGHT_PER_MINUTE': 2400,  # Binance futures request-weight limit per IP
+    'SCANNER_SHARE': 0.7,  # share of the budget scanner requests may use before being throttled
+}
+JOURNAL = {
+    'ACTIVE': True,  # record operation starts, progress and results in a SQLite journal (only with ACTIVE_LOG)
+    'PATH': 'log/journal.db',
+}
+PROFILING = {
+    'ACTIVE': False,  # time each cycle stage (fetch, parse, evaluate, notify, emit) and log a report
+    'TOP_SYMBOLS': 10,  # slowest symbols listed in each report
+    'REPORT_EVERY': 10,  # cycles per report (per cycle kind)
+    'CPROFILE_EVERY': 0,  # write LOG_PATH/profile-<cycle>-<n>.pstats every N cycles (0 disables)
+}
+SERVER_EMIT = {
+    'INTERVAL': 0.5,  # seconds between batched frames sent to server.py
+    'MAX_QUEUE_SIZE': 5000,  # queued log lines before the oldest are dropped
+}
+MARKET_DATA = {
+    'RECORD': False,  # record every kline/ticker response under LOG_PATH/market_data
+    'REPLAY_PATH': None,  # serve a recorded session instead of the Binance API
+}
+KLINE_STREAM = {
+    'ACTIVE': False,  # use websocket kline streams instead of REST polling in the scanner
+    'URL': 'wss://fstream.binance.com',
+    'SYMBOLS_PER_CONNECTION': 100,  # streams combined on each websocket connection
+}
+# Extra TRADING parameter sets evaluated on the same market data (no extra API weight).
+# Each profile gets its own PIN, operations, results and log path (<LOG_PATH>-<NAME>), e.g.:
+# {'NAME': 'tight', 'TRADING': {'STOP_LOSS_PERCENTAGE': 1.5, 'TAKE_PROFIT_PERCENTAGE': 1.5}, 'MAX_CONCURRENT_OPERATIONS': 10}
+STRATEGY_PROFILES = []
 WIN = {
     'name': 'WIN',
     'emoji': '🟣🟢'
@@ -0,0 +1,210 @@
+# kline_stream.py
+import asyncio
+import json
+import queue
+import threading
+
+import websockets
+
+from logger_module import logger
+
+
+def stream_kline_to_rest(k):
+    """Converts a stream kline payload into the REST futures_klines row layout."""
+    return [
+        k['t'],  # Open time
+        k['o'],  # Open
+        k['h'],  # High
+        k['l'],  # Low
+        k['c'],  # Close
+        k['v'],  # Volume
+        k['T'],  # Close time
+        k['q'],  # Quote asset volume
+        k['n'],  # Number of trades
+        k['V'],  # Taker buy base asset volume
+        k['Q'],  # Taker buy quote asset volume
+        '0',     # Ignore
+    ]
+
+
+class KlineStreamFeed:
+    """Keeps per-symbol candles up to date from combined <symbol>@kline_<interval> streams."""
+
+    def __init__(self, base_url, interval='1m', symbols_per_connection=100, history=30, reconnect_delay=5):
+        """Initializes the feed. Nothing connects until start() is called."""
+        self.base_url = base_url.rstrip('/')
+        self.interval = interval
+        self.symbols_per_connection = max(1, int(symbols_per_connection))
+        self.history = history
+        self.reconnect_delay = reconnect_delay
+        self.closed_candles = queue.Queue()  # (symbol, klines) for every closed candle
+        self.connected_shards = 0
+        self.price_listeners = []  # callback(symbol, price) for every kline update
+        self._candles = {}  # symbol -> list of REST-style kline rows, oldest first
+        self._lock = threading.Lock()
+        self._symbols = []
+        self._loop = None
+        self._thread = None
+        self._main_task = None
+        self._started = threading.Event()  # Set once _loop/_main_task exist (or the thread gave up)
+
+    # --- Candle State ---
+
+    def has_history(self, symbol):
+        """Checks if a symbol already holds a full candle window."""
+        with self._lock:
+            return len(self._candles.get(symbol, ())) >= self.history
+
+    def seed(self, symbol, klines):
+        """Merges REST klines into the symbol state; rows already received from the stream win."""
+        if not klines:
+            return
+        with self._lock:
+            rows = {row[0]: row for row in klines}
+            for row in self._candles.get(symbol, ()):
+                rows[row[0]] = row
+            self._candles[symbol] = [rows[t] for t in sorted(rows)][-self.history:]
+
+    def get_klines(self, symbol):
+        """Returns a copy of the candles held for a symbol (oldest first)."""
+        with self._lock:
+            return list(self._candles.get(symbol, ()))
+
+    def get_closed_candle(self, timeout=1.0):
+        """Returns the next (symbol, klines) pushed by a closed candle, or None on timeout."""
+        try:
+            return self.closed_candles.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def add_price_listener(self, callback):
+        """Registers callback(symbol, price), called on the stream thread for every update; keep it fast."""
+        if callback not in self.price_listeners:
+            self.price_listeners.append(callback)
+
+    def _apply_kline(self, symbol, k):
+        """Upserts a stream kline into the symbol state and queues it if the candle closed."""
+        row = stream_kline_to_rest(k)
+        with self._lock:
+            candles = self._candles.setdefault(symbol, [])
+            if candles and candles[-1][0] == row[0]:
+                candles[-1] = row
+            elif not candles or row[0] > candles[-1][0]:
+                candles.append(row)
+                if len(candles) > self.history:
+                    del candles[:-self.history]
+            else:
+                return  # Out-of-order update for an older candle
+            snapshot = list(candles) if k.get('x') else None
+
+        if self.price_listeners:
+            price = float(k['c'])
+            for callback in self.price_listeners:
+                try:
+                    callback(symbol, price)
+                except Exception as e:
+                    logger.log_message(f"KlineStream: Price listener failed for {symbol}: {e}", "RED")
+
+        if snapshot is not None:
+            self.closed_candles.put((symbol, snapshot))
+
+    def _handle_message(self, raw):
+        """Parses a combined stream frame and applies its kline payload."""
+        try:
+            message = json.loads(raw)
+        except (ValueError, TypeError):
+            logger.log_message(f"KlineStream: Ignoring malformed frame: {raw[:80]!r}", "RED")
+            return
+        data = message.get('data', message)  # Combined streams wrap the event in 'data'
+        if not isinstance(data, dict) or data.get('e') != 'kline':
+            return
+        try:
+            self._apply_kline(data['s'].upper(), data['k'])
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.log_message(f"KlineStream: Invalid kline payload ({e}).", "RED")
+
+    # --- Connection Management ---
+
+    def _shards(self, symbols):
+        """Splits the symbol list into per-connection chunks."""
+        size = self.symbols_per_connection
+        return [symbols[i:i + size] for i in range(0, len(symbols), size)]
+
+    def _shard_url(self, shard):
+        """Builds the combined stream URL for a shard."""
+        streams = '/'.join(f'{symbol.lower()}@kline_{self.interval}' for symbol in shard)
+        return f'{self.base_url}/stream?streams={streams}'
+
+    async def _consume_shard(self, shard_index, shard):
+        """Keeps one connection open for a shard, reconnecting on failures."""
+        url = self._shard_url(shard)
+        while True:
+            try:
+                async with websockets.connect(url, ping_interval=20, ping_timeout=20, max_queue=None) as ws:
+                    self.connected_shards += 1
+                    logger.log_message(f"KlineStream: Shard {shard_index} connected ({len(shard)} symbols).", "GREEN")
+                    try:
+                        async for raw in ws:
+                            self._handle_message(raw)
+                    finally:
+                        self.connected_shards -= 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.log_message(f"KlineStream: Shard {shard_index} disconnected: {e}", "RED")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _run(self, shards):
+        """Runs all shard consumers until cancelled."""
+        self._main_task = asyncio.current_task()
+        self._started.set()
+        await asyncio.gather(*(self._consume_shard(i, shard) for i, shard in enumerate(shards)))
+
+    def _thread_main(self, shards):
+        """Owns the asyncio loop that drives the shard connections."""
+        self._loop = asyncio.new_event_loop()
+        try:
+            self._loop.run_until_complete(self._run(shards))
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.log_message(f"KlineStream: Event loop stopped unexpectedly: {e}", "RED")
+        finally:
+            self._started.set()  # Never leave stop() waiting on a thread that failed early
+            self._loop.close()
+            self._loop = None
+
+    def is_running(self):
+        """Check if the stream thread is alive."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, symbols):
+        """(Re)starts the stream connections for the given symbols, keeping candle state."""
+        self.stop()
+        self._symbols = list(symbols)
+        shards = self._shards(self._symbols)
+        if not shards:
+            logger.log_message("KlineStream: No symbols to subscribe.", "YELLOW")
+            return
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._thread_main, args=(shards,), daemon=True)
+        self._thread.start()
+        logger.log_message(f"KlineStream: Subscribing {len(self._symbols)} symbols over {len(shards)} connections.")
+
+    def stop(self, timeout=5):
+        """Cancels all shard connections and waits for the stream thread."""
+        thread = self._thread
+        if thread is not None:
+            # A thread started just before may not have created its loop and task yet
+            self._started.wait(timeout)
+            loop, task = self._loop, self._main_task
+            if loop is not None and task is not None:
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    pass  # Loop already closed
+            thread.join(timeout)
+            if thread.is_alive():
+                logger.log_message(f"KlineStream: Stream thread did not stop within {timeout}s.", "YELLOW")
+        self._thread = None
+        self._main_task = None
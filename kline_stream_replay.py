@@ -0,0 +1,150 @@
+# kline_stream_replay.py
+# Usage:
+#   python kline_stream_replay.py record <frames_file> <seconds> <SYMBOL> [SYMBOL ...]
+#   python kline_stream_replay.py serve <frames_file> [port] [speed]
+#   python kline_stream_replay.py check <frames_file> [speed]
+# Fake Binance combined-stream server for exercising KlineStreamFeed offline. `record` saves the
+# frames of a live stream (one JSON line [recv_time, raw_frame] each), `serve` replays them to
+# any client on ws://127.0.0.1:<port>/stream?streams=..., keeping the recorded pacing divided by
+# `speed` (0 sends as fast as possible), and `check` runs a KlineStreamFeed against a replay.
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+import websockets
+
+USAGE = ("Usage: python kline_stream_replay.py record <frames_file> <seconds> <SYMBOL> [SYMBOL ...]\n"
+         "       python kline_stream_replay.py serve <frames_file> [port] [speed]\n"
+         "       python kline_stream_replay.py check <frames_file> [speed]")
+
+if len(sys.argv) < 3 or sys.argv[1] not in ('record', 'serve', 'check'):
+    print(USAGE, file=sys.stderr)
+    sys.exit(1)
+
+# The harness arguments must leave argv before config (imported by logger_module) parses it
+command, frames_path, arguments = sys.argv[1], sys.argv[2], sys.argv[3:]
+del sys.argv[1:]
+
+import config  # noqa: E402
+from kline_stream import KlineStreamFeed  # noqa: E402
+
+
+def load_frames(path):
+    """Reads a recorded frames file as a list of (recv_time, raw_frame)."""
+    frames = []
+    with open(path) as file:
+        for line in file:
+            if line.strip():
+                recv_time, raw = json.loads(line)
+                frames.append((recv_time, raw))
+    return frames
+
+
+def frame_stream(raw):
+    """Stream name of a combined-stream frame (e.g. 'btcusdt@kline_1m'), or None."""
+    try:
+        return json.loads(raw).get('stream')
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+async def record(path, seconds, symbols, interval='1m'):
+    """Saves the frames of the live combined stream of `symbols` for `seconds`."""
+    streams = '/'.join(f'{symbol.lower()}@kline_{interval}' for symbol in symbols)
+    url = f"{config.KLINE_STREAM_URL.rstrip('/')}/stream?streams={streams}"
+    count = 0
+    deadline = time.time() + seconds
+    with open(path, 'w') as file:
+        async with websockets.connect(url) as ws:
+            while time.time() < deadline:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=max(0.1, deadline - time.time()))
+                except asyncio.TimeoutError:
+                    break
+                file.write(json.dumps([time.time(), raw]) + '\n')
+                count += 1
+    print(f"Recorded {count} frames to {path}")
+
+
+def make_handler(frames, speed):
+    """Connection handler replaying the frames of the streams a client subscribed to, then closing."""
+    async def handler(ws):
+        request = urlsplit(ws.request.path)
+        requested = set(parse_qs(request.query).get('streams', [''])[0].split('/'))
+        previous = None
+        for recv_time, raw in frames:
+            if frame_stream(raw) not in requested:
+                continue
+            if speed and previous is not None:
+                await asyncio.sleep(max(0.0, recv_time - previous) / speed)
+            previous = recv_time
+            await ws.send(raw)
+    return handler
+
+
+async def serve(frames, port, speed, ready=None):
+    """Serves the frames on 127.0.0.1:port (0 picks a free port) until cancelled."""
+    async with websockets.serve(make_handler(frames, speed), '127.0.0.1', port) as server:
+        port = server.sockets[0].getsockname()[1]
+        print(f"Replaying {len(frames)} frames on ws://127.0.0.1:{port}")
+        if ready is not None:
+            ready.set_result(port)
+        await asyncio.Future()
+
+
+async def check(frames, speed):
+    """Runs a KlineStreamFeed against a replay of the frames and prints what it received."""
+    streams = [frame_stream(raw) for _, raw in frames]
+    symbols = sorted({stream.split('@')[0].upper() for stream in streams if stream})
+    ready = asyncio.get_running_loop().create_future()
+    server = asyncio.create_task(serve(frames, 0, speed, ready))
+    port = await ready
+
+    updates = {}
+    feed = KlineStreamFeed(f'ws://127.0.0.1:{port}', reconnect_delay=3600)  # One pass over the recording
+    feed.add_price_listener(lambda symbol, price: updates.__setitem__(symbol, updates.get(symbol, 0) + 1))
+    feed.start(symbols)
+    expected = sum(1 for stream in streams if stream)
+    deadline = time.time() + (frames[-1][0] - frames[0][0]) / speed + 10 if speed and frames else time.time() + 10
+    while sum(updates.values()) < expected and time.time() < deadline:
+        await asyncio.sleep(0.1)
+    feed.stop()
+    server.cancel()
+
+    closed = {}
+    while not feed.closed_candles.empty():
+        symbol, _ = feed.closed_candles.get()
+        closed[symbol] = closed.get(symbol, 0) + 1
+    print(f"Applied {sum(updates.values())}/{expected} kline frames")
+    for symbol in symbols:
+        klines = feed.get_klines(symbol)
+        last_close = klines[-1][4] if klines else None
+        print(f"{symbol}: {updates.get(symbol, 0)} updates, {closed.get(symbol, 0)} closed candles, "
+              f"{len(klines)} held, last close {last_close}")
+    return sum(updates.values()) == expected
+
+
+def main():
+    """Dispatches the record/serve/check commands."""
+    if command == 'record':
+        if len(arguments) < 2:
+            print(USAGE, file=sys.stderr)
+            sys.exit(1)
+        asyncio.run(record(frames_path, float(arguments[0]), arguments[1:]))
+    elif command == 'serve':
+        port = int(arguments[0]) if arguments else 9443
+        speed = float(arguments[1]) if len(arguments) > 1 else 1.0
+        try:
+            asyncio.run(serve(load_frames(frames_path), port, speed))
+        except KeyboardInterrupt:
+            pass
+    else:
+        speed = float(arguments[0]) if arguments else 0.0
+        if not asyncio.run(check(load_frames(frames_path), speed)):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
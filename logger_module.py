@@ -4,12 +4,27 @@ import threading
 import os
 import time
 import json
+import atexit
+import itertools
+from collections import deque, namedtuple
 from colorama import Fore, init
 
 init(autoreset=True) # Initialize colorama
 
+# Log levels, ordered by severity; colors imply a level when none is given
+LOG_LEVELS = {"DEBUG": 10, "INFO": 20, "WARNING": 30, "ERROR": 40}
+COLOR_LEVELS = {"RED": "ERROR", "YELLOW": "WARNING"}
+
+LogRecord = namedtuple('LogRecord', 'seq timestamp level color message')
+
+
 class SharedLogger:
-    """Handles console logging with colors and stores logs for web UI."""
+    """Handles console logging with colors and stores logs for web UI.
+
+    Stored logs live in a fixed-capacity deque of LogRecord tuples (oldest dropped first).
+    Storing a line is one counter step and one deque append, both atomic under the GIL, so
+    logging threads never take a lock; readers copy the deque in one C-level call.
+    """
     _instance = None
     _lock = threading.Lock()
 
@@ -21,8 +36,9 @@ class SharedLogger:
             return cls._instance
 
     def _initialize(self, max_queue_size=1000):
-        """Initializes the log queue and colors."""
-        self.log_messages = queue.Queue(maxsize=max_queue_size)
+        """Initializes the log ring and colors."""
+        self.records = deque(maxlen=max_queue_size)
+        self._seq = itertools.count(1)
         self.web_colors = { # CSS Colors for web UI
             "GREEN": "color: green;",
             "RED": "color: red;",
@@ -42,33 +58,54 @@ class SharedLogger:
         """Gets the CSS style for a color name."""
         return self.web_colors.get(color_name.upper(), self.web_colors["default"])
 
-    def log_message(self, message, color="default"):
+    @property
+    def last_seq(self):
+        """Sequence number of the newest stored message (0 when empty)."""
+        records = self.records
+        return records[-1].seq if records else 0
+
+    def first_seq(self):
+        """Sequence number of the oldest stored message (last_seq + 1 when empty)."""
+        records = tuple(self.records)
+        return records[0].seq if records else self.last_seq + 1
+
+    def store_message(self, message, color="default", level=None):
+        """Stores a message for the web UI without printing it. Returns its sequence number."""
+        seq = next(self._seq)
+        self.records.append(LogRecord(seq, time.time(), level or COLOR_LEVELS.get(color.upper(), "INFO"), color, message))
+        return seq
+
+    def log_message(self, message, color="default", level=None):
         """Logs a message to console (if enabled) and stores for web UI."""
-        upper_color = color.upper()
-        # Store message and original color name for potential web use
-        if self.log_messages.full():
-            try:
-                self.log_messages.get_nowait() # Remove oldest if full
-            except queue.Empty:
-                pass
-        self.log_messages.put((message, color)) # Store with original case color name
+        self.store_message(message, color, level)
 
         # Print to console if enabled
         if self._log_to_console:
-            console_color = self.console_colors.get(upper_color, self.console_colors["default"])
+            console_color = self.console_colors.get(color.upper(), self.console_colors["default"])
             print(f"{console_color}{message}")
 
+    def get_records(self, since_seq=0, min_level=None, start_time=None, end_time=None, limit=None):
+        """Stored LogRecords, oldest first, filtered by sequence, minimum level and time range."""
+        records = tuple(self.records) # Atomic copy
+        min_rank = LOG_LEVELS[min_level.upper()] if min_level else None
+        selected = [
+            record for record in records
+            if record.seq > since_seq
+            and (min_rank is None or LOG_LEVELS.get(record.level, 0) >= min_rank)
+            and (start_time is None or record.timestamp >= start_time)
+            and (end_time is None or record.timestamp < end_time)
+        ]
+        return selected[-limit:] if limit else selected
+
     def get_all_logs_for_web(self):
         """Retrieves all logs formatted for the web UI."""
-        messages = []
-        # Safely copy queue contents without blocking producers too long
-        with self._lock:
-            temp_storage = list(self.log_messages.queue)
+        # Show newest first typically
+        return [(record.message, self.get_web_color_style(record.color)) for record in reversed(self.get_records())]
 
-        for msg, color_name in reversed(temp_storage): # Show newest first typically
-            color_style = self.get_web_color_style(color_name)
-            messages.append((msg, color_style))
-        return messages # Returns list of (message, css_style)
+    def get_logs_since(self, seq):
+        """(seq, message, css_style) of the stored logs newer than `seq`, oldest first."""
+        return [(record.seq, record.message, self.get_web_color_style(record.color))
+                for record in self.get_records(since_seq=seq)]
 
 # --- File Logging Functions ---
 
@@ -92,9 +129,152 @@ def _get_operation_filename(log_path, operation_type_name, tick, entry_price, st
     filename = f"{status_prefix}{operation_type_name}-{tick}-{sufix}.txt"
     return os.path.join(log_path, filename)
 
+class OperationLogWriter:
+    """Writes the per-operation .txt logs on a background thread.
+
+    Callers only format the lines and enqueue them (bounded queue, so a stalled disk applies
+    backpressure instead of growing memory). The writer keeps the files of active operations
+    open, writes whatever is queued as one batch with a single flush per file, and does the
+    finalize/rename off the trading threads. close() drains the queue before returning.
+    """
+
+    def __init__(self, max_queue_size=10000, batch_size=500):
+        """Initializes the writer; the thread starts with the first queued write."""
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._handles = {}  # filepath -> open file of an active operation
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        """Starts the writer thread once."""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='operation-log-writer', daemon=True)
+                    self._thread.start()
+
+    def submit(self, action, filepath, payload=None):
+        """Queues a 'start', 'progress' or 'finalize' write."""
+        self._ensure_started()
+        self._queue.put((action, filepath, payload))
+
+    def queue_size(self):
+        """Writes waiting for the writer thread."""
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far has been written."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', None, done))
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Writes everything still queued and closes the open files (call on shutdown)."""
+        if self._thread is None:
+            return
+        self._queue.put(('stop', None, None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        """Writer loop: takes one item, then drains up to batch_size more before flushing."""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            touched = set()
+            for action, filepath, payload in batch:
+                if action == 'stop':
+                    stop = True
+                elif action == 'flush':
+                    self._flush(touched)
+                    touched.clear()
+                    payload.set()
+                else:
+                    try:
+                        getattr(self, f'_write_{action}')(filepath, payload, touched)
+                    except Exception as e:
+                        logger.log_message(f"Unexpected error writing operation log {filepath}: {e}", "RED")
+            self._flush(touched)
+
+            if stop:
+                for file in self._handles.values():
+                    file.close()
+                self._handles.clear()
+                return
+
+    def _flush(self, filepaths):
+        """Flushes the files written in the current batch."""
+        for filepath in filepaths:
+            file = self._handles.get(filepath)
+            if file is not None:
+                try:
+                    file.flush()
+                except IOError as e:
+                    logger.log_message(f"I/O error flushing operation log {filepath}: {e}", "RED")
+
+    def _write_start(self, filepath, text, touched):
+        """Creates the operation log and keeps it open."""
+        try:
+            old = self._handles.pop(filepath, None)
+            if old is not None:
+                old.close()
+            file = open(filepath, 'w')
+            file.write(text)
+            self._handles[filepath] = file
+            touched.add(filepath)
+        except IOError as e:
+            logger.log_message(f"I/O error creating operation log {filepath}: {e}", "RED")
+
+    def _write_progress(self, filepath, line, touched):
+        """Appends one progress line (skipped if the log could not be created)."""
+        file = self._handles.get(filepath)
+        if file is None:
+            if not os.path.exists(filepath):
+                return
+            file = self._handles[filepath] = open(filepath, 'a')
+        try:
+            file.write(line)
+            touched.add(filepath)
+        except IOError as e:
+            logger.log_message(f"I/O error appending progress to {filepath}: {e}", "RED")
+
+    def _write_finalize(self, filepath, payload, touched):
+        """Appends the final status, closes the file and renames it with the status prefix."""
+        text, final_filepath = payload
+        touched.discard(filepath)
+        file = self._handles.pop(filepath, None)
+        if file is None and not os.path.exists(filepath):
+            logger.log_message(f"Warning: Cannot finalize - log file not found: {filepath}", "RED")
+            return
+        try:
+            if file is None:
+                file = open(filepath, 'a')
+            file.write(text)
+            file.close()
+            os.rename(filepath, final_filepath)
+            logger.log_message(f"Finalized and renamed log: {final_filepath}")
+        except IOError as e:
+            logger.log_message(f"I/O error finalizing/renaming log {filepath} to {final_filepath}: {e}", "RED")
+            # Attempt to write failure note in original file if rename fails
+            try:
+                with open(filepath, 'a') as fallback:
+                    fallback.write(f'\n--- RENAME FAILED to {final_filepath} ---\n')
+            except Exception:
+                pass # Ignore errors during fallback logging
+
+
 def log_operation_start(log_path, pin, trading_params, operation_details):
-    """Writes the initial log file for a new operation."""
-    if not config.ACTIVE_LOG:
+    """Queues the initial log file for a new operation."""
+    if not (config.ACTIVE_LOG and config.OPERATION_TEXT_LOGS):
         return
 
     tick = operation_details['tick']
@@ -105,31 +285,27 @@ def log_operation_start(log_path, pin, trading_params, operation_details):
 
     filepath = _get_operation_filename(log_path, op_type["name"], tick, entry_price)
 
-    try:
-        with open(filepath, 'w') as file:
-            file.write(f'PIN: {pin}\n')
-            # Write trading parameters used for this operation
-            for key, value in trading_params.items():
-                file.write(f'{key}: {value}%\n')
-            file.write('-----------------\n')
-            file.write(f'{op_type.get("emoji","?")}{op_type["name"]}: {tick}\n')
-            file.write(f'Hour: {time.strftime("%H:%M:%S")}\n')
-            file.write(f'EntryPrice: {entry_price}\n')
-            file.write(f'TakeProfit: {tp}\n')
-            file.write(f'StopLoss: {sl}\n')
-            file.write('-----------------\n')
-            # Add header for progress logs
-            file.write('Timestamp;EntryPrice;CurrentPrice;Difference%\n')
-
-    except IOError as e:
-        logger.log_message(f"I/O error creating operation log {filepath}: {e}", "RED")
-    except Exception as e:
-        logger.log_message(f"Unexpected error writing operation log {filepath}: {e}", "RED")
+    lines = [f'PIN: {pin}\n']
+    # Write trading parameters used for this operation
+    for key, value in trading_params.items():
+        lines.append(f'{key}: {value}%\n')
+    lines += [
+        '-----------------\n',
+        f'{op_type.get("emoji","?")}{op_type["name"]}: {tick}\n',
+        f'Hour: {time.strftime("%H:%M:%S")}\n',
+        f'EntryPrice: {entry_price}\n',
+        f'TakeProfit: {tp}\n',
+        f'StopLoss: {sl}\n',
+        '-----------------\n',
+        # Add header for progress logs
+        'Timestamp;EntryPrice;CurrentPrice;Difference%\n',
+    ]
+    operation_log_writer.submit('start', filepath, ''.join(lines))
 
 
 def log_operation_progress(log_path, operation_details, current_price, difference):
-    """Appends the current progress of an operation to its log file."""
-    if not config.ACTIVE_LOG:
+    """Queues the current progress of an operation for its log file."""
+    if not (config.ACTIVE_LOG and config.OPERATION_TEXT_LOGS):
         return
 
     tick = operation_details['tick']
@@ -137,24 +313,13 @@ def log_operation_progress(log_path, operation_details, current_price, differenc
     entry_price = operation_details['entry_price']
 
     filepath = _get_operation_filename(log_path, op_type["name"], tick, entry_price)
+    # The timestamp is taken now, not when the writer gets to it
+    operation_log_writer.submit('progress', filepath, f'{time.strftime("%H:%M:%S")};{entry_price};{current_price};{difference}%\n')
 
-    # Check if file exists, might not if initial creation failed
-    if not os.path.exists(filepath):
-        # Optionally log this warning, or attempt to recreate header?
-        # logger.log_message(f"Warning: Progress log file not found, cannot append: {filepath}", "RED")
-        return
-
-    try:
-        with open(filepath, 'a') as file:
-            file.write(f'{time.strftime("%H:%M:%S")};{entry_price};{current_price};{difference}%\n')
-    except IOError as e:
-        logger.log_message(f"I/O error appending progress to {filepath}: {e}", "RED")
-    except Exception as e:
-        logger.log_message(f"Unexpected error appending progress to {filepath}: {e}", "RED")
 
 def finalize_operation_log(log_path, operation_details, final_status, current_price, final_difference):
-    """Appends final status to the log file and renames it with the status prefix."""
-    if not config.ACTIVE_LOG:
+    """Queues the final status of an operation; the writer appends it and renames the file with the status prefix."""
+    if not (config.ACTIVE_LOG and config.OPERATION_TEXT_LOGS):
         return
 
     tick = operation_details['tick']
@@ -164,38 +329,18 @@ def finalize_operation_log(log_path, operation_details, final_status, current_pr
     original_filepath = _get_operation_filename(log_path, op_type["name"], tick, entry_price)
     final_filepath = _get_operation_filename(log_path, op_type["name"], tick, entry_price, status_prefix=f"{final_status}-")
 
-    if not os.path.exists(original_filepath):
-        logger.log_message(f"Warning: Cannot finalize - log file not found: {original_filepath}", "RED")
-        return
+    text = (
+        '-----------------\n'
+        f'FINAL STATUS: {final_status}\n'
+        f'Final Price: {current_price}\n'
+        f'Final Difference: {final_difference}%\n'
+        f'End Time: {time.strftime("%H:%M:%S")}\n'
+    )
+    operation_log_writer.submit('finalize', original_filepath, (text, final_filepath))
 
-    try:
-        # Append final status
-        with open(original_filepath, 'a') as file:
-            file.write('-----------------\n')
-            file.write(f'FINAL STATUS: {final_status}\n')
-            file.write(f'Final Price: {current_price}\n')
-            file.write(f'Final Difference: {final_difference}%\n')
-            file.write(f'End Time: {time.strftime("%H:%M:%S")}\n')
-
-        # Rename the file
-        time.sleep(0.1) # Small delay before rename, might help on some systems
-        os.rename(original_filepath, final_filepath)
-        logger.log_message(f"Finalized and renamed log: {final_filepath}")
 
-    except IOError as e:
-        logger.log_message(f"I/O error finalizing/renaming log {original_filepath} to {final_filepath}: {e}", "RED")
-        # Attempt to write failure note in original file if rename fails
-        try:
-            with open(original_filepath, 'a') as file:
-                file.write(f'\n--- RENAME FAILED to {final_filepath} ---\n')
-        except Exception:
-            pass # Ignore errors during fallback logging
-    except Exception as e:
-        logger.log_message(f"Unexpected error finalizing/renaming log {original_filepath}: {e}", "RED")
-
-
-def log_results_to_json(log_path, pin, results_summary, stats):
-    """Saves the aggregated results and statistics to a JSON file."""
+def log_results_to_json(log_path, pin, results_summary, stats, version=None):
+    """Saves the aggregated results and statistics to a JSON file atomically (temp file + os.replace)."""
     if not config.ACTIVE_LOG:
         return
 
@@ -206,12 +351,17 @@ def log_results_to_json(log_path, pin, results_summary, stats):
         "results_summary": results_summary,
         "stats": stats,
     }
+    if version is not None:
+        output_data["version"] = version
 
+    temp_filepath = f'{filepath}.tmp'
     try:
         # Ensure directory exists (might be redundant if setup_file_logging was called)
         os.makedirs(log_path, exist_ok=True)
-        with open(filepath, 'w') as file:
+        with open(temp_filepath, 'w') as file:
             json.dump(output_data, file, indent=2)
+        # Readers see either the previous file or the new one, never a partial write
+        os.replace(temp_filepath, filepath)
         # logger.log_message(f"Results saved to {filepath}") # Optional: log success
     except IOError as e:
         logger.log_message(f"I/O error saving results to {filepath}: {e}", "RED")
@@ -221,8 +371,91 @@ def log_results_to_json(log_path, pin, results_summary, stats):
         logger.log_message(f"Unexpected error saving results.json: {e}", "RED")
 
 
+def _read_results_version(log_path):
+    """Version stored in an existing results.json (0 if none)."""
+    try:
+        with open(os.path.join(log_path, 'results.json')) as file:
+            return int(json.load(file).get('version', 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return 0
+
+
+class ResultsPersister:
+    """Coalesces results.json updates and writes them from a background thread.
+
+    Every submit replaces the pending snapshot of its log path; the writer waits
+    `debounce` seconds after the first pending update before writing, so a burst of exits
+    costs one write per path. Each write carries a version that only ever increases.
+    """
+
+    def __init__(self, debounce=2.0):
+        """Initializes the persister; the thread starts with the first submit."""
+        self.debounce = debounce
+        self._cond = threading.Condition()
+        self._pending = {}  # log_path -> (pin, results_summary, stats)
+        self._versions = {}  # log_path -> last written version
+        self._writing = False
+        self._flush_requested = False
+        self._thread = None
+
+    def submit(self, log_path, pin, results_summary, stats):
+        """Schedules a results.json write with a copy of the given state."""
+        if not config.ACTIVE_LOG:
+            return
+        snapshot = {status: dict(counts) for status, counts in results_summary.items()}
+        with self._cond:
+            self._pending[log_path] = (pin, snapshot, dict(stats))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='results-persister', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def flush(self, timeout=10):
+        """Writes every pending update now and waits until it is on disk."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while (self._pending or self._writing) and self._thread is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._flush_requested = True  # Skip the rest of the debounce window
+                self._cond.notify_all()
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self):
+        """Writer loop: waits for updates, lets them coalesce, then writes the latest ones."""
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Debounce window: later submits overwrite the pending snapshot
+                deadline = time.time() + self.debounce
+                while not self._flush_requested and time.time() < deadline:
+                    self._cond.wait(deadline - time.time())
+                self._flush_requested = False
+                pending, self._pending = self._pending, {}
+                self._writing = True
+
+            for log_path, (pin, results_summary, stats) in pending.items():
+                if log_path not in self._versions:
+                    self._versions[log_path] = _read_results_version(log_path)
+                self._versions[log_path] += 1
+                log_results_to_json(log_path, pin, results_summary, stats, version=self._versions[log_path])
+
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+
 # --- Initialization ---
 import config
 
 # Create the shared logger instance
 logger = SharedLogger()
+# Background writer for the per-operation log files (flushed on exit)
+operation_log_writer = OperationLogWriter()
+atexit.register(operation_log_writer.close)
+# Debounced results.json writer (flushed on exit)
+results_persister = ResultsPersister(debounce=config.RESULTS_DEBOUNCE)
+atexit.register(results_persister.flush)
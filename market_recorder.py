@@ -0,0 +1,324 @@
+# market_recorder.py
+import os
+import sys
+import threading
+import time
+from array import array
+
+import numpy as np
+
+from logger_module import logger
+from rate_limiter import RequestScheduler, PRIORITY_HIGH, PRIORITY_LOW
+
+# Column layout of the recorded tables: one append-only file per column, little-endian
+KLINE_COLUMNS = (
+    ('recv_time', 'd', '<f8'),   # time.time() when the response was received
+    ('symbol', 'I', '<u4'),      # Line index in symbols.txt
+    ('open_time', 'q', '<i8'),
+    ('open', 'd', '<f8'),
+    ('high', 'd', '<f8'),
+    ('low', 'd', '<f8'),
+    ('close', 'd', '<f8'),
+    ('volume', 'd', '<f8'),
+    ('quote_volume', 'd', '<f8'),
+)
+TICKER_COLUMNS = (
+    ('recv_time', 'd', '<f8'),
+    ('symbol', 'I', '<u4'),
+    ('last_price', 'd', '<f8'),
+    ('quote_volume', 'd', '<f8'),
+)
+SYMBOLS_FILE = 'symbols.txt'
+KLINE_INTERVAL_MS = 60_000
+
+
+def _column_path(session_dir, table, column):
+    """Path of one column file, e.g. klines.close.bin."""
+    return os.path.join(session_dir, f'{table}.{column}.bin')
+
+
+class MarketDataRecorder:
+    """Appends every kline and ticker response to compact columnar files for one session."""
+
+    def __init__(self, session_dir):
+        """Opens (or continues) the column files under session_dir."""
+        self.session_dir = session_dir
+        self._lock = threading.Lock()
+        self._symbol_ids = {}
+        self._files = {}
+        os.makedirs(session_dir, exist_ok=True)
+        symbols_path = os.path.join(session_dir, SYMBOLS_FILE)
+        if os.path.exists(symbols_path):
+            with open(symbols_path) as file:
+                for line in file:
+                    self._symbol_ids[line.strip()] = len(self._symbol_ids)
+        self._symbols_file = open(symbols_path, 'a')
+        for table, columns in (('klines', KLINE_COLUMNS), ('tickers', TICKER_COLUMNS)):
+            for name, _, _ in columns:
+                self._files[(table, name)] = open(_column_path(session_dir, table, name), 'ab')
+        logger.log_message(f"Market data recording to {session_dir}")
+
+    def _symbol_id(self, symbol):
+        """Returns the numeric id of a symbol, registering it if new (lock held)."""
+        symbol_id = self._symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = self._symbol_ids[symbol] = len(self._symbol_ids)
+            self._symbols_file.write(f'{symbol}\n')
+            self._symbols_file.flush()
+        return symbol_id
+
+    def _append(self, table, columns, values):
+        """Writes one typed array per column and flushes them, so a crash loses at most this batch (lock held)."""
+        for (name, typecode, _), column_values in zip(columns, values):
+            data = array(typecode, column_values)
+            if sys.byteorder != 'little':
+                data.byteswap()
+            self._files[(table, name)].write(data.tobytes())
+        for name, _, _ in columns:
+            self._files[(table, name)].flush()
+
+    def record_klines(self, symbol, klines):
+        """Records a futures_klines response (REST row layout)."""
+        if not klines:
+            return
+        recv_time = time.time()
+        try:
+            rows = [(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]), float(k[7])) for k in klines]
+        except (IndexError, ValueError, TypeError) as e:
+            logger.log_message(f"Recorder: Skipping malformed klines for {symbol}: {e}", "RED")
+            return
+        with self._lock:
+            symbol_id = self._symbol_id(symbol)
+            columns = list(zip(*rows))
+            self._append('klines', KLINE_COLUMNS, [[recv_time] * len(rows), [symbol_id] * len(rows)] + columns)
+
+    def record_tickers(self, tickers):
+        """Records one or many 24h ticker dicts."""
+        if not tickers:
+            return
+        recv_time = time.time()
+        rows = []
+        for ticker in tickers:
+            try:
+                rows.append((ticker['symbol'], float(ticker['lastPrice']), float(ticker['quoteVolume'])))
+            except (KeyError, ValueError, TypeError):
+                continue
+        if not rows:
+            return
+        with self._lock:
+            ids = [self._symbol_id(symbol) for symbol, _, _ in rows]
+            self._append('tickers', TICKER_COLUMNS, [[recv_time] * len(rows), ids,
+                                                     [r[1] for r in rows], [r[2] for r in rows]])
+
+    def flush(self):
+        """Flushes all column files."""
+        with self._lock:
+            for file in self._files.values():
+                file.flush()
+
+    def close(self):
+        """Flushes and closes all column files."""
+        with self._lock:
+            for file in self._files.values():
+                file.close()
+            self._files = {}
+            self._symbols_file.close()
+
+
+class MarketDataReplay:
+    """Memory-maps a recorded session; column reads are zero-copy views of the files."""
+
+    def __init__(self, session_dir):
+        """Maps every column file and indexes the rows by symbol."""
+        self.session_dir = session_dir
+        with open(os.path.join(session_dir, SYMBOLS_FILE)) as file:
+            self.symbols = [line.strip() for line in file if line.strip()]
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.klines = self._map_table('klines', KLINE_COLUMNS)
+        self.tickers = self._map_table('tickers', TICKER_COLUMNS)
+        # Rows sorted by (symbol, open_time, recv_time): per-symbol candles, newest version last
+        self._kline_order = np.lexsort((self.klines['recv_time'], self.klines['open_time'], self.klines['symbol']))
+        self._kline_bounds = np.searchsorted(self.klines['symbol'][self._kline_order], np.arange(len(self.symbols) + 1))
+        self._ticker_order = np.argsort(self.tickers['recv_time'], kind='stable')
+
+    def _map_table(self, table, columns):
+        """np.memmap per column, all cut to the shortest column (rows fully written in every column)."""
+        paths = {name: _column_path(self.session_dir, table, name) for name, _, _ in columns}
+        rows = min((os.path.getsize(p) // np.dtype(dtype).itemsize if os.path.exists(p) else 0)
+                   for (name, _, dtype), p in zip(columns, paths.values()))
+        mapped = {}
+        for name, _, dtype in columns:
+            if rows:
+                mapped[name] = np.memmap(paths[name], dtype=dtype, mode='r', shape=(rows,))
+            else:
+                mapped[name] = np.empty(0, dtype=dtype)
+        return mapped
+
+    def time_range(self):
+        """(first, last) recv_time of the session."""
+        times = np.concatenate((self.klines['recv_time'][:1], self.klines['recv_time'][-1:],
+                                self.tickers['recv_time'][:1], self.tickers['recv_time'][-1:]))
+        return (float(times.min()), float(times.max())) if times.size else (0.0, 0.0)
+
+    def candles(self, symbol, until=None):
+        """Latest known version of every candle of a symbol, as row indices sorted by open time."""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            return np.empty(0, dtype=np.int64)
+        rows = self._kline_order[self._kline_bounds[symbol_id]:self._kline_bounds[symbol_id + 1]]
+        if until is not None:
+            rows = rows[self.klines['recv_time'][rows] <= until]
+        if rows.size == 0:
+            return rows
+        open_times = self.klines['open_time'][rows]
+        last_version = np.append(open_times[1:] != open_times[:-1], True)
+        return rows[last_version]
+
+    def _ticker_dict(self, row):
+        """Ticker row in the futures_ticker() dict layout."""
+        return {
+            'symbol': self.symbols[self.tickers['symbol'][row]],
+            'lastPrice': str(self.tickers['last_price'][row]),
+            'quoteVolume': str(self.tickers['quote_volume'][row]),
+        }
+
+    def tickers_at(self, until=None):
+        """The most recent ticker of every symbol recorded at or before `until`."""
+        rows = self._ticker_order
+        if until is not None:
+            rows = rows[:np.searchsorted(self.tickers['recv_time'][rows], until, side='right')]
+        newest_first = rows[::-1]
+        _, first_seen = np.unique(self.tickers['symbol'][newest_first], return_index=True)
+        return [self._ticker_dict(row) for row in newest_first[first_seen]]
+
+    def iter_evaluation_windows(self, window=30):
+        """Yields (recv_time, symbol, closes) for every recorded kline response, in time order.
+
+        closes holds the window the scanner evaluated: the closed candles before the response's
+        newest candle plus that candle as it was seen live (it was still open at the time).
+        """
+        k = self.klines
+        order = np.lexsort((k['open_time'], k['recv_time'], k['symbol']))
+        symbol_sorted, recv_sorted = k['symbol'][order], k['recv_time'][order]
+        # Last row of each (symbol, recv_time) response is the live candle
+        response_end = np.append((symbol_sorted[1:] != symbol_sorted[:-1]) | (recv_sorted[1:] != recv_sorted[:-1]), True)
+        live_rows = order[response_end]
+        live_rows = live_rows[np.argsort(k['recv_time'][live_rows], kind='stable')]
+
+        finals = {}
+        for row in live_rows:
+            symbol_id = int(k['symbol'][row])
+            if symbol_id not in finals:
+                rows = self.candles(self.symbols[symbol_id])
+                finals[symbol_id] = (k['open_time'][rows], k['close'][rows])
+            open_times, closes = finals[symbol_id]
+            position = int(np.searchsorted(open_times, k['open_time'][row]))
+            history = closes[max(0, position - (window - 1)):position]
+            yield float(k['recv_time'][row]), self.symbols[symbol_id], np.append(history, k['close'][row])
+
+
+class ReplayBinanceService:
+    """Serves a recorded session through the BinanceService interface, at a movable replay clock."""
+
+    def __init__(self, session_dir):
+        """Opens the session; the clock starts at the end so every record is visible."""
+        self.replay = MarketDataReplay(session_dir)
+        self.clock = self.replay.time_range()[1]
+        self.scheduler = RequestScheduler()  # Keeps get_rate_limit_usage() working
+        self.kline_stream = None
+        self.recorder = None
+        logger.log_message(f"Replaying market data from {session_dir} ({len(self.replay.symbols)} symbols).", "GREEN")
+
+    def set_clock(self, timestamp):
+        """Moves the replay clock; only data recorded up to it is served."""
+        self.clock = timestamp
+
+    def is_connected(self):
+        """The replay backend is always available."""
+        return True
+
+    def get_rate_limit_usage(self):
+        """Request-weight usage (always idle in replay)."""
+        return self.scheduler.usage()
+
+    def get_futures_exchange_info(self):
+        """exchangeInfo is not recorded."""
+        return None
+
+    def get_usdt_futures_symbols(self):
+        """Symbols seen in the recording."""
+        return [s for s in self.replay.symbols if s.endswith('USDT')]
+
+    def get_symbol_metadata(self, symbol):
+        """Symbol metadata is not recorded."""
+        return None
+
+    def get_futures_klines(self, symbol, interval=None, limit=30, priority=PRIORITY_LOW, start_time=None):
+        """Returns the last `limit` candles known at the replay clock (or the first ones from start_time), in REST row layout."""
+        k = self.replay.klines
+        rows = self.replay.candles(symbol, until=self.clock)
+        if start_time is not None:
+            rows = [r for r in rows if k['open_time'][r] >= start_time][:limit]
+        else:
+            rows = rows[-limit:]
+        return [
+            [int(k['open_time'][r]), float(k['open'][r]), float(k['high'][r]), float(k['low'][r]),
+             float(k['close'][r]), float(k['volume'][r]), int(k['open_time'][r]) + KLINE_INTERVAL_MS - 1,
+             float(k['quote_volume'][r]), 0, 0.0, 0.0, '0']
+            for r in rows
+        ]
+
+    def iter_futures_klines(self, symbols, interval=None, limit=30, max_workers=None, limits=None, profile_cycle=None,
+                            start_times=None):
+        """Yields (symbol, klines) for every symbol."""
+        limits = limits or {}
+        start_times = start_times or {}
+        for symbol in symbols:
+            yield symbol, self.get_futures_klines(symbol, limit=limits.get(symbol, limit), start_time=start_times.get(symbol))
+
+    def get_futures_ticker_info(self, symbol, priority=PRIORITY_HIGH):
+        """Returns the last recorded ticker of a symbol at the replay clock."""
+        for ticker in self.replay.tickers_at(self.clock):
+            if ticker['symbol'] == symbol:
+                return ticker
+        return None
+
+    def get_all_futures_tickers(self, priority=PRIORITY_LOW):
+        """Returns the last recorded ticker of every symbol at the replay clock."""
+        return self.replay.tickers_at(self.clock)
+
+    def start_kline_stream(self, symbols, history=30):
+        """Streaming is not available while replaying."""
+        logger.log_message("Replay: Kline stream mode is not supported, use the REST scanner.", "RED")
+        return None
+
+
+def replay_session(session_dir, evaluate, snapshot=None, window=30, service=None):
+    """Pushes every recorded scanner window through `evaluate(tick, closes)` offline.
+
+    If a MarketSnapshot is given it is reloaded with the tickers known at each step, so
+    volume checks see what the live bot saw. A ReplayBinanceService `service` has its clock
+    moved to each window, so requests made while evaluating (including snapshot refreshes)
+    only see data recorded up to then. Returns the number of windows evaluated.
+    """
+    replay = MarketDataReplay(session_dir)
+    ticker_rows = replay._ticker_order
+    ticker_times = replay.tickers['recv_time'][ticker_rows]
+    latest_tickers = {}
+    next_ticker = 0
+    evaluated = 0
+    for recv_time, symbol, closes in replay.iter_evaluation_windows(window):
+        if service is not None:
+            service.set_clock(recv_time)
+        if snapshot is not None and next_ticker < ticker_rows.size and ticker_times[next_ticker] <= recv_time:
+            # Advance incrementally: every ticker row is visited once over the whole replay
+            stop = int(np.searchsorted(ticker_times, recv_time, side='right'))
+            for row in ticker_rows[next_ticker:stop]:
+                ticker = replay._ticker_dict(row)
+                latest_tickers[ticker['symbol']] = ticker
+            next_ticker = stop
+            snapshot.load(list(latest_tickers.values()))
+        evaluate(symbol, closes)
+        evaluated += 1
+    return evaluated
+
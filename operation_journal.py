@@ -0,0 +1,257 @@
+# operation_journal.py
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+from logger_module import logger
+import config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS operations (
+    op_key TEXT PRIMARY KEY,
+    pin TEXT NOT NULL,
+    profile TEXT,
+    tick TEXT NOT NULL,
+    type TEXT NOT NULL,
+    entry_price REAL NOT NULL,
+    tp REAL,
+    sl REAL,
+    start_time REAL NOT NULL,
+    status TEXT NOT NULL,
+    final_price REAL,
+    final_difference REAL,
+    end_time REAL,
+    trading_params TEXT
+);
+CREATE TABLE IF NOT EXISTS progress (
+    op_key TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    price REAL NOT NULL,
+    difference REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_operations_tick ON operations (tick);
+CREATE INDEX IF NOT EXISTS idx_operations_type ON operations (type);
+CREATE INDEX IF NOT EXISTS idx_operations_status ON operations (status);
+CREATE INDEX IF NOT EXISTS idx_operations_start_time ON operations (start_time);
+CREATE INDEX IF NOT EXISTS idx_operations_pin ON operations (pin);
+CREATE INDEX IF NOT EXISTS idx_progress_op_key ON progress (op_key, timestamp);
+"""
+
+# Grouping expressions accepted by OperationJournal.efficiency
+GROUP_BY = {
+    'type': 'type',
+    'tick': 'tick',
+    'hour': "strftime('%H', start_time, 'unixepoch', 'localtime')",
+    'profile': 'profile',
+    'pin': 'pin',
+}
+
+
+def operation_key(pin, operation_data):
+    """Journal key of an operation: unique per PIN, tick and start time."""
+    return f"{pin}|{operation_data['tick']}|{operation_data['start_time']!r}"
+
+
+class OperationJournal:
+    """Append-only SQLite journal of operation starts, progress ticks and finalizations.
+
+    Writes are queued and committed in batches by a single writer thread (one transaction
+    per `commit_interval` at most). The database runs in WAL mode, so queries from other
+    threads or processes read committed data without blocking the writer.
+    """
+
+    def __init__(self, db_path, commit_interval=1.0, batch_size=500, max_queue_size=10000,
+                 win_name='WIN', lose_name='LOSE'):
+        """Stores the settings; the database is opened by the writer thread on first use."""
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self.batch_size = batch_size
+        self.win_name = win_name
+        self.lose_name = lose_name
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # --- Writes (any thread) ---
+
+    def record_start(self, pin, profile, trading_params, operation_data):
+        """Queues a new operation row."""
+        self._submit(
+            "INSERT OR REPLACE INTO operations (op_key, pin, profile, tick, type, entry_price, tp, sl, start_time, status, trading_params) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (operation_key(pin, operation_data), pin, profile, operation_data['tick'], operation_data['type']['name'],
+             operation_data['entry_price'], operation_data['tp'], operation_data['sl'], operation_data['start_time'],
+             operation_data['status'], json.dumps(trading_params)),
+        )
+
+    def record_progress(self, pin, operation_data, current_price, difference):
+        """Queues one progress tick."""
+        self._submit(
+            "INSERT INTO progress (op_key, timestamp, price, difference) VALUES (?, ?, ?, ?)",
+            (operation_key(pin, operation_data), time.time(), current_price, difference),
+        )
+
+    def record_finalize(self, pin, operation_data, final_status, final_price, final_difference):
+        """Queues the final status of an operation."""
+        self._submit(
+            "UPDATE operations SET status = ?, final_price = ?, final_difference = ?, end_time = ? WHERE op_key = ?",
+            (final_status, final_price, final_difference, operation_data.get('end_time') or time.time(),
+             operation_key(pin, operation_data)),
+        )
+
+    def queue_size(self):
+        """Statements waiting for the writer thread."""
+        return self._queue.qsize()
+
+    def flush(self, timeout=None):
+        """Blocks until everything queued so far is committed."""
+        if self._thread is None:
+            return True
+        done = threading.Event()
+        self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Commits everything still queued and closes the database (call on shutdown)."""
+        if self._thread is None:
+            return
+        self._queue.put(('stop', None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _submit(self, sql, params):
+        """Queues a statement for the writer thread."""
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='operation-journal', daemon=True)
+                    self._thread.start()
+        self._queue.put((sql, params))
+
+    # --- Writer Thread ---
+
+    def _connect(self):
+        """Opens a connection with the journal pragmas."""
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _run(self):
+        """Writer loop: gathers statements for up to commit_interval and commits them together."""
+        try:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = self._connect()
+            connection.executescript(SCHEMA)
+            connection.commit()
+        except (OSError, sqlite3.Error) as e:
+            logger.log_message(f"Journal: Could not open {self.db_path}: {e}. Operations will not be journaled.", "RED")
+            self._discard_forever()
+            return
+
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.commit_interval
+            while len(batch) < self.batch_size and batch[-1][0] not in ('flush', 'stop'):
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+
+            waiters = [params for sql, params in batch if sql == 'flush']
+            stop = any(sql == 'stop' for sql, _ in batch)
+            statements = [(sql, params) for sql, params in batch if sql not in ('flush', 'stop')]
+            try:
+                with connection:  # One transaction per batch
+                    for sql, params in statements:
+                        connection.execute(sql, params)
+            except sqlite3.Error as e:
+                logger.log_message(f"Journal: Error committing {len(statements)} statements: {e}", "RED")
+            for done in waiters:
+                done.set()
+            if stop:
+                connection.close()
+                return
+
+    def _discard_forever(self):
+        """Keeps draining the queue after a fatal open error so callers never block."""
+        while True:
+            sql, params = self._queue.get()
+            if sql == 'flush':
+                params.set()
+            elif sql == 'stop':
+                return
+
+    # --- Queries (any thread, committed data only) ---
+
+    def query(self, sql, params=()):
+        """Runs a read query and returns the rows as dicts."""
+        if not os.path.exists(self.db_path):
+            return []
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        try:
+            return [dict(row) for row in connection.execute(sql, params)]
+        finally:
+            connection.close()
+
+    def efficiency(self, group_by='type', pin=None, since=None, min_operations=1):
+        """Finished-operation efficiency and PnL grouped by 'type', 'tick', 'hour', 'profile' or 'pin'."""
+        if group_by not in GROUP_BY:
+            raise ValueError(f"group_by must be one of {', '.join(GROUP_BY)}")
+        conditions, params = ["status IN (?, ?)"], [self.win_name, self.lose_name]
+        if pin is not None:
+            conditions.append("pin = ?")
+            params.append(pin)
+        if since is not None:
+            conditions.append("start_time >= ?")
+            params.append(since)
+        sql = (
+            f"SELECT {GROUP_BY[group_by]} AS {group_by}, "
+            "SUM(status = ?) AS wins, SUM(status = ?) AS losses, COUNT(*) AS total, "
+            "ROUND(SUM(final_difference), 2) AS pnl_percentage "
+            f"FROM operations WHERE {' AND '.join(conditions)} "
+            f"GROUP BY 1 HAVING COUNT(*) >= ? ORDER BY 1"
+        )
+        rows = self.query(sql, [self.win_name, self.lose_name] + params + [min_operations])
+        for row in rows:
+            row['efficiency_percentage'] = round(row['wins'] * 100 / row['total'], 2) if row['total'] else 0.0
+        return rows
+
+    def efficiency_by_type(self, pin=None, since=None):
+        """Efficiency per operation type (LONG/SHORT/FAST_SHORT)."""
+        return self.efficiency('type', pin, since)
+
+    def efficiency_by_symbol(self, pin=None, since=None, min_operations=1):
+        """Efficiency per symbol."""
+        return self.efficiency('tick', pin, since, min_operations)
+
+    def efficiency_by_hour(self, pin=None, since=None):
+        """Efficiency per local hour of entry."""
+        return self.efficiency('hour', pin, since)
+
+    def operations(self, pin=None, tick=None, status=None, limit=100):
+        """Most recent operations, optionally filtered."""
+        conditions, params = [], []
+        for column, value in (('pin', pin), ('tick', tick), ('status', status)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        return self.query(f"SELECT * FROM operations {where}ORDER BY start_time DESC LIMIT ?", params + [limit])
+
+    def progress(self, pin, operation_data):
+        """Progress ticks of one operation, oldest first."""
+        return self.query("SELECT timestamp, price, difference FROM progress WHERE op_key = ? ORDER BY timestamp",
+                          (operation_key(pin, operation_data),))
+
+
+# --- Create a global instance for easy import ---
+operation_journal = OperationJournal(
+    config.JOURNAL_PATH, win_name=config.WIN_NAME, lose_name=config.LOSE_NAME,
+) if config.JOURNAL_ACTIVE else None
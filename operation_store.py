@@ -0,0 +1,187 @@
+# operation_store.py
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from logger_module import logger
+
+ARCHIVE_FILENAME = 'operations.jsonl'
+
+
+class Operation:
+    """One operation record. Supports item access so code written for the old dicts keeps working."""
+
+    __slots__ = ('tick', 'type', 'entry_price', 'tp', 'sl', 'start_time', 'is_active', 'status',
+                 'last_difference', 'final_price', 'final_difference', 'end_time', 'checked_until')
+
+    def __init__(self, tick, operation_type, entry_price, tp, sl, status, start_time=None):
+        self.tick = tick
+        self.type = operation_type
+        self.entry_price = entry_price
+        self.tp = tp
+        self.sl = sl
+        self.start_time = start_time if start_time is not None else time.time()
+        self.is_active = True
+        self.status = status
+        self.last_difference = 0.0
+        self.final_price = None
+        self.final_difference = None
+        self.end_time = None
+        self.checked_until = None  # ms open time of the last candle checked for intrabar hits
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        """dict.get equivalent."""
+        value = getattr(self, key, None) if isinstance(key, str) else None
+        return default if value is None else value
+
+    def to_dict(self):
+        """Plain dict for JSON (the type is stored by name)."""
+        data = {key: getattr(self, key) for key in self.__slots__}
+        data['type'] = self.type.get('name') if isinstance(self.type, dict) else self.type
+        return data
+
+
+class OperationStore:
+    """Active and recently finished operations, indexed by tick.
+
+    Active operations live in their own index with per-type counters, so counting and
+    listing them never walks finished ones. Only the last `retention` finished operations
+    stay in memory; older ones are appended to <archive_dir>/operations.jsonl (or dropped
+    when no archive_dir is given), which keeps memory flat over long sessions.
+    """
+
+    def __init__(self, retention=200, archive_dir=None):
+        """Creates an empty store."""
+        self.retention = retention
+        self.archive_path = os.path.join(archive_dir, ARCHIVE_FILENAME) if archive_dir else None
+        self.archived_count = 0
+        self._lock = threading.Lock()
+        self._active = OrderedDict()  # tick -> Operation, in opening order
+        self._finished = OrderedDict()  # tick -> Operation, oldest first
+        self._active_by_type = {}
+
+    # --- Lookups ---
+
+    def get(self, tick, default=None):
+        """Active operation of `tick`, else its last retained finished one."""
+        operation = self._active.get(tick)
+        if operation is None:
+            operation = self._finished.get(tick, default)
+        return operation
+
+    def __getitem__(self, tick):
+        operation = self.get(tick)
+        if operation is None:
+            raise KeyError(tick)
+        return operation
+
+    def __contains__(self, tick):
+        return tick in self._active or tick in self._finished
+
+    def __len__(self):
+        return len(self._active) + len(self._finished)
+
+    def is_active(self, tick):
+        """True if `tick` has an active operation."""
+        return tick in self._active
+
+    def active_count(self, type_name=None):
+        """Number of active operations, optionally of one type name. O(1)."""
+        if type_name is None:
+            return len(self._active)
+        return self._active_by_type.get(type_name, 0)
+
+    def active_ticks(self):
+        """Ticks with an active operation (snapshot)."""
+        with self._lock:
+            return list(self._active)
+
+    def active_items(self):
+        """(tick, operation) pairs of the active operations (snapshot)."""
+        with self._lock:
+            return list(self._active.items())
+
+    def items(self):
+        """(tick, operation) pairs of every operation held in memory (snapshot)."""
+        with self._lock:
+            return list(self._finished.items()) + list(self._active.items())
+
+    def values(self):
+        """Every operation held in memory (snapshot)."""
+        return [operation for _, operation in self.items()]
+
+    # --- Mutations ---
+
+    def open(self, tick, operation_type, entry_price, tp, sl, status, start_time=None):
+        """Registers a new active operation. Returns it, or None if `tick` is already active."""
+        with self._lock:
+            if tick in self._active:
+                return None
+            previous = self._finished.pop(tick, None)
+            if previous is not None:
+                self._archive([previous])  # A reopened tick must not overwrite its last result
+            operation = Operation(tick, operation_type, entry_price, tp, sl, status, start_time)
+            self._active[tick] = operation
+            type_name = operation_type['name']
+            self._active_by_type[type_name] = self._active_by_type.get(type_name, 0) + 1
+            return operation
+
+    def finish(self, tick, status, final_price, final_difference, end_time=None):
+        """Moves the active operation of `tick` to the finished ones. Returns it (None if not active)."""
+        with self._lock:
+            operation = self._active.pop(tick, None)
+            if operation is None:
+                return None
+            type_name = operation.type['name']
+            self._active_by_type[type_name] = max(0, self._active_by_type.get(type_name, 0) - 1)
+            operation.is_active = False
+            operation.status = status
+            operation.final_price = final_price
+            operation.final_difference = final_difference
+            operation.end_time = end_time if end_time is not None else time.time()
+            self._finished[tick] = operation
+
+            evicted = []
+            while len(self._finished) > self.retention:
+                evicted.append(self._finished.popitem(last=False)[1])
+            if evicted:
+                self._archive(evicted)
+            return operation
+
+    def close(self):
+        """Archives the finished operations still in memory (call on shutdown)."""
+        with self._lock:
+            finished = list(self._finished.values())
+            self._finished.clear()
+            self._archive(finished)
+
+    def _archive(self, operations):
+        """Appends finished operations to the archive file (caller holds the lock)."""
+        if not operations:
+            return
+        self.archived_count += len(operations)
+        if self.archive_path is None:
+            return
+        try:
+            with open(self.archive_path, 'a') as file:
+                for operation in operations:
+                    file.write(json.dumps(operation.to_dict()) + '\n')
+        except (IOError, TypeError) as e:
+            logger.log_message(f"Error archiving {len(operations)} finished operations to {self.archive_path}: {e}", "RED")
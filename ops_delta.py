@@ -0,0 +1,73 @@
+# ops_delta.py
+# Versioned delta protocol for the active-operations list (bot -> server.py -> browsers).
+# Snapshot: {'version': v, 'ops': [op, ...]}
+# Patch: {'version': v, 'base_version': v - 1, 'add': [op, ...],
+#         'update': [{'tick': ..., <changed fields>}], 'remove': [tick, ...]}
+# Operations are keyed by 'tick' (the profile-qualified operation key). A receiver whose
+# version differs from a patch's base_version asks for a new snapshot.
+
+KEY = 'tick'
+
+
+def diff_operations(previous, current):
+    """(add, update, remove) turning the {tick: op} dict `previous` into `current`."""
+    add, update = [], []
+    for tick, operation in current.items():
+        old = previous.get(tick)
+        if old is None:
+            add.append(operation)
+        elif old != operation:
+            changed = {field: value for field, value in operation.items() if old.get(field) != value}
+            changed[KEY] = tick
+            update.append(changed)
+    remove = [tick for tick in previous if tick not in current]
+    return add, update, remove
+
+
+def apply_patch(state, patch):
+    """Applies a patch to a {tick: op} dict in place."""
+    for tick in patch.get('remove', []):
+        state.pop(tick, None)
+    for operation in patch.get('add', []):
+        state[operation[KEY]] = dict(operation)
+    for changed in patch.get('update', []):
+        operation = state.get(changed[KEY])
+        if operation is not None:
+            operation.update(changed)
+    return state
+
+
+def sorted_operations(state):
+    """Snapshot list of a {tick: op} dict, sorted by tick for a stable display."""
+    return [state[tick] for tick in sorted(state)]
+
+
+class ActiveOpsEncoder:
+    """Turns successive full active-operations lists into versioned patches (sender side)."""
+
+    def __init__(self):
+        """Starts unsynchronized, so the first encode() is a snapshot."""
+        self.version = 0
+        self.state = {}
+        self.synced = False
+
+    def reset(self):
+        """Forces a snapshot on the next encode() (new connection or receiver-reported gap)."""
+        self.synced = False
+
+    def encode(self, operations):
+        """Returns ('snapshot', payload), ('patch', payload) or (None, None) when nothing changed."""
+        current = {operation[KEY]: operation for operation in operations}
+        if not self.synced:
+            self.version += 1
+            self.state = current
+            self.synced = True
+            return 'snapshot', {'version': self.version, 'ops': sorted_operations(current)}
+
+        add, update, remove = diff_operations(self.state, current)
+        if not (add or update or remove):
+            return None, None
+        self.version += 1
+        self.state = current
+        return 'patch', {'version': self.version, 'base_version': self.version - 1,
+                         'add': add, 'update': update, 'remove': remove}
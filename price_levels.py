@@ -0,0 +1,88 @@
+# price_levels.py
+import bisect
+import itertools
+import threading
+
+
+class PriceLevelIndex:
+    """Active TP/SL levels per symbol, kept in sorted lists and checked on every price update.
+
+    Each operation registers one level that triggers when the price rises to it (LONG take
+    profit, SHORT stop loss) and one that triggers when the price falls to it. A price update
+    bisects both lists of its symbol, so it only touches the levels it actually crosses.
+    """
+
+    def __init__(self):
+        """Initializes an empty index."""
+        self._lock = threading.Lock()
+        self._upper = {}  # symbol -> [(level, seq, key)] ascending; hit when price >= level
+        self._lower = {}  # symbol -> [(level, seq, key)] ascending; hit when price <= level
+        self._entries = {}  # key -> (symbol, upper_entry, upper_status, lower_entry, lower_status)
+        self._seq = itertools.count()
+
+    def add(self, symbol, key, upper_level, upper_status, lower_level, lower_status):
+        """Registers the two exit levels of an operation identified by `key` (replacing older ones)."""
+        with self._lock:
+            self._remove(key)
+            upper_entry = (upper_level, next(self._seq), key)
+            lower_entry = (lower_level, next(self._seq), key)
+            bisect.insort(self._upper.setdefault(symbol, []), upper_entry)
+            bisect.insort(self._lower.setdefault(symbol, []), lower_entry)
+            self._entries[key] = (symbol, upper_entry, upper_status, lower_entry, lower_status)
+
+    def remove(self, key):
+        """Unregisters an operation's levels (no-op if unknown)."""
+        with self._lock:
+            self._remove(key)
+
+    def _remove(self, key):
+        """remove() without locking."""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        symbol, upper_entry, _, lower_entry, _ = entry
+        for levels, level_entry in ((self._upper.get(symbol), upper_entry), (self._lower.get(symbol), lower_entry)):
+            if levels is None:
+                continue
+            position = bisect.bisect_left(levels, level_entry)
+            if position < len(levels) and levels[position] == level_entry:
+                del levels[position]
+        if not self._upper.get(symbol) and not self._lower.get(symbol):
+            self._upper.pop(symbol, None)
+            self._lower.pop(symbol, None)
+
+    def symbols(self):
+        """Symbols with at least one registered level (snapshot)."""
+        with self._lock:
+            return list(self._upper)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def check(self, symbol, price):
+        """Consumes the levels crossed by `price`. Returns [(key, status)]; each key fires only once."""
+        upper = self._upper.get(symbol)
+        if upper is None:
+            return []
+        with self._lock:
+            upper = self._upper.get(symbol)
+            lower = self._lower.get(symbol)
+            if upper is None:
+                return []
+            hits = []
+            # Upper levels <= price and lower levels >= price
+            crossed_up = bisect.bisect_right(upper, (price, float('inf')))
+            crossed_down = bisect.bisect_left(lower, (price, -1))
+            keys = [entry[2] for entry in upper[:crossed_up]] + [entry[2] for entry in lower[crossed_down:]]
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue  # Both levels crossed by a gap: already reported
+                _, upper_entry, upper_status, _, lower_status = entry
+                hits.append((key, upper_status if upper_entry[0] <= price else lower_status))
+                self._remove(key)
+            return hits
+
+
+# --- Create a global instance for easy import ---
+price_levels = PriceLevelIndex()
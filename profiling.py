@@ -0,0 +1,240 @@
+# profiling.py
+import cProfile
+import heapq
+import os
+import threading
+import time
+
+from logger_module import logger
+import config
+
+
+class _NullContext:
+    """Shared no-op context manager returned while profiling is off."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_CONTEXT = _NullContext()
+
+
+class _Stage:
+    """Times one stage of the current cycle; nested stages are subtracted from their parent."""
+
+    __slots__ = ('profiler', 'name', 'start', 'child_time')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.child_time = 0.0
+        self.profiler._local.stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self.start
+        stack = self.profiler._local.stack
+        stack.pop()
+        if stack:
+            stack[-1].child_time += elapsed
+        self.profiler.add_stage_time(self.name, elapsed - self.child_time)
+        return False
+
+
+class _Cycle:
+    """One profiled cycle: collects stage times and, every N cycles, a cProfile dump."""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.stages = {}
+        self.symbols = {}  # symbol -> (seconds, stage)
+        self.number = None
+        self.cprofile = None
+
+    def __enter__(self):
+        local = self.profiler._local
+        if getattr(local, 'cycle', None) is not None:
+            return self  # Already inside a cycle on this thread: stages go to the outer one
+        local.cycle = self
+        local.stack = []
+        self.number = self.profiler._next_cycle_number(self.name)
+        every = self.profiler.cprofile_every
+        if every and self.number % every == 0:
+            self.cprofile = cProfile.Profile()
+            try:
+                self.cprofile.enable()
+            except ValueError as e:  # Another thread's profiler is active (sys.monitoring)
+                logger.log_message(f"Profiling: cProfile skipped for {self.name} cycle {self.number}: {e}", "YELLOW")
+                self.cprofile = None
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        local = self.profiler._local
+        if local.cycle is not self:
+            return False
+        duration = time.perf_counter() - self.start
+        local.cycle = None
+        if self.cprofile is not None:
+            self.cprofile.disable()
+            self.profiler._dump(self.name, self.number, self.cprofile)
+        self.profiler._finish_cycle(self, duration)
+        return False
+
+
+class CycleProfiler:
+    """Opt-in per-cycle profiler: stage timers, slowest-symbols table and periodic cProfile dumps.
+
+    While inactive, cycle() and stage() return a shared no-op context manager and the
+    record_* methods return immediately, so the instrumented code pays one attribute check.
+    """
+
+    def __init__(self, active=False, top_symbols=10, report_every=10, cprofile_every=0, output_dir='.'):
+        """Stores the settings; reports are logged every `report_every` cycles of each kind."""
+        self.active = active
+        self.top_symbols = top_symbols
+        self.report_every = report_every
+        self.cprofile_every = cprofile_every
+        self.output_dir = output_dir
+        self.last_reports = {}  # cycle name -> last report dict
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._counts = {}
+        self._windows = {}  # cycle name -> accumulated stats since the last report
+
+    # --- Instrumentation (any thread) ---
+
+    def cycle(self, name):
+        """Context manager around one cycle ('scanner', 'evaluation', ...)."""
+        return _Cycle(self, name) if self.active else NULL_CONTEXT
+
+    def stage(self, name):
+        """Context manager timing a stage (fetch, parse, evaluate, notify, emit) of the current cycle."""
+        if not self.active or getattr(self._local, 'cycle', None) is None:
+            return NULL_CONTEXT
+        return _Stage(self, name)
+
+    def add_stage_time(self, name, seconds):
+        """Adds time to a stage of the current cycle (for waits measured by the caller)."""
+        cycle = getattr(self._local, 'cycle', None) if self.active else None
+        if cycle is not None:
+            cycle.stages[name] = cycle.stages.get(name, 0.0) + seconds
+
+    def current_cycle(self):
+        """The cycle running on this thread (None when inactive), to hand to worker threads."""
+        return getattr(self._local, 'cycle', None) if self.active else None
+
+    def record_symbol(self, symbol, seconds, stage, cycle=None):
+        """Records the time one symbol spent in a stage; only the slowest per symbol is kept.
+
+        Worker threads (e.g. the kline fetch pool) pass the `cycle` that started their work,
+        taken with current_cycle(); otherwise the cycle running on this thread is charged.
+        """
+        if cycle is None:
+            cycle = self.current_cycle()
+        if cycle is None:
+            return
+        with self._lock:
+            if seconds > cycle.symbols.get(symbol, (0.0, None))[0]:
+                cycle.symbols[symbol] = (seconds, stage)
+
+    def timed_iter(self, iterable, stage):
+        """Yields from `iterable`, charging the time spent waiting for each item to `stage`."""
+        if not self.active:
+            return iterable
+        return self._timed_iter(iterable, stage)
+
+    def _timed_iter(self, iterable, stage):
+        """Generator behind timed_iter()."""
+        iterator = iter(iterable)
+        while True:
+            wait_start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage_time(stage, time.perf_counter() - wait_start)
+                return
+            self.add_stage_time(stage, time.perf_counter() - wait_start)
+            yield item
+
+    # --- Reports ---
+
+    def _next_cycle_number(self, name):
+        """Numbers the cycles of each kind from 1."""
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + 1
+            return self._counts[name]
+
+    @staticmethod
+    def _empty_window():
+        """Accumulators of one report window."""
+        return {'cycles': 0, 'duration': 0.0, 'max_duration': 0.0, 'stages': {}, 'symbols': {}}
+
+    def _finish_cycle(self, cycle, duration):
+        """Folds a finished cycle into its window and logs a report every report_every cycles."""
+        with self._lock:
+            window = self._windows.setdefault(cycle.name, self._empty_window())
+            window['cycles'] += 1
+            window['duration'] += duration
+            window['max_duration'] = max(window['max_duration'], duration)
+            for stage, seconds in cycle.stages.items():
+                window['stages'][stage] = window['stages'].get(stage, 0.0) + seconds
+            for symbol, (seconds, stage) in cycle.symbols.items():
+                if seconds > window['symbols'].get(symbol, (0.0, None))[0]:
+                    window['symbols'][symbol] = (seconds, stage)
+            if window['cycles'] < self.report_every:
+                return
+            self._windows[cycle.name] = self._empty_window()
+        self._report(cycle.name, window)
+
+    def _report(self, name, window):
+        """Logs and stores the report of one window."""
+        cycles = window['cycles']
+        total = window['duration']
+        stages = {stage: seconds / cycles for stage, seconds in sorted(window['stages'].items(), key=lambda item: -item[1])}
+        slowest = heapq.nlargest(self.top_symbols, window['symbols'].items(), key=lambda item: item[1][0])
+        other = max(0.0, total - sum(window['stages'].values())) / cycles
+        self.last_reports[name] = {
+            'cycles': cycles,
+            'avg_duration': total / cycles,
+            'max_duration': window['max_duration'],
+            'avg_stages': stages,
+            'avg_untracked': other,
+            'slowest_symbols': [(symbol, seconds, stage) for symbol, (seconds, stage) in slowest],
+        }
+
+        stage_text = ', '.join(f"{stage} {seconds:.3f}s ({seconds * cycles * 100 / total:.0f}%)" if total else f"{stage} {seconds:.3f}s"
+                               for stage, seconds in stages.items())
+        logger.log_message(f"Profiling {name}: {cycles} cycles, avg {total / cycles:.3f}s, max {window['max_duration']:.3f}s | {stage_text}, untracked {other:.3f}s")
+        if slowest:
+            symbols_text = ', '.join(f"{symbol} {seconds:.3f}s ({stage})" for symbol, (seconds, stage) in slowest)
+            logger.log_message(f"Profiling {name}: slowest symbols: {symbols_text}")
+
+    def _dump(self, name, number, profile):
+        """Writes a pstats file for one profiled cycle."""
+        filepath = os.path.join(self.output_dir, f'profile-{name}-{number}.pstats')
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(filepath)
+            logger.log_message(f"Profiling: cProfile of {name} cycle {number} written to {filepath}")
+        except OSError as e:
+            logger.log_message(f"Profiling: Error writing {filepath}: {e}", "RED")
+
+
+# --- Create a global instance for easy import ---
+profiler = CycleProfiler(
+    active=config.PROFILING_ACTIVE,
+    top_symbols=config.PROFILING_TOP_SYMBOLS,
+    report_every=config.PROFILING_REPORT_EVERY,
+    cprofile_every=config.PROFILING_CPROFILE_EVERY,
+    output_dir=config.LOG_PATH,
+)
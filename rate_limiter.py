@@ -0,0 +1,148 @@
+# rate_limiter.py
+import threading
+import time
+
+from logger_module import logger
+
+# Request priorities (lower value is served first)
+PRIORITY_HIGH = 0  # Active-operation price checks
+PRIORITY_LOW = 1   # Scanner kline fetches and other background refreshes
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+
+def klines_weight(limit):
+    """Request weight of a futures klines call for the given limit."""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class RequestScheduler:
+    """Shares the per-minute request-weight budget between the bot threads by priority.
+
+    Each request reserves its weight before being sent. The local estimate is reconciled
+    with the X-MBX-USED-WEIGHT-1M header of every response, which also accounts for other
+    processes using the same IP. Low-priority requests only get `low_priority_share` of the
+    budget and always yield to waiting high-priority ones, so the scanner is throttled before
+    the TP/SL evaluator ever is. A 418/429 response blocks everyone until Retry-After.
+    """
+
+    def __init__(self, weight_limit=2400, low_priority_share=0.7, window=60):
+        """Initializes an empty budget for the current window."""
+        self.weight_limit = weight_limit
+        self.low_priority_share = low_priority_share
+        self.window = window
+        self.throttled_count = 0  # Low-priority requests that had to wait for budget
+        self.rate_limited_count = 0  # 418/429 responses received
+        self._cond = threading.Condition()
+        self._window_start = 0.0
+        self._used = 0
+        self._blocked_until = 0.0
+        self._waiting_high = 0
+        self._throttle_logged_window = None
+
+    def _roll_window(self, now):
+        """Resets the used weight when a new minute starts."""
+        window_start = now - now % self.window
+        if window_start != self._window_start:
+            self._window_start = window_start
+            self._used = 0
+
+    def _budget(self, priority):
+        """Weight available to a priority in one window."""
+        if priority == PRIORITY_HIGH:
+            return self.weight_limit
+        return int(self.weight_limit * self.low_priority_share)
+
+    def _wait_time(self, weight, priority, now):
+        """Seconds to wait before the request may be sent (0 = send now)."""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        if priority != PRIORITY_HIGH and self._waiting_high:
+            return 0.1  # Re-checked as soon as the high-priority request is served
+        if self._used + weight <= self._budget(priority):
+            return 0
+        return self._window_start + self.window - now
+
+    def acquire(self, weight=1, priority=PRIORITY_LOW, timeout=None):
+        """Blocks until `weight` can be spent at `priority`. Returns False on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            if priority == PRIORITY_HIGH:
+                self._waiting_high += 1
+            throttled = False
+            try:
+                while True:
+                    now = time.time()
+                    self._roll_window(now)
+                    wait = self._wait_time(weight, priority, now)
+                    if wait <= 0:
+                        self._used += weight
+                        return True
+                    if priority != PRIORITY_HIGH and not throttled:
+                        throttled = True
+                        self.throttled_count += 1
+                        if self._throttle_logged_window != self._window_start and now >= self._blocked_until:
+                            self._throttle_logged_window = self._window_start
+                            logger.log_message(f"RateLimiter: Throttling scanner requests (used {self._used}/{self.weight_limit} weight this minute).", "YELLOW")
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = min(wait, deadline - now)
+                    self._cond.wait(wait)
+            finally:
+                if priority == PRIORITY_HIGH:
+                    self._waiting_high -= 1
+                    self._cond.notify_all()
+
+    def try_acquire(self, weight=1, priority=PRIORITY_LOW):
+        """Non-blocking acquire for asyncio callers: returns 0 if spent, else the seconds to wait."""
+        with self._cond:
+            now = time.time()
+            self._roll_window(now)
+            wait = self._wait_time(weight, priority, now)
+            if wait <= 0:
+                self._used += weight
+                return 0
+            return wait
+
+    def record_response(self, status_code, headers):
+        """Reconciles the budget with a response's used-weight header and rate-limit status."""
+        used = headers.get(USED_WEIGHT_HEADER)
+        with self._cond:
+            now = time.time()
+            self._roll_window(now)
+            if used is not None:
+                try:
+                    self._used = max(self._used, int(used))
+                except ValueError:
+                    pass
+            if status_code in (418, 429):
+                self.rate_limited_count += 1
+                try:
+                    retry_after = int(headers.get('Retry-After', self.window))
+                except ValueError:
+                    retry_after = self.window
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+                logger.log_message(f"RateLimiter: HTTP {status_code} received, pausing requests for {retry_after}s.", "RED")
+            self._cond.notify_all()
+
+    def usage(self):
+        """Current budget usage, e.g. for the dashboard or metrics."""
+        with self._cond:
+            now = time.time()
+            self._roll_window(now)
+            return {
+                'used_weight': self._used,
+                'weight_limit': self.weight_limit,
+                'used_percentage': round(self._used * 100 / self.weight_limit, 2) if self.weight_limit else 0.0,
+                'scanner_budget': self._budget(PRIORITY_LOW),
+                'blocked_for': max(0.0, round(self._blocked_until - now, 1)),
+                'throttled_count': self.throttled_count,
+                'rate_limited_count': self.rate_limited_count,
+            }
@@ -0,0 +1,40 @@
+# replay.py
+# Usage: python replay.py <session_dir> [dev] [prefix] [overrides...]
+# Pushes a recorded market data session through the scanner evaluation offline.
+import sys
+import time
+
+if len(sys.argv) < 2:
+    print("Usage: python replay.py <session_dir> [dev] [prefix] [overrides...]", file=sys.stderr)
+    sys.exit(1)
+
+# The session dir must leave argv before config parses the remaining arguments
+replay_dir = sys.argv.pop(1)
+
+import config  # noqa: E402
+config.MARKET_DATA_RECORD = False
+config.MARKET_DATA_REPLAY_PATH = replay_dir  # Makes binance_service a ReplayBinanceService
+# An offline replay must not touch the live journal or alert the desktop
+config.JOURNAL_ACTIVE = False
+config.NOTIFICATIONS_ACTIVE = False
+config.SOUND_ACTIVE = False
+
+import trading_bot  # noqa: E402
+from logger_module import setup_file_logging  # noqa: E402
+from market_recorder import replay_session  # noqa: E402
+
+
+def main():
+    """Replays the session and prints the resulting operation counters."""
+    for profile in trading_bot.profiles:
+        setup_file_logging(profile.log_path)
+    start = time.perf_counter()
+    count = replay_session(replay_dir, trading_bot.evaluate_variation_from_closes,
+                           snapshot=trading_bot.market_snapshot, service=trading_bot.binance_service)
+    print(f"Replayed {count} windows in {time.perf_counter() - start:.2f}s")
+    for profile in trading_bot.profiles:
+        print(f"Results ({profile.name}): {profile.results}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,14 @@
 # server.py
 import config
 import os
+import json
+import time
+import uuid
+import zlib
+from ops_delta import apply_patch, sorted_operations
 import sys
 from flask_socketio import SocketIO, emit
-from flask import Flask, render_template, send_from_directory, request
+from flask import Flask, Response, render_template, send_from_directory, request
 
 import eventlet
 eventlet.monkey_patch()
@@ -13,6 +18,7 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 try:
     from logger_module import logger
+    from metrics import metrics, CONTENT_TYPE
 except ImportError as e:
     print("Error: Could not import 'logger' from 'logger_module'. Ensure the file exists and has no errors.")
     print(f"Error details: {e}", file=sys.stderr)
@@ -40,8 +46,21 @@ app.config['SECRET_KEY'] = os.environ.get(
 socketio = SocketIO(app, async_mode='eventlet', cors_allowed_origins="*")
 
 # --- Store last known state ---
+BOOT_ID = uuid.uuid4().hex  # Changes on every start; clients echo it so a restart resets their log view
 last_stats = {"message": "Esperando estadísticas del bot..."}
-last_active_ops = []  # Store list of active operations
+active_ops_state = {}  # tick -> active operation, kept in sync through versioned patches
+active_ops_version = 0
+active_ops_resync_pending = False  # A snapshot was requested from the bot after a version gap
+last_dropped_logs = 0  # Bot log lines dropped by its outbound queue, as last reported
+last_bot_metrics = ''  # Exposition text last pushed by the bot
+last_bot_metrics_time = None
+
+# --- Server Metrics (served at /metrics with the bot's) ---
+WEB_CLIENTS = metrics.gauge('tradingbot_server_connected_clients', 'Socket.IO clients connected to server.py (browsers and bot).')
+FRAMES_RECEIVED = metrics.counter('tradingbot_server_bot_frames_total', 'Batched frames received from the bot.')
+LOGS_RELAYED = metrics.counter('tradingbot_server_relayed_logs_total', 'Bot log lines relayed to browsers.')
+BOT_METRICS_AGE = metrics.gauge('tradingbot_server_bot_metrics_age_seconds', 'Age of the bot metrics below (-1 if none received yet).')
+BOT_METRICS_AGE.set_function(lambda: time.time() - last_bot_metrics_time if last_bot_metrics_time else -1)
 
 
 @app.route('/')
@@ -60,12 +79,19 @@ def static_files(filename):
     return send_from_directory(app.static_folder, filename)
 
 
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus text exposition: server metrics followed by the last ones pushed by the bot."""
+    return Response(metrics.render() + last_bot_metrics, content_type=CONTENT_TYPE)
+
+
 # --- SocketIO Event Handlers ---
 
 @socketio.on('connect')
-def handle_web_connect():
-    """Handles new WebSocket connections from web browsers."""
+def handle_web_connect(auth=None):
+    """Handles new WebSocket connections from web browsers (auth may carry the last seen log seq)."""
     client_sid = request.sid
+    WEB_CLIENTS.inc()
     logger.log_message(f'Web client connected: {client_sid}')
     try:
         # Send the global configuration
@@ -78,19 +104,17 @@ def handle_web_connect():
         }
         emit('global_config', global_config, room=client_sid)
 
-        # Send existing logs
-        existing_logs = logger.get_all_logs_for_web()
-        for msg, color_style in existing_logs:
-            emit('new_log', {'message': msg,
-                 'color': color_style}, room=client_sid)
+        # Send the logs the client has not seen, in one compressed payload
+        auth = auth if isinstance(auth, dict) else {}
+        emit('log_backfill', build_log_backfill(auth.get('last_seq') or 0, auth.get('boot_id')), room=client_sid)
 
         # Send last known stats
         if last_stats:
             emit('stats_update', last_stats, room=client_sid)
 
-        # --- Send last known active operations ---
-        if last_active_ops:
-            emit('active_ops_update', last_active_ops, room=client_sid)
+        # --- Send the active operations snapshot; patches follow ---
+        if active_ops_version:
+            emit('active_ops_snapshot', active_ops_snapshot(), room=client_sid)
 
     except Exception as e:
         logger.log_message(
@@ -101,21 +125,93 @@ def handle_web_connect():
 def handle_web_disconnect():
     """Handles WebSocket disconnections from web browsers."""
     client_sid = request.sid
+    WEB_CLIENTS.inc(-1)
     logger.log_message(f'Web client disconnected: {client_sid}')
 
 
 @socketio.on('log_from_script')
 def handle_log_from_script(data):
     """Receives logs from bot and relays to browsers."""
-    message = data.get('message', '')
-    color_style = data.get('color', 'color: black;')
-    log_data_for_web = {'message': message, 'color': color_style}
-    emit('new_log', log_data_for_web, broadcast=True)
+    relay_logs([data])
 
 
 @socketio.on('stats_from_script')
 def handle_stats_from_script(data):
     """Receives statistics from bot and relays to browsers."""
+    relay_stats(data)
+
+
+@socketio.on('active_ops_resync')
+def handle_active_ops_resync():
+    """A browser missed a patch: sends it a full snapshot."""
+    emit('active_ops_snapshot', active_ops_snapshot(), room=request.sid)
+
+
+@socketio.on('batch_from_script')
+def handle_batch_from_script(data):
+    """Receives a batched frame (logs, stats, active operations) from the bot and relays it."""
+    global last_dropped_logs, last_bot_metrics, last_bot_metrics_time
+    if not isinstance(data, dict):
+        logger.log_message(
+            f"Received invalid batch data format from script: {type(data)}", "RED")
+        return
+    FRAMES_RECEIVED.inc()
+
+    logs = data.get('logs')
+    if logs:
+        relay_logs(logs)
+
+    dropped_logs = data.get('dropped_logs', 0)
+    if dropped_logs > last_dropped_logs:
+        logger.log_message(
+            f"Bot dropped {dropped_logs - last_dropped_logs} log lines (outbound queue full).", "YELLOW")
+    last_dropped_logs = dropped_logs
+
+    if 'metrics' in data:
+        last_bot_metrics = data['metrics']
+        last_bot_metrics_time = time.time()
+    if 'stats' in data:
+        relay_stats(data['stats'])
+    if 'active_ops_snapshot' in data:
+        relay_active_ops_snapshot(data['active_ops_snapshot'])
+    if 'active_ops_patch' in data:
+        relay_active_ops_patch(data['active_ops_patch'])
+
+
+def build_log_backfill(last_seq, boot_id=None):
+    """zlib-compressed JSON of the stored logs newer than last_seq.
+
+    A boot_id from another server run (or a last_seq ahead of the buffer) resets the client to
+    the full buffer; `gap` tells the client that logs between last_seq and the oldest stored one were lost.
+    """
+    reset = (boot_id is not None and boot_id != BOOT_ID) or last_seq > logger.last_seq
+    if reset:
+        last_seq = 0
+    records = logger.get_logs_since(last_seq)
+    return {
+        'encoding': 'deflate',
+        'data': zlib.compress(json.dumps(records).encode('utf-8')),
+        'count': len(records),
+        'last_seq': logger.last_seq,
+        'reset': reset,
+        'boot_id': BOOT_ID,
+        'gap': last_seq > 0 and logger.first_seq() > last_seq + 1,
+    }
+
+
+def relay_logs(logs):
+    """Stores bot logs (numbering them) and broadcasts them to browsers as one batch."""
+    records = []
+    for log in logs:
+        message, color = log.get('message', ''), log.get('color', 'default')
+        seq = logger.store_message(message, color)
+        records.append([seq, message, logger.get_web_color_style(color)])
+    LOGS_RELAYED.inc(len(records))
+    emit('log_batch', records, broadcast=True)  # One message per frame instead of one per line
+
+
+def relay_stats(data):
+    """Stores the bot statistics and broadcasts them to browsers."""
     global last_stats
     if isinstance(data, dict):
         last_stats = data
@@ -125,16 +221,33 @@ def handle_stats_from_script(data):
             f"Received invalid stats data format from script: {type(data)}", "RED")
 
 
-@socketio.on('active_ops_from_script')
-def handle_active_ops_from_script(data):
-    """Receives active operations list from bot and relays to browsers."""
-    global last_active_ops
-    if isinstance(data, list):
-        last_active_ops = data  # Update last known list
-        emit('active_ops_update', data, broadcast=True)
-    else:
-        logger.log_message(
-            f"Received invalid active ops data format from script: {type(data)}", "RED")
+def active_ops_snapshot():
+    """Full active operations payload for a (re)connecting browser."""
+    return {'version': active_ops_version, 'ops': sorted_operations(active_ops_state)}
+
+
+def relay_active_ops_snapshot(snapshot):
+    """Replaces the active operations with a bot snapshot and broadcasts it to browsers."""
+    global active_ops_state, active_ops_version, active_ops_resync_pending
+    active_ops_state = {op['tick']: op for op in snapshot['ops']}
+    active_ops_version = snapshot['version']
+    active_ops_resync_pending = False
+    emit('active_ops_snapshot', snapshot, broadcast=True)
+
+
+def relay_active_ops_patch(patch):
+    """Applies a bot patch and broadcasts it; on a version gap asks the bot for a snapshot."""
+    global active_ops_version, active_ops_resync_pending
+    if patch['base_version'] != active_ops_version:
+        if not active_ops_resync_pending:
+            logger.log_message(
+                f"Active ops version gap (have {active_ops_version}, patch from {patch['base_version']}). Requesting snapshot.", "YELLOW")
+            active_ops_resync_pending = True
+            emit('active_ops_resync', room=request.sid)
+        return
+    apply_patch(active_ops_state, patch)
+    active_ops_version = patch['version']
+    emit('active_ops_patch', patch, broadcast=True)
 
 
 if __name__ == '__main__':
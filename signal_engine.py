@@ -0,0 +1,80 @@
+# signal_engine.py
+import numpy as np
+
+# Candidate kinds, in the order the scalar path triggers them for one symbol
+KIND_LONG = 0
+KIND_SHORT = 1
+KIND_FAST_SHORT = 2
+
+CANDIDATE_DTYPE = np.dtype([
+    ('row', np.int32),         # Row of the symbol in the close matrix
+    ('kind', np.int8),         # KIND_LONG / KIND_SHORT / KIND_FAST_SHORT
+    ('variation', np.float64), # Rounded exactly like calculate_variation
+    ('price', np.float64),     # Last close (entry price)
+])
+
+# round(x, 2) can move a value up by at most 0.005, so this margin never drops a real candidate
+_PREFILTER_MARGIN = 0.01
+
+
+def build_close_matrix(closes_by_symbol, window):
+    """Stacks per-symbol close lists into a (symbols x window) matrix, right-aligned and NaN-padded."""
+    matrix = np.full((len(closes_by_symbol), window), np.nan)
+    for row, closes in enumerate(closes_by_symbol):
+        closes = closes[-window:]
+        if closes:
+            matrix[row, window - len(closes):] = closes
+    return matrix
+
+
+def _first_valid(matrix):
+    """First non-NaN close of each row (NaN for empty rows)."""
+    valid = ~np.isnan(matrix)
+    first_index = valid.argmax(axis=1)
+    first = matrix[np.arange(matrix.shape[0]), first_index]
+    first[~valid.any(axis=1)] = np.nan
+    return first, valid.sum(axis=1)
+
+
+def evaluate_close_matrix(matrix, variation_percentage, variation_fast_percentage):
+    """Computes window variation, fast variation and direction for every row in one pass.
+
+    Mirrors evaluate_variation_from_closes: LONG when the window fell, SHORT when it rose
+    (both gated by VARIATION_PERCENTAGE, the volume gate stays in process_entry_condition),
+    and FAST_SHORT when the last close rose over the close two candles back.
+    Returns a CANDIDATE_DTYPE array ordered by row, then kind.
+    """
+    if matrix.size == 0:
+        return np.empty(0, dtype=CANDIDATE_DTYPE)
+
+    initial, counts = _first_valid(matrix)
+    final = matrix[:, -1]
+    prev_prev = matrix[:, -3] if matrix.shape[1] >= 3 else np.full(matrix.shape[0], np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Same operation order as calculate_variation(p1, p2): ((p1 - p2) / p1) * 100
+        long_raw = ((initial - final) / initial) * 100
+        short_raw = ((final - initial) / final) * 100
+        fast_raw = ((final - prev_prev) / final) * 100
+
+    usable = (counts >= 2) & (initial != 0)
+    long_mask = usable & (initial > final) & (long_raw >= variation_percentage - _PREFILTER_MARGIN)
+    short_mask = usable & (final > initial) & (short_raw >= variation_percentage - _PREFILTER_MARGIN)
+    fast_mask = (usable & (counts >= 3) & (prev_prev != 0) & (final > prev_prev)
+                 & (fast_raw >= variation_fast_percentage - _PREFILTER_MARGIN))
+
+    candidates = []
+    for kind, mask, raw, threshold in (
+        (KIND_LONG, long_mask, long_raw, variation_percentage),
+        (KIND_SHORT, short_mask, short_raw, variation_percentage),
+        (KIND_FAST_SHORT, fast_mask, fast_raw, variation_fast_percentage),
+    ):
+        for row in np.flatnonzero(mask):
+            # Python's round on the few survivors keeps results identical to the scalar path
+            variation = round(float(raw[row]), 2)
+            if variation >= threshold:
+                candidates.append((row, kind, variation, final[row]))
+
+    result = np.array(candidates, dtype=CANDIDATE_DTYPE)
+    result.sort(order=('row', 'kind'), kind='stable')
+    return result
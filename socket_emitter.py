@@ -0,0 +1,167 @@
+# socket_emitter.py
+import threading
+import time
+from collections import deque
+
+from ops_delta import ActiveOpsEncoder
+from metrics import metrics
+
+# --- Metrics ---
+FRAMES_SENT = metrics.counter('tradingbot_emitter_frames_sent_total', 'Batched frames sent to server.py.')
+MESSAGES_DROPPED = metrics.counter(
+    'tradingbot_emitter_dropped_total', 'Outbound messages dropped by kind (log: queue full, frame: emit error).', ('kind',))
+EMIT_LATENCY = metrics.histogram('tradingbot_emitter_emit_duration_seconds', 'Time spent emitting one batched frame.')
+
+BATCH_EVENT = 'batch_from_script'
+
+
+class SocketEmitter:
+    """Outbound Socket.IO queue drained by a sender thread in periodic batched frames.
+
+    Trading threads only append to a bounded deque (logs) or overwrite the latest stats and
+    active-operations payloads, so a slow or reconnecting server never blocks them. Every
+    `interval` seconds the sender emits one `batch_from_script` frame with everything queued.
+    When the log queue is full the oldest lines are dropped and counted. Active operations
+    leave as versioned patches (see ops_delta), or as a snapshot after resync_active_ops().
+    """
+
+    def __init__(self, client, log_message, interval=0.5, max_queue_size=5000, max_batch_size=1000):
+        """Wraps a socketio.Client; the sender thread starts on first use.
+
+        `log_message` reports send errors and must not route back into this emitter.
+        """
+        self.client = client
+        self.log_message = log_message
+        self.interval = interval
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.dropped_logs = 0  # Oldest lines discarded because the queue was full
+        self.dropped_frames = 0  # Frames lost to emit errors
+        self.coalesced_updates = 0  # Stats/active-ops payloads replaced before being sent
+        self.sent_frames = 0
+        self._logs = deque()
+        self._stats = None
+        self._active_ops = None
+        self._metrics_text = None
+        self._last_active_ops = None  # Last list handed to the encoder, re-sent on resync
+        self._ops_encoder = ActiveOpsEncoder()
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._thread = None
+
+    # --- Producers (any thread, never block on the network) ---
+
+    def emit_log(self, message, color):
+        """Queues a log line (color name), dropping the oldest one when the queue is full."""
+        with self._lock:
+            if len(self._logs) >= self.max_queue_size:
+                self._logs.popleft()
+                self.dropped_logs += 1
+                MESSAGES_DROPPED.inc(kind='log')
+            self._logs.append({'message': message, 'color': color})
+        self._ensure_started()
+
+    def set_stats(self, stats_data):
+        """Replaces the pending stats payload (only the latest one is sent)."""
+        with self._lock:
+            if self._stats is not None:
+                self.coalesced_updates += 1
+            self._stats = stats_data
+        self._ensure_started()
+
+    def set_active_ops(self, active_ops_list):
+        """Replaces the pending active-operations payload (only the latest one is sent)."""
+        with self._lock:
+            if self._active_ops is not None:
+                self.coalesced_updates += 1
+            self._active_ops = active_ops_list
+        self._ensure_started()
+
+    def set_metrics(self, metrics_text):
+        """Replaces the pending metrics exposition text relayed by server.py at /metrics."""
+        with self._lock:
+            self._metrics_text = metrics_text
+        self._ensure_started()
+
+    def resync_active_ops(self):
+        """Makes the next frame carry a full active-operations snapshot (new connection or version gap)."""
+        with self._lock:
+            self._ops_encoder.reset()
+            if self._active_ops is None:
+                self._active_ops = self._last_active_ops
+
+    def queue_size(self):
+        """Log lines waiting to be sent."""
+        return len(self._logs)
+
+    def counters(self):
+        """Sent/dropped/coalesced counters for monitoring."""
+        return {
+            'sent_frames': self.sent_frames,
+            'dropped_logs': self.dropped_logs,
+            'dropped_frames': self.dropped_frames,
+            'coalesced_updates': self.coalesced_updates,
+            'queued_logs': self.queue_size(),
+        }
+
+    def flush(self):
+        """Emits the pending frame now (e.g. before disconnecting)."""
+        if self.client.connected:
+            self._send_pending()
+
+    # --- Sender Thread ---
+
+    def _ensure_started(self):
+        """Starts the sender thread once."""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='socket-emitter', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        """Sender loop: one batched frame per interval while connected."""
+        while True:
+            time.sleep(self.interval)
+            if self.client.connected:
+                self._send_pending()
+
+    def _take_frame(self):
+        """Removes up to max_batch_size logs and the latest payloads from the queue."""
+        with self._lock:
+            count = min(len(self._logs), self.max_batch_size)
+            logs = [self._logs.popleft() for _ in range(count)]
+            stats, self._stats = self._stats, None
+            active_ops, self._active_ops = self._active_ops, None
+            metrics_text, self._metrics_text = self._metrics_text, None
+        frame = {}
+        if logs:
+            frame['logs'] = logs
+        if stats is not None:
+            frame['stats'] = stats
+        if metrics_text is not None:
+            frame['metrics'] = metrics_text
+        if active_ops is not None:
+            self._last_active_ops = active_ops
+            kind, payload = self._ops_encoder.encode(active_ops)
+            if kind is not None:
+                frame[f'active_ops_{kind}'] = payload
+        return frame
+
+    def _send_pending(self):
+        """Emits one frame with the queued logs (up to max_batch_size) and the latest payloads."""
+        with self._send_lock:
+            frame = self._take_frame()
+            if not frame:
+                return
+            frame['dropped_logs'] = self.dropped_logs
+            try:
+                with EMIT_LATENCY.time():
+                    self.client.emit(BATCH_EVENT, frame)
+                self.sent_frames += 1
+                FRAMES_SENT.inc()
+            except Exception as e:
+                self.dropped_frames += 1
+                MESSAGES_DROPPED.inc(kind='frame')
+                self.resync_active_ops()  # The receiver may have missed a patch
+                self.log_message(f"Error sending batch to server ({len(frame.get('logs', []))} logs lost): {e}", "RED")
@@ -0,0 +1,48 @@
+# state_snapshot.py
+import os
+import pickle
+import time
+
+from logger_module import logger
+
+STATE_FILENAME = 'state.pkl'
+STATE_FORMAT_VERSION = 1
+
+
+def state_path(log_path):
+    """Location of the state snapshot of a run."""
+    return os.path.join(log_path, STATE_FILENAME)
+
+
+def save_state(log_path, state):
+    """Writes a state snapshot (plain dicts/lists/tuples) atomically. Returns True on success."""
+    filepath = state_path(log_path)
+    temp_filepath = f'{filepath}.tmp'
+    payload = {'format': STATE_FORMAT_VERSION, 'saved_at': time.time(), **state}
+    try:
+        os.makedirs(log_path, exist_ok=True)
+        with open(temp_filepath, 'wb') as file:
+            pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_filepath, filepath)
+        return True
+    except (OSError, pickle.PicklingError, TypeError) as e:
+        logger.log_message(f"Error saving state snapshot to {filepath}: {e}", "RED")
+        return False
+
+
+def load_state(log_path):
+    """Reads the state snapshot of a run, or None if missing or unreadable."""
+    filepath = state_path(log_path)
+    if not os.path.exists(filepath):
+        logger.log_message(f"No state snapshot found at {filepath}.", "YELLOW")
+        return None
+    try:
+        with open(filepath, 'rb') as file:
+            state = pickle.load(file)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError) as e:
+        logger.log_message(f"Error loading state snapshot {filepath}: {e}", "RED")
+        return None
+    if state.get('format') != STATE_FORMAT_VERSION:
+        logger.log_message(f"State snapshot {filepath} has unsupported format {state.get('format')}.", "RED")
+        return None
+    return state
@@ -0,0 +1,172 @@
+# sweep.py
+# Usage: python sweep.py <data_path> --param STOP_LOSS_PERCENTAGE=1,1.5,2 --param TAKE_PROFIT_PERCENTAGE=1:3:0.5 [options]
+# Evaluates TRADING parameter combinations with backtest.py on a process pool and prints a ranked table.
+import argparse
+import csv
+import importlib
+import itertools
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from backtest import load_market, run_backtest
+
+TRADING_KEYS = (
+    'STOP_LOSS_PERCENTAGE',
+    'TAKE_PROFIT_PERCENTAGE',
+    'VARIATION_PERCENTAGE',
+    'VARIATION_100K_PERCENTAGE',
+    'VARIATION_FAST_PERCENTAGE',
+)
+
+# Per-process state, set once by the pool initializer
+_market = None
+_max_concurrent = None
+
+
+def parse_values(spec):
+    """Parses 'v1,v2,...' or 'min:max:step' into a list of floats."""
+    if ':' in spec:
+        start, stop, step = (float(part) for part in spec.split(':'))
+        if step <= 0:
+            raise ValueError(f"step must be positive in '{spec}'")
+        count = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 2) for i in range(max(count, 0))]
+    return [round(float(value), 2) for value in spec.split(',') if value]
+
+
+def parse_param(text):
+    """argparse type for KEY=values."""
+    key, _, spec = text.partition('=')
+    key = key.strip().upper()
+    if key not in TRADING_KEYS:
+        raise argparse.ArgumentTypeError(f"unknown TRADING key '{key}' (expected one of {', '.join(TRADING_KEYS)})")
+    try:
+        values = parse_values(spec)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"invalid values for {key}: {e}")
+    if not values:
+        raise argparse.ArgumentTypeError(f"no values given for {key}")
+    return key, values
+
+
+def build_combinations(base_params, grid, samples=None, seed=None):
+    """Cartesian product of the grid over the base TRADING dict, optionally randomly sampled."""
+    keys = list(grid)
+    product = list(itertools.product(*(grid[key] for key in keys)))
+    if samples is not None and samples < len(product):
+        product = random.Random(seed).sample(product, samples)
+    return [{**base_params, **dict(zip(keys, values))} for values in product]
+
+
+def _init_worker(data_path, max_concurrent):
+    """Pool initializer: memory-maps the cached market data once per worker."""
+    global _market, _max_concurrent
+    _market = load_market(data_path, mmap=True)
+    _max_concurrent = max_concurrent
+
+
+def _evaluate(trading_params):
+    """Runs one backtest in a worker and keeps only the summary."""
+    _, stats, _ = run_backtest(_market, trading_params, _max_concurrent)
+    return trading_params, stats
+
+
+def run_sweep(data_path, combinations, max_concurrent, workers=None):
+    """Evaluates every combination across a process pool. Returns [(params, stats)]."""
+    # Parse once in the parent so the .npy cache exists before the workers map it
+    load_market(data_path)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(data_path, max_concurrent)) as executor:
+        chunksize = max(1, len(combinations) // ((workers or os.cpu_count() or 1) * 4))
+        return list(executor.map(_evaluate, combinations, chunksize=chunksize))
+
+
+def rank(rows, sort_by='efficiency', min_operations=0):
+    """Sorts results by efficiency or PnL (the other one breaks ties)."""
+    rows = [row for row in rows if row[1]['total_finished_operations'] >= min_operations]
+
+    def efficiency(row):
+        return row[1]['finished_operations_efficiency_percentage']
+
+    def pnl(row):
+        return row[1]['finished_pnl_percentage']
+
+    if sort_by == 'pnl':
+        return sorted(rows, key=lambda row: (pnl(row), efficiency(row)), reverse=True)
+    return sorted(rows, key=lambda row: (efficiency(row), pnl(row)), reverse=True)
+
+
+def print_table(rows, limit):
+    """Prints the ranked combinations."""
+    header = ['#', 'SL', 'TP', 'VAR', 'VAR100K', 'VARFAST', 'Ops', 'Wins', 'Losses', 'Eff%', 'PnL%']
+    print(''.join(f'{title:>9}' for title in header))
+    for position, (params, stats) in enumerate(rows[:limit], start=1):
+        values = [position] + [params[key] for key in TRADING_KEYS] + [
+            stats['total_finished_operations'],
+            stats['winning_operations_count'],
+            stats['losing_operations_count'],
+            stats['finished_operations_efficiency_percentage'],
+            stats['finished_pnl_percentage'],
+        ]
+        print(''.join(f'{value:>9}' for value in values))
+
+
+def write_csv(filepath, rows):
+    """Writes every ranked combination with its statistics."""
+    if not rows:
+        return
+    stat_keys = list(rows[0][1])
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(list(TRADING_KEYS) + stat_keys)
+        for params, stats in rows:
+            writer.writerow([params[key] for key in TRADING_KEYS] + [stats[key] for key in stat_keys])
+
+
+def main():
+    """CLI entry point."""
+    parser = argparse.ArgumentParser(description="Grid/random search over the TRADING parameters using backtest.py.")
+    parser.add_argument('data_path', help="Directory of 1m kline dumps or a recorded market_data session")
+    parser.add_argument('--param', action='append', type=parse_param, default=[], metavar='KEY=VALUES',
+                        help="Values as 'v1,v2,...' or 'min:max:step'. Unswept keys keep the constants value")
+    parser.add_argument('--random', type=int, default=None, metavar='N', help="Evaluate N random combinations of the grid")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--constants', default='base', help="Constants module providing the base TRADING values (default: base)")
+    parser.add_argument('--max-concurrent', type=int, default=None, help="Defaults to the constants MAX_CONCURRENT_OPERATIONS")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument('--sort', choices=('efficiency', 'pnl'), default='efficiency')
+    parser.add_argument('--min-operations', type=int, default=0, help="Hide combinations with fewer finished operations")
+    parser.add_argument('--top', type=int, default=20, help="Rows printed (the CSV has all of them)")
+    parser.add_argument('--output', default=None, help="CSV file for the full ranked table")
+    args = parser.parse_args()
+
+    try:
+        constants = importlib.import_module(f'constants.{args.constants}')
+    except ImportError:
+        print(f"CRITICAL Error: constants module 'constants.{args.constants}' not found.", file=sys.stderr)
+        sys.exit(1)
+    base_params = dict(getattr(constants, 'TRADING', {}))
+    missing = [key for key in TRADING_KEYS if key not in base_params]
+    if missing:
+        print(f"CRITICAL Error: constants.{args.constants}.TRADING is missing {', '.join(missing)}.", file=sys.stderr)
+        sys.exit(1)
+    max_concurrent = args.max_concurrent or getattr(constants, 'MAX_CONCURRENT_OPERATIONS', 15)
+
+    combinations = build_combinations(base_params, dict(args.param), args.random, args.seed)
+    print(f"Evaluating {len(combinations)} combinations (max concurrent operations: {max_concurrent})...")
+
+    start = time.perf_counter()
+    rows = rank(run_sweep(args.data_path, combinations, max_concurrent, args.workers), args.sort, args.min_operations)
+    print(f"Sweep finished in {time.perf_counter() - start:.2f}s\n")
+
+    print_table(rows, args.top)
+    if args.output:
+        write_csv(args.output, rows)
+        print(f"\nFull table saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+# conftest.py
+import os
+import sys
+
+# config parses sys.argv on import: keep pytest's own arguments away from it
+sys.argv = sys.argv[:1]
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,40 @@
+# test_backtest.py
+import numpy as np
+
+from backtest import MINUTE_MS, symbol_entry_signals
+from signal_engine import KIND_LONG
+
+PARAMS = {'VARIATION_PERCENTAGE': 0.5, 'VARIATION_100K_PERCENTAGE': 1.0, 'VARIATION_FAST_PERCENTAGE': 1.0}
+
+
+def _columns(minutes, close, quote_volume):
+    """Market columns for candles opened at the given minute numbers."""
+    return {
+        'open_time': np.asarray(minutes, dtype=np.int64) * MINUTE_MS,
+        'close': np.asarray(close, dtype=np.float64),
+        'quote_volume': np.asarray(quote_volume, dtype=np.float64),
+    }
+
+
+def test_window_spanning_missing_minutes_is_skipped():
+    # 30 rows, but minutes 10-19 are missing: the last row is 39 minutes after the first
+    minutes = list(range(10)) + list(range(20, 40))
+    close = [100.0] * 29 + [90.0]  # A 10% drop over the rows would be a LONG
+    signals = symbol_entry_signals(_columns(minutes, close, [1e9] * 30), PARAMS)
+    assert signals[0].size == 0
+
+    contiguous = symbol_entry_signals(_columns(range(30), close, [1e9] * 30), PARAMS)
+    assert list(contiguous[0]) == [29] and list(contiguous[1]) == [KIND_LONG]
+
+
+def test_24h_volume_sums_the_last_day_by_open_time():
+    # A 2-day gap after a high-volume row: that volume is older than 24h at the signal minute
+    minutes = [0] + list(range(2 * 1440, 2 * 1440 + 30))
+    close = [100.0] * 30 + [99.2]  # 0.8%: above VARIATION_PERCENTAGE, below VARIATION_100K_PERCENTAGE
+    volume = [1e9] + [1.0] * 30
+    signals = symbol_entry_signals(_columns(minutes, close, volume), PARAMS)
+    assert signals[0].size == 0
+
+    volume = [1.0] + [1e9] + [1.0] * 29  # Inside the last 24h
+    signals = symbol_entry_signals(_columns(minutes, close, volume), PARAMS)
+    assert list(signals[0]) == [30] and list(signals[1]) == [KIND_LONG]
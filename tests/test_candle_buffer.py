@@ -0,0 +1,44 @@
+# test_candle_buffer.py
+from candle_buffer import CandleBufferStore
+
+MINUTE_MS = 60_000
+
+
+def _rows(first_minute, count, close=1.0):
+    """REST kline rows for `count` consecutive minutes."""
+    return [[(first_minute + i) * MINUTE_MS, '1', '2', '0.5', str(close), '1'] for i in range(count)]
+
+
+def test_warm_ring_tops_up_from_its_newest_candle():
+    store = CandleBufferStore(capacity=30)
+    assert store.topup_start_time('BTC', 30 * MINUTE_MS) is None  # Cold: latest full window
+    store.update('BTC', _rows(0, 30))
+    assert store.topup_start_time('BTC', 31 * MINUTE_MS + 5) == 29 * MINUTE_MS
+    assert store.topup_start_time('BTC', 60 * MINUTE_MS) is None  # Too far behind for one window
+
+
+def test_delayed_topup_keeps_the_window_contiguous():
+    store = CandleBufferStore(capacity=30)
+    store.update('BTC', _rows(0, 30))
+    # Planned at minute 30, sent at minute 33: rows from the newest stored candle onward
+    ring = store.update('BTC', _rows(29, 5, close=2.0))
+    assert ring.count == 30
+    assert ring.last_open_time() - ring.first_open_time() == 29 * MINUTE_MS
+    assert ring.closes()[-5:] == [2.0] * 5  # The candle open at the last fetch was refreshed
+
+
+def test_gapped_rows_rebuild_the_ring():
+    store = CandleBufferStore(capacity=30)
+    store.update('BTC', _rows(0, 30))
+    ring = store.update('BTC', _rows(35, 2))
+    assert [ring.first_open_time(), ring.last_open_time()] == [35 * MINUTE_MS, 36 * MINUTE_MS]
+    assert ring.count == 2
+    assert store.topup_start_time('BTC', 37 * MINUTE_MS) is None  # Partial ring: refetch the window
+
+
+def test_new_rows_of_a_stream_window():
+    store = CandleBufferStore(capacity=30)
+    store.update('BTC', _rows(0, 30))
+    assert [row[0] for row in store.new_rows('BTC', _rows(1, 30))] == [29 * MINUTE_MS, 30 * MINUTE_MS]
+    gapped = _rows(40, 30)
+    assert store.new_rows('BTC', gapped) is gapped
@@ -0,0 +1,12 @@
+# test_kline_stream.py
+from kline_stream import KlineStreamFeed
+
+
+def test_stop_right_after_start_cancels_the_stream_thread():
+    for _ in range(20):
+        feed = KlineStreamFeed('ws://127.0.0.1:9', reconnect_delay=60)  # Refused: the shard waits to reconnect
+        feed.start(['BTCUSDT'])
+        thread = feed._thread
+        feed.stop(timeout=5)
+        assert not thread.is_alive()
+        assert feed._thread is None
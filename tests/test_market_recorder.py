@@ -0,0 +1,49 @@
+# test_market_recorder.py
+import types
+
+import market_recorder
+from binance_service import MarketSnapshot
+from market_recorder import MarketDataRecorder, ReplayBinanceService, replay_session
+
+MINUTE_MS = 60_000
+
+
+def _klines(first_open, count, close=1.0):
+    """REST kline rows for `count` consecutive minutes."""
+    return [[first_open + i * MINUTE_MS, '1', '1', '1', str(close), '1', 0, '10'] for i in range(count)]
+
+
+def _record_session(session_dir, monkeypatch):
+    """Two scanner responses, with a 24h volume of 5 seen live and 999999999 only at the end."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(market_recorder, 'time', types.SimpleNamespace(time=lambda: clock.now))
+    recorder = MarketDataRecorder(str(session_dir))
+    recorder.record_klines('BTCUSDT', _klines(0, 30))  # Before any ticker
+    clock.now = 1010.0
+    recorder.record_tickers([{'symbol': 'BTCUSDT', 'lastPrice': '1', 'quoteVolume': '5'}])
+    clock.now = 1020.0
+    recorder.record_klines('BTCUSDT', _klines(MINUTE_MS, 30))
+    clock.now = 1030.0
+    recorder.record_tickers([{'symbol': 'BTCUSDT', 'lastPrice': '1', 'quoteVolume': '999999999'}])
+    recorder.close()
+
+
+def test_replay_volume_gate_only_sees_recorded_past(tmp_path, monkeypatch):
+    _record_session(tmp_path, monkeypatch)
+    service = ReplayBinanceService(str(tmp_path))
+    snapshot = MarketSnapshot(service, max_age=0)  # Refreshes through the service on every lookup
+    seen = []
+
+    def evaluate(tick, closes):
+        seen.append(snapshot.get_quote_volume(tick))
+
+    assert replay_session(str(tmp_path), evaluate, snapshot=snapshot, service=service) == 2
+    assert seen == [None, 5.0]
+
+
+def test_replay_service_serves_data_up_to_its_clock(tmp_path, monkeypatch):
+    _record_session(tmp_path, monkeypatch)
+    service = ReplayBinanceService(str(tmp_path))
+    service.set_clock(1015.0)
+    assert [t['quoteVolume'] for t in service.get_all_futures_tickers()] == ['5.0']
+    assert service.get_futures_klines('BTCUSDT', limit=1000)[-1][0] == 29 * MINUTE_MS
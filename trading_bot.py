@@ -1,6 +1,8 @@
 # trading_bot.py
 import sys
 import time
+import queue
+import asyncio
 import threading
 import socketio
 import copy
@@ -11,9 +13,20 @@ try:
     # Import logger instance and file logging functions
     from logger_module import logger, setup_file_logging, log_operation_start, \
                             log_operation_progress, finalize_operation_log, \
-                            log_results_to_json
-    from binance_service import binance_service # Initialized instance
+                            results_persister, operation_log_writer
+    from binance_service import binance_service, market_snapshot # Initialized instances
+    from async_binance_service import AsyncBinanceService
+    from rate_limiter import PRIORITY_HIGH
     from notification_service import notification_service # Initialized instance
+    from candle_buffer import candle_buffers # Per-symbol candle rings
+    from operation_store import OperationStore
+    from price_levels import price_levels # Sorted TP/SL levels of the active operations
+    from operation_journal import operation_journal # SQLite journal (None when disabled)
+    from state_snapshot import save_state, load_state
+    from socket_emitter import SocketEmitter
+    from metrics import metrics
+    from profiling import profiler # Opt-in stage timers (no-op unless PROFILING is active)
+    from signal_engine import build_close_matrix, evaluate_close_matrix, KIND_LONG, KIND_FAST_SHORT
 except ImportError as e:
     print(f"CRITICAL ERROR: Failed to import core modules: {e}", file=sys.stderr)
     print("Ensure config.py, logger_module.py, binance_service.py, notification_service.py exist and are correct.", file=sys.stderr)
@@ -23,6 +36,27 @@ except Exception as e:
     sys.exit(1)
 
 
+# --- Metrics (rendered and sent to server.py, which serves them at /metrics) ---
+SCAN_PASS_DURATION = metrics.histogram(
+    'tradingbot_scan_pass_duration_seconds', 'Duration of a REST scanner pass over the symbol universe.',
+    buckets=(1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120, 300))
+SCAN_SYMBOLS_PER_SECOND = metrics.gauge('tradingbot_scan_symbols_per_second', 'Symbols evaluated per second in the last scanner pass.')
+SCANNED_SYMBOLS = metrics.counter('tradingbot_scanned_symbols_total', 'Symbols evaluated by the scanner.')
+EVALUATION_DURATION = metrics.histogram(
+    'tradingbot_evaluation_duration_seconds', 'Duration of one evaluation of the active operations.')
+ACTIVE_OPERATIONS = metrics.gauge('tradingbot_active_operations', 'Active operations per strategy profile.', ('profile',))
+QUEUE_DEPTH = metrics.gauge('tradingbot_queue_depth', 'Items waiting in the internal queues.', ('queue',))
+
+
+def record_scan_pass(processed_count, total_count, pass_time):
+    """Logs and records the metrics of one scanner pass."""
+    rate = processed_count / pass_time if pass_time > 0 else 0.0
+    SCAN_PASS_DURATION.observe(pass_time)
+    SCAN_SYMBOLS_PER_SECOND.set(rate)
+    SCANNED_SYMBOLS.inc(processed_count)
+    logger.log_message(f"Scanner: Pass over {processed_count}/{total_count} symbols in {pass_time:.2f}s ({rate:.1f} symbols/s).")
+
+
 # --- Socket.IO Client Setup ---
 sio_client = socketio.Client(logger=False, engineio_logger=False)
 connected_to_server = False
@@ -34,10 +68,17 @@ def connect():
     logger.log_message(f'Trading Bot (PIN: {config.PIN}) connected to server.', 'GREEN')
     send_log_to_server(f'Trading Bot (PIN: {config.PIN}) connected to server.', 'GREEN')
     # Send initial stats and active operations upon connection
+    socket_emitter.resync_active_ops() # The server gets a full snapshot, then patches
     send_stats_to_server()
     send_active_operations_to_server() # Send current state
 
 
+@sio_client.on('active_ops_resync')
+def on_active_ops_resync(data=None):
+    """The server missed an active-operations patch: send a snapshot next."""
+    socket_emitter.resync_active_ops()
+
+
 @sio_client.event
 def connect_error(data):
     global connected_to_server
@@ -53,24 +94,26 @@ def disconnect():
     connected_to_server = False
 
 def send_log_to_server(message, color="default"):
-    """Attempts to send the log to the server if connected."""
-    global connected_to_server
+    """Queues the log for the server if connected (sent in the next batch)."""
     if connected_to_server:
-        try:
-            web_color_style = logger.get_web_color_style(color)
-            sio_client.emit('log_from_script', {'message': message, 'color': web_color_style})
-        except socketio.exceptions.BadNamespaceError:
-            logger.log_message("Socket.IO connection lost (BadNamespaceError), attempting reconnect implicitly.", "RED")
-            connected_to_server = False # Mark as disconnected
-        except Exception as e:
-            logger.log_message(f"Error sending log to server: {e}", "RED")
+        socket_emitter.emit_log(message, color) # server.py numbers and styles it
 
 
 # --- Wrap logger.log_message to also send to server ---
 original_log_message = logger.log_message
-def wrapped_log_message(message, color="default"):
+
+# Logs, stats and active operations leave in batched frames from a sender thread
+socket_emitter = SocketEmitter(
+    sio_client, original_log_message,
+    interval=config.SERVER_EMIT_INTERVAL, max_queue_size=config.SERVER_EMIT_MAX_QUEUE_SIZE,
+)
+QUEUE_DEPTH.set_function(socket_emitter.queue_size, queue='socket_emitter')
+QUEUE_DEPTH.set_function(operation_log_writer.queue_size, queue='operation_log_writer')
+if operation_journal:
+    QUEUE_DEPTH.set_function(operation_journal.queue_size, queue='operation_journal')
+def wrapped_log_message(message, color="default", level=None):
     """Logs locally and sends to Socket.IO server."""
-    original_log_message(message, color) # Log to console first
+    original_log_message(message, color, level) # Log to console first
     send_log_to_server(message, color) # Then attempt to send
 
 # Replace the logger's method with the wrapped one
@@ -78,52 +121,46 @@ logger.log_message = wrapped_log_message
 
 # --- Function to Send Statistics ---
 def send_stats_to_server():
-    """Calculates and sends current statistics to the server if connected."""
-    global connected_to_server
+    """Calculates current statistics and queues them for the server if connected."""
     if not connected_to_server:
         return
 
     try:
-        in_progress_count = sum(results.get(config.IN_PROGRESS_NAME, {}).values())
-        winning_count = sum(results.get(config.WIN_NAME, {}).values())
-        losing_count = sum(results.get(config.LOSE_NAME, {}).values())
-        total_finished = winning_count + losing_count
-        efficiency = round(winning_count * 100 / total_finished, 2) if total_finished > 0 else 0.0
-
+        stats = primary_profile.stats()
         stats_data = {
             "pin": config.PIN,
-            "in_progress": in_progress_count,
-            "wins": winning_count,
-            "losses": losing_count,
-            "total_finished": total_finished,
-            "efficiency": f"{efficiency:.2f}%",
+            "in_progress": stats["in_progress_operations_count"],
+            "wins": stats["winning_operations_count"],
+            "losses": stats["losing_operations_count"],
+            "total_finished": stats["total_finished_operations"],
+            "efficiency": f"{stats['finished_operations_efficiency_percentage']:.2f}%",
             "timestamp": time.strftime('%Y-%m-%d %H:%M:%S')
         }
-        sio_client.emit('stats_from_script', stats_data)
+        if len(profiles) > 1:
+            # The headline numbers stay the main profile's; the rest are listed alongside
+            stats_data["profiles"] = [{"name": profile.name, "pin": profile.pin, **profile.stats()} for profile in profiles]
+        socket_emitter.set_stats(stats_data)
 
-    except socketio.exceptions.BadNamespaceError:
-        logger.log_message("Socket.IO connection lost (BadNamespaceError) while sending stats.", "RED")
-        connected_to_server = False
     except Exception as e:
         logger.log_message(f"Error calculating or sending statistics: {e}", "RED")
 
 # --- Function to Send Active Operations ---
 def send_active_operations_to_server():
-    """Collects details of active operations and sends them to the server."""
-    global connected_to_server
+    """Collects details of active operations and queues them for the server."""
     if not connected_to_server:
         return
 
     active_ops_list = []
     try:
         # Iterate safely over a copy of items in case dict changes
-        for tick, op_data in list(possible_operations.items()):
+        for profile, tick, op_data in iter_active_operations():
             if op_data.get('is_active', False):
                 # Calculate current difference if possible (might be slightly stale)
                 current_diff = op_data.get('last_difference', 0.0)
 
                 active_ops_list.append({
-                    'tick': tick,
+                    'tick': profile.operation_key(tick),
+                    'profile': profile.name,
                     'type_name': op_data['type'].get('name', 'N/A'),
                     'type_emoji': op_data['type'].get('emoji', '?'),
                     'entry_price': f"{op_data.get('entry_price', 0):.5f}",
@@ -134,22 +171,78 @@ def send_active_operations_to_server():
                     'start_time': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(op_data.get('start_time', 0))),
                 })
 
-        # Sort list alphabetically by ticker for consistent display
-        active_ops_list.sort(key=lambda x: x['tick'])
-
-        sio_client.emit('active_ops_from_script', active_ops_list)
-        # logger.log_message(f"Sent {len(active_ops_list)} active operations to server.") # Optional debug
+        # The emitter diffs it against the last list sent (snapshots are sorted by tick)
+        socket_emitter.set_active_ops(active_ops_list)
 
-    except socketio.exceptions.BadNamespaceError:
-        logger.log_message("Socket.IO connection lost (BadNamespaceError) while sending active ops.", "RED")
-        connected_to_server = False
     except Exception as e:
         logger.log_message(f"Error collecting or sending active operations: {e}", "RED")
 
 
 # --- Bot State ---
-possible_operations = {} # Stores active and recently finished operations
-results = copy.deepcopy(config.INITIAL_RESULTS)
+
+class StrategyProfile:
+    """One TRADING parameter set with its own PIN, operations, results and log path."""
+
+    def __init__(self, name, pin, trading_params, log_path, max_concurrent_operations, primary=False):
+        self.name = name
+        self.pin = pin
+        self.trading_params = trading_params
+        self.log_path = log_path
+        self.max_concurrent_operations = max_concurrent_operations
+        self.primary = primary
+        # Active and recently finished operations; older finished ones go to <log_path>/operations.jsonl
+        self.possible_operations = OperationStore(
+            retention=config.OPERATION_RETENTION,
+            archive_dir=log_path if config.ACTIVE_LOG else None,
+        )
+        self.results = copy.deepcopy(config.INITIAL_RESULTS)
+        self.results_lock = threading.Lock() # Operations are opened and closed from several threads
+
+    def operation_key(self, tick):
+        """Label of an operation outside the profile (extra profiles are prefixed with their name)."""
+        return tick if self.primary else f'{self.name}:{tick}'
+
+    def active_count(self):
+        """Number of active operations of this profile."""
+        return self.possible_operations.active_count()
+
+    def stats(self):
+        """Aggregated statistics in the results.json layout."""
+        in_progress_count = sum(self.results.get(config.IN_PROGRESS_NAME, {}).values())
+        winning_count = sum(self.results.get(config.WIN_NAME, {}).values())
+        losing_count = sum(self.results.get(config.LOSE_NAME, {}).values())
+        total_finished = winning_count + losing_count
+        efficiency = round(winning_count * 100 / total_finished, 2) if total_finished > 0 else 0.0
+        return {
+            "in_progress_operations_count": in_progress_count,
+            "winning_operations_count": winning_count,
+            "losing_operations_count": losing_count,
+            "total_finished_operations": total_finished,
+            "total_operations_recorded": total_finished + in_progress_count,
+            "finished_operations_efficiency_percentage": efficiency,
+        }
+
+
+# All profiles share one scanner pass and one ticker snapshot; the first one is the main profile
+profiles = [StrategyProfile(primary=(index == 0), **profile) for index, profile in enumerate(config.STRATEGY_PROFILES)]
+primary_profile = profiles[0]
+profiles_by_name = {profile.name: profile for profile in profiles}
+possible_operations = primary_profile.possible_operations # Main profile state, kept under the original names
+results = primary_profile.results
+for profile in profiles:
+    ACTIVE_OPERATIONS.set_function(profile.possible_operations.active_count, profile=profile.name)
+
+
+def iter_active_operations():
+    """Yields (profile, tick, operation_data) over a snapshot of every profile's active operations."""
+    for profile in profiles:
+        for tick, operation_data in profile.possible_operations.active_items():
+            yield profile, tick, operation_data
+
+
+def has_active_operations():
+    """True if any profile has an active operation."""
+    return any(profile.active_count() for profile in profiles)
 
 
 # --- Core Trading Logic Functions ---
@@ -166,10 +259,11 @@ def calculate_variation(price1, price2):
         logger.log_message(f"Error converting prices to float for variation calculation: {price1}, {price2}", "RED")
         return 0.0
 
-def calculate_tp_sl(operation_type, current_price):
+def calculate_tp_sl(operation_type, current_price, trading_params=None):
     """Calculates Take Profit and Stop Loss values."""
-    tp_perc = config.TRADING_PARAMS.get('TAKE_PROFIT_PERCENTAGE', 0.5)
-    sl_perc = config.TRADING_PARAMS.get('STOP_LOSS_PERCENTAGE', 0.3)
+    trading_params = trading_params or config.TRADING_PARAMS
+    tp_perc = trading_params.get('TAKE_PROFIT_PERCENTAGE', 0.5)
+    sl_perc = trading_params.get('STOP_LOSS_PERCENTAGE', 0.3)
     try:
         price = float(current_price)
         if price <= 0: return 0.0, 0.0
@@ -222,26 +316,148 @@ def check_deactivation(operation_type, current_price, operation_data):
         return False, None
 
 
+def first_level_hit(candles, tp, sl, is_long):
+    """Finds the first candle whose high/low reaches TP or SL.
+
+    `candles` are (open_time, high, low, close) tuples in chronological order. Returns
+    (final_status, level_price) or (None, None). Tie-break: when one candle reaches both
+    levels the order inside it is unknown, so the stop loss counts as hit first
+    (conservative, same rule as backtest.first_exit).
+    """
+    for _, high, low, _ in candles:
+        if is_long:
+            sl_hit, tp_hit = low <= sl, high >= tp
+        else:
+            sl_hit, tp_hit = high >= sl, low <= tp
+        if sl_hit:
+            return config.LOSE_NAME, sl
+        if tp_hit:
+            return config.WIN_NAME, tp
+    return None, None
+
+
+MAX_KLINES_PER_REQUEST = 1000 # Binance futures klines page size (1000 candles = ~16.7 h of 1m)
+
+
+def intrabar_check_start(tick, operation_data, now_ms, use_buffer=True):
+    """First step of the intrabar TP/SL check: (result, None) when decided without a request, else (None, first_open).
+
+    The scanner's candle ring is reused when it covers the period (and use_buffer is set). The entry
+    minute is skipped: its high/low may predate the entry (the live price checks cover it).
+    """
+    interval_ms = candle_buffers.interval_ms
+    entry_open = int(operation_data['start_time'] * 1000) // interval_ms * interval_ms
+    first_open = entry_open + interval_ms
+    if operation_data.get('checked_until'):
+        first_open = max(first_open, operation_data['checked_until'])
+    if first_open > now_ms:
+        return (False, None, None), None # Still inside the entry minute
+
+    ring = candle_buffers.get(tick)
+    if use_buffer and ring is not None and ring.count and ring.first_open_time() <= first_open:
+        candles = ring.candles_since(first_open)
+        if not candles:
+            return (False, None, None), None
+        # The newest candle may still be open, so the next check starts from it again
+        operation_data['checked_until'] = candles[-1][0]
+        is_long = operation_data['type']['name'] == config.LONG_NAME
+        final_status, level_price = first_level_hit(candles, operation_data['tp'], operation_data['sl'], is_long)
+        return (final_status is not None, final_status, level_price), None
+    return None, first_open
+
+
+def intrabar_page_limit(page_start, now_ms):
+    """Candles to request from page_start up to now_ms (one page at most)."""
+    return min(MAX_KLINES_PER_REQUEST, (now_ms - page_start) // candle_buffers.interval_ms + 1)
+
+
+def intrabar_check_page(tick, operation_data, klines, page_start, limit, first_open):
+    """Applies one fetched page of the intrabar check: (result, None) when done, else (None, next_page_start)."""
+    if not klines:
+        if page_start > first_open:
+            logger.log_message(f"Intrabar check for {tick} stopped at {time.strftime('%Y-%m-%d %H:%M', time.localtime(page_start / 1000))}: candles after it could not be fetched.", "YELLOW")
+        return (False, None, None), None
+    candles = [(int(k[0]), float(k[2]), float(k[3]), float(k[4])) for k in klines if int(k[0]) >= page_start]
+    if not candles:
+        return (False, None, None), None
+    operation_data['checked_until'] = candles[-1][0]
+    is_long = operation_data['type']['name'] == config.LONG_NAME
+    final_status, level_price = first_level_hit(candles, operation_data['tp'], operation_data['sl'], is_long)
+    if final_status is not None:
+        return (True, final_status, level_price), None
+    if len(klines) < limit:
+        return (False, None, None), None
+    return None, candles[-1][0] + candle_buffers.interval_ms
+
+
+def check_intrabar_deactivation(tick, operation_data, now_ms, use_buffer=True):
+    """Checks the 1m candles since the last evaluation for a TP/SL wick.
+
+    Candles missing from the scanner's ring are fetched page by page from the last checked one,
+    so long gaps (e.g. a resumed run) are covered. Returns (deactivate, final_status, level_price).
+    """
+    result, page_start = intrabar_check_start(tick, operation_data, now_ms, use_buffer)
+    first_open = page_start
+    while result is None:
+        if page_start > now_ms:
+            return False, None, None
+        limit = intrabar_page_limit(page_start, now_ms)
+        with profiler.stage('fetch'):
+            klines = binance_service.get_futures_klines(tick, limit=limit, priority=PRIORITY_HIGH, start_time=page_start)
+        result, page_start = intrabar_check_page(tick, operation_data, klines, page_start, limit, first_open)
+    return result
+
+
+async def check_intrabar_deactivation_async(service, tick, operation_data, now_ms):
+    """check_intrabar_deactivation() for the event loop: pages are awaited on the async service."""
+    result, page_start = intrabar_check_start(tick, operation_data, now_ms)
+    first_open = page_start
+    while result is None:
+        if page_start > now_ms:
+            return False, None, None
+        limit = intrabar_page_limit(page_start, now_ms)
+        klines = await service.get_futures_klines(tick, limit=limit, priority=PRIORITY_HIGH, start_time=page_start)
+        result, page_start = intrabar_check_page(tick, operation_data, klines, page_start, limit, first_open)
+    return result
+
+
+async def check_intrabar_exits_async(service):
+    """Runs the intrabar check of every active operation on the event loop, keyed by (profile name, tick)."""
+    results = {}
+    now_ms = int(time.time() * 1000)
+    for profile in profiles:
+        for tick in profile.possible_operations.active_ticks():
+            operation_data = profile.possible_operations.get(tick)
+            if not operation_data or not operation_data.get('is_active'):
+                continue
+            try:
+                results[(profile.name, tick)] = await check_intrabar_deactivation_async(service, tick, operation_data, now_ms)
+            except Exception as e:
+                logger.log_message(f"Intrabar check failed for {profile.operation_key(tick)}: {e}", "RED")
+    return results
+
+
 # --- Operation Processing ---
 
-def process_entry_condition(tick, variation, operation_type_name, current_price):
+def process_entry_condition(tick, variation, operation_type_name, current_price, profile=None):
     """Processes a potential entry."""
+    profile = profile or primary_profile
     try:
-        var_perc = config.TRADING_PARAMS.get('VARIATION_PERCENTAGE', 0.5)
-        var_100k_perc = config.TRADING_PARAMS.get('VARIATION_100K_PERCENTAGE', 1.0)
+        var_perc = profile.trading_params.get('VARIATION_PERCENTAGE', 0.5)
+        var_100k_perc = profile.trading_params.get('VARIATION_100K_PERCENTAGE', 1.0)
         operation_type = config.TYPE_DEFINITIONS.get(operation_type_name)
         if not operation_type:
             logger.log_message(f"Unknown operation type name: {operation_type_name}", "RED")
             return
 
         if variation >= var_perc:
-            info = binance_service.get_futures_ticker_info(tick)
+            info = market_snapshot.get_ticker(tick)
             if info is None or 'quoteVolume' not in info:
                 logger.log_message(f"Could not get volume info for {tick} to check entry condition.", "RED")
                 return
             volume = float(info.get('quoteVolume', 0))
             if volume > 100_000_000 or variation >= var_100k_perc:
-                trigger_new_operation(tick, operation_type, current_price)
+                trigger_new_operation(tick, operation_type, current_price, profile)
     except KeyError as e:
         logger.log_message(f"Error: Key '{e}' missing in config.TRADING_PARAMS (process_entry).", "RED")
     except (ValueError, TypeError) as e:
@@ -250,40 +466,35 @@ def process_entry_condition(tick, variation, operation_type_name, current_price)
         logger.log_message(f"Unexpected error in process_entry_condition for {tick}: {e}", "RED")
 
 
-def trigger_new_operation(tick, operation_type, current_price):
+def trigger_new_operation(tick, operation_type, current_price, profile=None):
     """Initiates a new trading operation if limits allow."""
+    profile = profile or primary_profile
+    possible_operations = profile.possible_operations
     try:
         # Check if operation already active
-        if tick in possible_operations and possible_operations[tick].get('is_active', False):
+        if possible_operations.is_active(tick):
             return
 
         # --- ENFORCE MAX CONCURRENT OPERATIONS LIMIT ---
-        active_ops_count = sum(1 for op in possible_operations.values() if op.get('is_active', False))
-        if active_ops_count >= config.MAX_CONCURRENT_OPERATIONS:
-            logger.log_message(f"Max concurrent operations ({config.MAX_CONCURRENT_OPERATIONS}) reached. Ignoring potential entry for {tick}.", "YELLOW")
+        if profile.active_count() >= profile.max_concurrent_operations:
+            logger.log_message(f"Max concurrent operations ({profile.max_concurrent_operations}) reached. Ignoring potential entry for {profile.operation_key(tick)}.", "YELLOW")
             return
 
-        tp, sl = calculate_tp_sl(operation_type, current_price)
+        tp, sl = calculate_tp_sl(operation_type, current_price, profile.trading_params)
         if tp == 0.0 and sl == 0.0:
             logger.log_message(f"Failed to calculate TP/SL for {tick}, cannot start operation.", "RED")
             return
 
-        operation_data = {
-            'tick': tick,
-            'type': operation_type,
-            'entry_price': current_price,
-            'tp': tp,
-            'sl': sl,
-            'start_time': time.time(),
-            'is_active': True,
-            'status': config.IN_PROGRESS_NAME,
-            'last_difference': 0.0 # Initialize last known difference
-        }
-        possible_operations[tick] = operation_data
-        results[config.IN_PROGRESS_NAME][operation_type['name']] += 1
+        operation_data = possible_operations.open(tick, operation_type, current_price, tp, sl, config.IN_PROGRESS_NAME)
+        if operation_data is None:
+            return # Opened concurrently
+        with profile.results_lock:
+            profile.results[config.IN_PROGRESS_NAME][operation_type['name']] += 1
+        if config.EVENT_DRIVEN_EXITS:
+            register_price_levels(profile, operation_data)
 
-        log_title = f'NEW OPERATION - PIN: {config.PIN}'
-        log_msg = f'{operation_type.get("emoji","?")}{operation_type["name"]}: {tick}'
+        log_title = f'NEW OPERATION - PIN: {profile.pin}'
+        log_msg = f'{operation_type.get("emoji","?")}{operation_type["name"]}: {profile.operation_key(tick)}'
         logger.log_message('-----------------')
         logger.log_message(log_title)
         logger.log_message(log_msg, "GREEN")
@@ -292,16 +503,20 @@ def trigger_new_operation(tick, operation_type, current_price):
         logger.log_message(f'Stop loss: {sl}')
         logger.log_message('-----------------')
 
-        log_operation_start(config.LOG_PATH, config.PIN, config.TRADING_PARAMS, operation_data)
+        log_operation_start(profile.log_path, profile.pin, profile.trading_params, operation_data)
+        if operation_journal:
+            operation_journal.record_start(profile.pin, profile.name, profile.trading_params, operation_data)
 
-        notification_title = f'{operation_type.get("emoji","?")}{operation_type["name"]}\n{tick}'
+        notification_title = f'{operation_type.get("emoji","?")}{operation_type["name"]}\n{profile.operation_key(tick)}'
         notification_message = f'Entry Price: {current_price}\nTake profit: {tp}\nStop loss: {sl}'
-        notification_service.show_notification(notification_title, notification_message)
-        notification_service.play_alert_sound()
+        with profiler.stage('notify'):
+            notification_service.show_notification(notification_title, notification_message)
+            notification_service.play_alert_sound()
 
         # Send updated stats and active operations list
-        send_stats_to_server()
-        send_active_operations_to_server()
+        with profiler.stage('emit'):
+            send_stats_to_server()
+            send_active_operations_to_server()
 
     except KeyError as e:
         logger.log_message(f"Error accessing config or results key during operation trigger: {e}", "RED")
@@ -316,45 +531,122 @@ def evaluate_variation_from_klines(tick, klines):
     if not klines or len(klines) < 2:
         return
     try:
-        first_candle_index = 0
-        last_closed_candle_index = len(klines) - 1
-        initial_price = float(klines[first_candle_index][4])
-        final_price = float(klines[last_closed_candle_index][4])
-        if initial_price == 0: return
+        closes = [float(kline[4]) for kline in klines]
+    except (IndexError, ValueError, TypeError) as e:
+        logger.log_message(f"Data error reading closes for {tick}: {e}", "RED")
+        return
+    evaluate_variation_from_closes(tick, closes)
+
 
-        if initial_price > final_price:
-            variation = calculate_variation(initial_price, final_price)
-            process_entry_condition(tick, variation, config.LONG_NAME, final_price)
-        elif final_price > initial_price:
-            variation = calculate_variation(final_price, initial_price)
-            process_entry_condition(tick, variation, config.SHORT_NAME, final_price)
+def evaluate_variation_from_closes(tick, closes):
+    """Evaluates price variations from close prices in chronological order."""
+    if len(closes) < 2:
+        return
+    try:
+        initial_price = closes[0]
+        final_price = closes[-1]
+        if initial_price == 0: return
 
-        if len(klines) >= 3:
-            prev_prev_price = float(klines[last_closed_candle_index - 2][4])
+        # Variations are computed once; each profile applies its own thresholds
+        for profile in profiles:
+            if initial_price > final_price:
+                variation = calculate_variation(initial_price, final_price)
+                process_entry_condition(tick, variation, config.LONG_NAME, final_price, profile)
+            elif final_price > initial_price:
+                variation = calculate_variation(final_price, initial_price)
+                process_entry_condition(tick, variation, config.SHORT_NAME, final_price, profile)
+
+        if len(closes) >= 3:
+            prev_prev_price = closes[-3]
             current_price = final_price
             if prev_prev_price == 0: return
             if current_price > prev_prev_price:
                 fast_variation = calculate_variation(current_price, prev_prev_price)
-                var_fast_perc = config.TRADING_PARAMS.get('VARIATION_FAST_PERCENTAGE', 1.0)
-                if fast_variation >= var_fast_perc:
-                    trigger_new_operation(tick, config.TYPE_DEFINITIONS[config.FAST_SHORT_NAME], current_price)
+                for profile in profiles:
+                    var_fast_perc = profile.trading_params.get('VARIATION_FAST_PERCENTAGE', 1.0)
+                    if fast_variation >= var_fast_perc:
+                        trigger_new_operation(tick, config.TYPE_DEFINITIONS[config.FAST_SHORT_NAME], current_price, profile)
     except IndexError:
-        logger.log_message(f"Index error evaluating variation for {tick} (klines len: {len(klines)}).", "RED")
+        logger.log_message(f"Index error evaluating variation for {tick} (closes len: {len(closes)}).", "RED")
     except (ValueError, TypeError) as e:
         logger.log_message(f"Data error evaluating variation for {tick}: {e}", "RED")
     except Exception as e:
-        logger.log_message(f"Unexpected error in evaluate_variation_from_klines for {tick}: {e}", "RED")
+        logger.log_message(f"Unexpected error in evaluate_variation_from_closes for {tick}: {e}", "RED")
+
+
+def evaluate_universe_batch(symbols):
+    """Evaluates every symbol's candle buffer in one vectorized pass and processes the candidates."""
+    try:
+        matrix = build_close_matrix([candle_buffers.closes(tick) for tick in symbols], candle_buffers.capacity)
+    except Exception as e:
+        logger.log_message(f"Unexpected error in batch evaluation: {e}", "RED")
+        return
+
+    # One close matrix for every profile; only the thresholds differ
+    for profile in profiles:
+        try:
+            candidates = evaluate_close_matrix(
+                matrix,
+                profile.trading_params.get('VARIATION_PERCENTAGE', 0.5),
+                profile.trading_params.get('VARIATION_FAST_PERCENTAGE', 1.0),
+            )
+        except Exception as e:
+            logger.log_message(f"Unexpected error in batch evaluation ({profile.name}): {e}", "RED")
+            continue
+
+        for candidate in candidates:
+            tick = symbols[candidate['row']]
+            price = float(candidate['price'])
+            if candidate['kind'] == KIND_FAST_SHORT:
+                trigger_new_operation(tick, config.TYPE_DEFINITIONS[config.FAST_SHORT_NAME], price, profile)
+            else:
+                type_name = config.LONG_NAME if candidate['kind'] == KIND_LONG else config.SHORT_NAME
+                process_entry_condition(tick, float(candidate['variation']), type_name, price, profile)
+
+
+def evaluate_active_operations(intrabar_results=None):
+    """Evaluates the evolution of all active operations.
+
+    `intrabar_results` holds intrabar checks already run on the event loop (ASYNC_MODE), keyed by
+    (profile name, tick); without it the checks fetch their candles here.
+    """
+    if not has_active_operations():
+        return
+    evaluation_start = time.perf_counter()
 
+    # One all-market ticker request per cycle instead of one per active operation, shared by all profiles
+    with profiler.stage('fetch'):
+        market_snapshot.ensure_fresh(priority=PRIORITY_HIGH)
 
-def evaluate_active_operations():
-    """Evaluates the evolution of all active operations."""
+    stats_changed = False
+    active_ops_list_updated = False
+    for profile in profiles:
+        with profiler.stage('evaluate'):
+            profile_stats_changed, profile_ops_updated = evaluate_profile_operations(profile, intrabar_results)
+        if profile_stats_changed:
+            save_aggregated_results(profile, send_updates=False)
+        stats_changed = stats_changed or profile_stats_changed
+        active_ops_list_updated = active_ops_list_updated or profile_ops_updated
+
+    # --- Send Updates if Changed ---
+    with profiler.stage('emit'):
+        if stats_changed:
+            send_stats_to_server()
+            send_active_operations_to_server()
+        elif active_ops_list_updated:
+            # Only send updated active ops if stats didn't change but differences did
+            send_active_operations_to_server()
+    EVALUATION_DURATION.observe(time.perf_counter() - evaluation_start)
+
+
+def evaluate_profile_operations(profile, intrabar_results=None):
+    """Evaluates one profile's active operations against the snapshot. Returns (stats_changed, ops_updated)."""
+    possible_operations = profile.possible_operations
     operations_to_finalize = []
     stats_changed = False
     active_ops_list_updated = False # Flag to check if differences updated
 
-    active_ticks = [tick for tick, op in possible_operations.items() if op.get('is_active', False)]
-    if not active_ticks:
-        return
+    active_ticks = possible_operations.active_ticks()
 
     for tick in active_ticks:
         operation_data = possible_operations.get(tick)
@@ -362,7 +654,7 @@ def evaluate_active_operations():
             continue
 
         try:
-            info = binance_service.get_futures_ticker_info(tick)
+            info = market_snapshot.get_ticker(tick)
             if info is None or 'lastPrice' not in info:
                 logger.log_message(f"Could not get current price for {tick} during evaluation.", "RED")
                 continue
@@ -375,20 +667,33 @@ def evaluate_active_operations():
 
             # --- Store the latest difference in the operation data ---
             if operation_data.get('last_difference') != difference:
-                possible_operations[tick]['last_difference'] = difference
+                operation_data['last_difference'] = difference
                 active_ops_list_updated = True # Mark that differences changed
 
             color = "GREEN" if difference >= 0 else "RED"
             tp_str = f"{operation_data.get('tp', 'N/A'):.8f}" if isinstance(operation_data.get('tp'), float) else 'N/A'
             sl_str = f"{operation_data.get('sl', 'N/A'):.8f}" if isinstance(operation_data.get('sl'), float) else 'N/A'
-            logger.log_message(f"Eval: {tick} ({operation_type['name']}) Diff: {difference:.2f}%", color)
+            logger.log_message(f"Eval: {profile.operation_key(tick)} ({operation_type['name']}) Diff: {difference:.2f}%", color)
 
-            log_operation_progress(config.LOG_PATH, operation_data, current_price, difference)
+            log_operation_progress(profile.log_path, operation_data, current_price, difference)
+            if operation_journal:
+                operation_journal.record_progress(profile.pin, operation_data, current_price, difference)
 
-            deactivate, final_status = check_deactivation(operation_type, current_price, operation_data)
+            deactivate, final_status = False, None
+            if config.INTRABAR_EXITS:
+                # Wicks between evaluations: the candle high/low decide, closing at the level itself
+                if intrabar_results is not None:
+                    deactivate, final_status, level_price = intrabar_results.get((profile.name, tick), (False, None, None))
+                else:
+                    deactivate, final_status, level_price = check_intrabar_deactivation(tick, operation_data, int(time.time() * 1000))
+                if deactivate:
+                    current_price = level_price
+                    difference = calculate_difference(entry_price, level_price, operation_type)
+            if not deactivate:
+                deactivate, final_status = check_deactivation(operation_type, current_price, operation_data)
 
             if deactivate:
-                logger.log_message(f"Operation {tick} hit {final_status} at price {current_price:.8f} (Diff: {difference:.2f}%)", "GREEN" if final_status == config.WIN_NAME else "RED")
+                logger.log_message(f"Operation {profile.operation_key(tick)} hit {final_status} at price {current_price:.8f} (Diff: {difference:.2f}%)", "GREEN" if final_status == config.WIN_NAME else "RED")
                 operations_to_finalize.append({
                     'tick': tick,
                     'final_status': final_status,
@@ -406,67 +711,99 @@ def evaluate_active_operations():
 
     # --- Finalize Operations ---
     if operations_to_finalize:
-        logger.log_message(f"[Eval] Finalizing {len(operations_to_finalize)} operations.")
+        logger.log_message(f"[Eval] Finalizing {len(operations_to_finalize)} operations{'' if profile.primary else f' ({profile.name})'}.")
 
     for item in operations_to_finalize:
-        tick_to_finalize = item['tick']
-        op_data = item['operation_data']
-        op_type = op_data['type']
-        final_status = item['final_status']
-
-        if tick_to_finalize in possible_operations:
-            possible_operations[tick_to_finalize]['is_active'] = False
-            possible_operations[tick_to_finalize]['status'] = final_status
-            possible_operations[tick_to_finalize]['final_price'] = item['final_price']
-            possible_operations[tick_to_finalize]['final_difference'] = item['final_difference']
-            possible_operations[tick_to_finalize]['end_time'] = time.time()
+        # False when the price-level trigger already closed it in the meantime
+        finalize_operation(profile, item['tick'], item['final_status'], item['final_price'], item['final_difference'])
 
-            try:
-                results[final_status][op_type['name']] += 1
-                if results[config.IN_PROGRESS_NAME][op_type['name']] > 0:
-                    results[config.IN_PROGRESS_NAME][op_type['name']] -= 1
-                else:
-                    logger.log_message(f"Warning: In-progress count for {op_type['name']} was already 0 when finalizing {tick_to_finalize}.", "YELLOW")
-            except KeyError:
-                logger.log_message(f"Error: Key not found updating results for {tick_to_finalize} ({op_type['name']}/{final_status}).", "RED")
+    return stats_changed, active_ops_list_updated
+
+
+def finalize_operation(profile, tick, final_status, final_price, final_difference):
+    """Closes an active operation: results, price levels and operation log. Returns False if it was not active."""
+    op_data = profile.possible_operations.finish(tick, final_status, final_price, final_difference)
+    if op_data is None:
+        return False
+    price_levels.remove((profile.name, tick))
+    op_type = op_data['type']
+
+    try:
+        with profile.results_lock:
+            profile.results[final_status][op_type['name']] += 1
+            if profile.results[config.IN_PROGRESS_NAME][op_type['name']] > 0:
+                profile.results[config.IN_PROGRESS_NAME][op_type['name']] -= 1
+            else:
+                logger.log_message(f"Warning: In-progress count for {op_type['name']} was already 0 when finalizing {tick}.", "YELLOW")
+    except KeyError:
+        logger.log_message(f"Error: Key not found updating results for {tick} ({op_type['name']}/{final_status}).", "RED")
+
+    finalize_operation_log(profile.log_path, op_data, final_status, final_price, final_difference)
+    if operation_journal:
+        operation_journal.record_finalize(profile.pin, op_data, final_status, final_price, final_difference)
+    return True
+
+
+# --- Event-Driven Exits ---
+
+exit_events = queue.Queue() # (profile name, tick, final status, price) detected by the price-level index
+QUEUE_DEPTH.set_function(exit_events.qsize, queue='exit_events')
+
+
+def register_price_levels(profile, operation_data):
+    """Indexes an operation's TP and SL so price updates can close it immediately."""
+    tp, sl = operation_data['tp'], operation_data['sl']
+    if operation_data['type']['name'] == config.LONG_NAME:
+        price_levels.add(operation_data['tick'], (profile.name, operation_data['tick']), tp, config.WIN_NAME, sl, config.LOSE_NAME)
+    else:
+        price_levels.add(operation_data['tick'], (profile.name, operation_data['tick']), sl, config.LOSE_NAME, tp, config.WIN_NAME)
+
+
+def on_price_update(symbol, price):
+    """Price listener (stream or snapshot thread): queues the operations whose TP/SL the price crossed."""
+    for (profile_name, tick), final_status in price_levels.check(symbol, price):
+        exit_events.put((profile_name, tick, final_status, price))
 
-            finalize_operation_log(config.LOG_PATH, op_data, final_status, item['final_price'], item['final_difference'])
-        else:
-            logger.log_message(f"Error: Tried to finalize operation {tick_to_finalize}, but it was not found in possible_operations.", "RED")
 
-    # --- Save Aggregated Results and Send Updates if Changed ---
-    if stats_changed:
-        save_aggregated_results() # Sends both stats and active ops list
-    elif active_ops_list_updated:
-        # Only send updated active ops if stats didn't change but differences did
-        send_active_operations_to_server()
+def on_snapshot_loaded(tickers):
+    """Snapshot listener: checks the last price of every symbol with active levels."""
+    for symbol in price_levels.symbols():
+        ticker = tickers.get(symbol)
+        if ticker and 'lastPrice' in ticker:
+            on_price_update(symbol, float(ticker['lastPrice']))
 
 
-def save_aggregated_results():
+def exit_cycle():
+    """Finalizes the operations queued by the price-level triggers as soon as they are detected."""
+    while True:
+        try:
+            profile_name, tick, final_status, price = exit_events.get()
+            profile = profiles_by_name.get(profile_name)
+            operation_data = profile.possible_operations.get(tick) if profile else None
+            if operation_data is None or not operation_data.get('is_active', False):
+                continue
+            difference = calculate_difference(operation_data['entry_price'], price, operation_data['type'])
+            if finalize_operation(profile, tick, final_status, price, difference):
+                logger.log_message(f"Operation {profile.operation_key(tick)} hit {final_status} at price {price:.8f} (Diff: {difference:.2f}%) [price trigger]", "GREEN" if final_status == config.WIN_NAME else "RED")
+                save_aggregated_results(profile)
+        except Exception as e:
+            logger.log_message(f"CRITICAL error in exit cycle: {e}", "RED")
+
+
+def save_aggregated_results(profile=None, send_updates=True):
     """Calculates stats, saves results summary to JSON, and sends updates to server."""
-    stats = None
+    profile = profile or primary_profile
     try:
-        in_progress_count = sum(results.get(config.IN_PROGRESS_NAME, {}).values())
-        winning_count = sum(results.get(config.WIN_NAME, {}).values())
-        losing_count = sum(results.get(config.LOSE_NAME, {}).values())
-        total_finished = winning_count + losing_count
-        efficiency = round(winning_count * 100 / total_finished, 2) if total_finished > 0 else 0.0
-
-        stats = {
-            "in_progress_operations_count": in_progress_count,
-            "winning_operations_count": winning_count,
-            "losing_operations_count": losing_count,
-            "total_finished_operations": total_finished,
-            "total_operations_recorded": total_finished + in_progress_count,
-            "finished_operations_efficiency_percentage": efficiency,
-        }
+        stats = profile.stats()
 
         if config.ACTIVE_LOG:
-            log_results_to_json(config.LOG_PATH, config.PIN, results, stats)
+            # Coalesced with other updates and written atomically in the background
+            results_persister.submit(profile.log_path, profile.pin, profile.results, stats)
 
         # Send both stats and the updated active operations list
-        send_stats_to_server()
-        send_active_operations_to_server()
+        if send_updates:
+            send_stats_to_server()
+            send_active_operations_to_server()
 
     except Exception as e:
         logger.log_message(f"Error calculating/saving aggregated results or sending updates: {e}", "RED")
@@ -474,8 +811,75 @@ def save_aggregated_results():
 
 # --- Main Execution Cycles ---
 
+def stream_scanner_cycle():
+    """Evaluates closed candles as they arrive from the kline stream."""
+    symbols = []
+    feed = None
+    next_universe_check = 0
+    while True:
+        try:
+            if time.time() >= next_universe_check:
+                next_universe_check = time.time() + config.SCAN_TICKER_CYCLE_TIME
+                current_symbols = binance_service.get_usdt_futures_symbols()
+                if current_symbols and set(current_symbols) != set(symbols):
+                    logger.log_message(f"Scanner: Symbol universe changed ({len(symbols)} -> {len(current_symbols)}), re-subscribing stream.")
+                    symbols = current_symbols
+                    feed = binance_service.start_kline_stream(symbols)
+                    if feed is not None and config.EVENT_DRIVEN_EXITS:
+                        feed.add_price_listener(on_price_update)
+
+            if feed is None:
+                logger.log_message("Scanner: No USDT symbols found or error fetching.", "YELLOW")
+                time.sleep(config.SCAN_TICKER_CYCLE_TIME)
+                continue
+
+            item = feed.get_closed_candle(timeout=1.0)
+            if item:
+                tick, klines = item
+                # The feed holds the full window; a warm ring only needs the rows from its newest candle on
+                candle_buffers.update(tick, candle_buffers.new_rows(tick, klines))
+                evaluate_variation_from_closes(tick, candle_buffers.closes(tick))
+        except Exception as e:
+            logger.log_message(f"CRITICAL error in stream scanner cycle: {e}", "RED")
+            time.sleep(config.SCAN_TICKER_CYCLE_TIME)
+
+
+def run_scan_pass(symbols):
+    """One REST scanner pass: tops up the candle buffers and evaluates every symbol."""
+    processed_count = 0
+    pass_start = time.perf_counter()
+    fetched = []  # Symbols to evaluate in one batch when VECTORIZED_EVALUATION is on
+    for tick in set(candle_buffers.symbols()) - set(symbols):
+        candle_buffers.discard(tick)  # Delisted or no longer tradable
+    # Cold symbols get the full window, warm ones only the candles closed since the last pass
+    now_ms = int(time.time() * 1000)
+    start_times = {tick: candle_buffers.topup_start_time(tick, now_ms) for tick in symbols}
+    # Klines are fetched by a bounded worker pool; evaluation stays on this thread
+    klines_iter = binance_service.iter_futures_klines(symbols, limit=candle_buffers.capacity, start_times=start_times,
+                                                      max_workers=config.SCANNER_MAX_WORKERS, profile_cycle=profiler.current_cycle())
+    for tick, klines in profiler.timed_iter(klines_iter, 'fetch'):
+        if klines:
+            symbol_start = time.perf_counter()
+            with profiler.stage('parse'):
+                candle_buffers.update(tick, klines)
+            if config.VECTORIZED_EVALUATION:
+                fetched.append(tick)
+            else:
+                with profiler.stage('evaluate'):
+                    evaluate_variation_from_closes(tick, candle_buffers.closes(tick))
+            profiler.record_symbol(tick, time.perf_counter() - symbol_start, 'parse/evaluate')
+            processed_count += 1
+    if fetched:
+        with profiler.stage('evaluate'):
+            evaluate_universe_batch(fetched)
+    record_scan_pass(processed_count, len(symbols), time.perf_counter() - pass_start)
+
+
 def scanner_cycle():
     """Periodically scans coins for potential entries."""
+    if config.KLINE_STREAM_ACTIVE:
+        stream_scanner_cycle()
+        return
     while True:
         try:
             if not binance_service.is_connected():
@@ -487,12 +891,8 @@ def scanner_cycle():
             if not symbols:
                 logger.log_message("Scanner: No USDT symbols found or error fetching.", "YELLOW")
             else:
-                processed_count = 0
-                for tick in symbols:
-                    klines = binance_service.get_futures_klines(tick, limit=30)
-                    if klines:
-                        evaluate_variation_from_klines(tick, klines)
-                        processed_count += 1
+                with profiler.cycle('scanner'):
+                    run_scan_pass(symbols)
         except Exception as e:
             logger.log_message(f"CRITICAL error in scanner cycle: {e}", "RED")
             time.sleep(config.SCAN_TICKER_CYCLE_TIME * 2)
@@ -508,12 +908,187 @@ def evaluation_cycle():
             if not binance_service.is_connected():
                 logger.log_message("Evaluator: Binance client not connected, skipping evaluation.", "RED")
                 continue
-            evaluate_active_operations() # This now handles sending updates if needed
+            with profiler.cycle('evaluation'):
+                evaluate_active_operations() # This now handles sending updates if needed
         except Exception as e:
             logger.log_message(f"CRITICAL error in evaluation cycle: {e}", "RED")
             time.sleep(config.EVALUATION_CYCLE_TIME) # Wait even after error
 
 
+# --- Async Execution Cycles (ASYNC_MODE) ---
+
+async def async_scanner_cycle(service):
+    """Scanner cycle on the event loop: every kline request of a pass is in flight at once."""
+    while True:
+        try:
+            symbols = await service.get_usdt_futures_symbols()
+            if not symbols:
+                logger.log_message("Scanner: No USDT symbols found or error fetching.", "YELLOW")
+            else:
+                pass_start = time.perf_counter()
+                for tick in set(candle_buffers.symbols()) - set(symbols):
+                    candle_buffers.discard(tick)
+                now_ms = int(time.time() * 1000)
+                start_times = {tick: candle_buffers.topup_start_time(tick, now_ms) for tick in symbols}
+                fetched = []
+                async for tick, klines in service.iter_futures_klines(symbols, limit=candle_buffers.capacity, start_times=start_times):
+                    if klines:
+                        candle_buffers.update(tick, klines)
+                        fetched.append(tick)
+
+                # Volume checks read the snapshot; refresh it here so they never block the loop
+                if market_snapshot.age() > config.SNAPSHOT_MAX_AGE:
+                    market_snapshot.load(await service.get_all_futures_tickers())
+                if config.VECTORIZED_EVALUATION:
+                    evaluate_universe_batch(fetched)
+                else:
+                    for tick in fetched:
+                        evaluate_variation_from_closes(tick, candle_buffers.closes(tick))
+
+                record_scan_pass(len(fetched), len(symbols), time.perf_counter() - pass_start)
+        except Exception as e:
+            logger.log_message(f"CRITICAL error in async scanner cycle: {e}", "RED")
+            await asyncio.sleep(config.SCAN_TICKER_CYCLE_TIME)
+        await asyncio.sleep(config.SCAN_TICKER_CYCLE_TIME)
+
+
+async def async_evaluation_cycle(service):
+    """Evaluation cycle on the event loop, sharing the scanner's HTTP session."""
+    logger.log_message("Evaluation cycle started.", "GREEN")
+    while True:
+        try:
+            await asyncio.sleep(config.EVALUATION_CYCLE_TIME)
+            if not has_active_operations():
+                continue
+            # Candle pages for intrabar exits are awaited here, so a throttled scheduler never blocks the loop
+            intrabar_results = await check_intrabar_exits_async(service) if config.INTRABAR_EXITS else None
+            if market_snapshot.age() > config.SNAPSHOT_MAX_AGE:
+                market_snapshot.load(await service.get_all_futures_tickers(PRIORITY_HIGH))
+            evaluate_active_operations(intrabar_results)
+        except Exception as e:
+            logger.log_message(f"CRITICAL error in async evaluation cycle: {e}", "RED")
+
+
+async def run_async_cycles():
+    """Runs the scanner and the evaluator as tasks on a single asyncio loop."""
+    service = AsyncBinanceService(scheduler=binance_service.scheduler, max_in_flight=config.ASYNC_MAX_IN_FLIGHT,
+                                  recorder=binance_service.recorder)
+    if not await service.connect():
+        return
+    market_snapshot.symbol_universe = service.symbol_universe # Listings seen in tickers refresh the universe in use
+    try:
+        await asyncio.gather(async_scanner_cycle(service), async_evaluation_cycle(service))
+    finally:
+        await service.close()
+
+
+# --- State Snapshots (--resume) ---
+
+def build_state_snapshot():
+    """Collects active operations, counters and candle buffers as plain data."""
+    profiles_state = []
+    for profile in profiles:
+        with profile.results_lock:
+            results_copy = {status: dict(counts) for status, counts in profile.results.items()}
+        profiles_state.append({
+            'name': profile.name,
+            'pin': profile.pin,
+            'results': results_copy,
+            'active_operations': [op.to_dict() for _, op in profile.possible_operations.active_items()],
+        })
+    return {'pin': config.PIN, 'profiles': profiles_state, 'candles': candle_buffers.export()}
+
+
+def metrics_cycle():
+    """Periodically sends the rendered metrics to server.py (served at /metrics)."""
+    while True:
+        time.sleep(config.METRICS_INTERVAL)
+        if connected_to_server:
+            socket_emitter.set_metrics(metrics.render())
+
+
+def state_snapshot_cycle():
+    """Periodically saves the state snapshot a restarted bot resumes from."""
+    while True:
+        time.sleep(config.STATE_SNAPSHOT_INTERVAL)
+        try:
+            save_state(config.LOG_PATH, build_state_snapshot())
+        except Exception as e:
+            logger.log_message(f"Error building state snapshot: {e}", "RED")
+
+
+def restore_state_snapshot():
+    """Reloads the snapshot of the resumed run, then settles the TP/SL hits missed while it was down."""
+    load_start = time.perf_counter()
+    state = load_state(config.LOG_PATH)
+    if state is None:
+        return False
+
+    for symbol, candles in state.get('candles', {}).items():
+        candle_buffers.load_candles(symbol, candles)
+
+    restored_count = 0
+    for profile_state in state.get('profiles', []):
+        profile = profiles_by_name.get(profile_state['name'])
+        if profile is None:
+            logger.log_message(f"Resume: Profile '{profile_state['name']}' is no longer configured, its state is ignored.", "YELLOW")
+            continue
+        with profile.results_lock:
+            for status, counts in profile_state['results'].items():
+                for type_name, count in counts.items():
+                    if type_name in profile.results.get(status, {}):
+                        profile.results[status][type_name] = count
+
+        for data in profile_state['active_operations']:
+            operation_type = config.TYPE_DEFINITIONS.get(data['type'])
+            if operation_type is None:
+                logger.log_message(f"Resume: Unknown operation type '{data['type']}' for {data['tick']}, skipped.", "YELLOW")
+                continue
+            operation_data = profile.possible_operations.open(
+                data['tick'], operation_type, data['entry_price'], data['tp'], data['sl'],
+                config.IN_PROGRESS_NAME, start_time=data['start_time'])
+            if operation_data is None:
+                continue
+            operation_data['last_difference'] = data.get('last_difference') or 0.0
+            operation_data['checked_until'] = data.get('checked_until')
+            if config.EVENT_DRIVEN_EXITS:
+                register_price_levels(profile, operation_data)
+            restored_count += 1
+
+        # In-progress counters follow the operations actually restored
+        with profile.results_lock:
+            for type_name in profile.results[config.IN_PROGRESS_NAME]:
+                profile.results[config.IN_PROGRESS_NAME][type_name] = profile.possible_operations.active_count(type_name)
+
+    load_ms = (time.perf_counter() - load_start) * 1000
+    logger.log_message(f"Resume: Restored {restored_count} active operations and {len(state.get('candles', {}))} candle buffers in {load_ms:.1f} ms (snapshot {time.time() - state['saved_at']:.0f}s old).", "GREEN")
+    reconcile_resumed_operations()
+    return True
+
+
+def reconcile_resumed_operations():
+    """Settles TP/SL hits that happened while the bot was down, from the candles of the downtime."""
+    now_ms = int(time.time() * 1000)
+    settled_count = 0
+    for profile, tick, operation_data in list(iter_active_operations()):
+        try:
+            # The restored ring stops at the crash, so the downtime candles are always fetched
+            deactivate, final_status, level_price = check_intrabar_deactivation(tick, operation_data, now_ms, use_buffer=False)
+        except Exception as e:
+            logger.log_message(f"Resume: Error reconciling {profile.operation_key(tick)}: {e}", "RED")
+            continue
+        if not deactivate:
+            continue
+        difference = calculate_difference(operation_data['entry_price'], level_price, operation_data['type'])
+        if finalize_operation(profile, tick, final_status, level_price, difference):
+            settled_count += 1
+            logger.log_message(f"Resume: {profile.operation_key(tick)} hit {final_status} at price {level_price:.8f} while the bot was down (Diff: {difference:.2f}%)", "GREEN" if final_status == config.WIN_NAME else "RED")
+
+    for profile in profiles:
+        save_aggregated_results(profile, send_updates=False)
+    logger.log_message(f"Resume: {settled_count} operations settled from downtime candles.")
+
+
 def connect_to_socketio_server():
     """Attempts to connect to the Socket.IO server."""
     original_log_message(f"Attempting to connect to Socket.IO server at {config.SERVER_URL}...")
@@ -532,21 +1107,41 @@ def main():
     except Exception as e:
         original_log_message(f"Error printing config summary: {e}", "RED")
 
-    setup_file_logging(config.LOG_PATH)
+    for profile in profiles:
+        setup_file_logging(profile.log_path)
 
     if not binance_service.is_connected():
         original_log_message("CRITICAL: Binance client failed to initialize. Bot cannot start.", "RED")
         sys.exit(1)
 
+    if config.RESUME_PIN:
+        restore_state_snapshot()
+
     connect_to_socketio_server()
 
     logger.log_message(f'Starting Trading Bot Cycles... PIN: {config.PIN}', 'GREEN')
 
-    scanner_thread = threading.Thread(target=scanner_cycle, daemon=True)
-    evaluation_thread = threading.Thread(target=evaluation_cycle, daemon=True)
+    if config.EVENT_DRIVEN_EXITS:
+        # Every snapshot refresh (and stream update, see stream_scanner_cycle) checks the TP/SL levels
+        market_snapshot.add_listener(on_snapshot_loaded)
+        threading.Thread(target=exit_cycle, daemon=True).start()
+
+    if config.STATE_SNAPSHOT_INTERVAL:
+        threading.Thread(target=state_snapshot_cycle, daemon=True).start()
+
+    if config.METRICS_INTERVAL:
+        threading.Thread(target=metrics_cycle, daemon=True).start()
+
+    if config.ASYNC_MODE:
+        # One thread owns the event loop that runs both cycles
+        async_thread = threading.Thread(target=asyncio.run, args=(run_async_cycles(),), daemon=True)
+        async_thread.start()
+    else:
+        scanner_thread = threading.Thread(target=scanner_cycle, daemon=True)
+        evaluation_thread = threading.Thread(target=evaluation_cycle, daemon=True)
 
-    scanner_thread.start()
-    evaluation_thread.start()
+        scanner_thread.start()
+        evaluation_thread.start()
 
     try:
         while True:
@@ -561,7 +1156,18 @@ def main():
     finally:
         if connected_to_server:
             logger.log_message("Disconnecting from Socket.IO server...")
+            socket_emitter.flush() # Last batch before the connection closes
             sio_client.disconnect()
+        if binance_service.recorder:
+            binance_service.recorder.close()
+        if config.STATE_SNAPSHOT_INTERVAL:
+            save_state(config.LOG_PATH, build_state_snapshot()) # Final snapshot for --resume
+        for profile in profiles:
+            profile.possible_operations.close()
+        operation_log_writer.close() # Pending operation log writes reach disk before exit
+        results_persister.flush()
+        if operation_journal:
+            operation_journal.close()
         original_log_message("Trading Bot cycles terminating.")
         original_log_message("Trading Bot script finished.")
         print("Trading Bot script finished.")